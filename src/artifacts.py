@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Aşamalar arası ara çıktılar (Parquet / Arrow IPC)
+-------------------------------------------------
+- Pipeline aşamaları (json_to_xlsx → llm_infer → metrics_eval → generate_reports) birbirine veriyi
+  XLSX/CSV yerine kolon bazlı dosyalarla aktarabilir. Excel yalnızca son kullanıcıya dışa aktarım olur.
+- Biçim dosya uzantısından seçilir:
+  * .parquet          → Parquet (sıkıştırılmış, kolon seçmeli okuma)
+  * .arrow / .feather → Arrow IPC (bellek eşlemeli okunabilir; yeniden yüklemesi en hızlı)
+  * .csv / .xlsx      → mevcut biçimler (geriye dönük uyumluluk)
+- Kararlı şemalar (`SCHEMAS`): conversations, sohbetler, messages, ozet, candidates, predictions, eval.
+  `conform` eksik kolonları ekler, bilinen kolonları sabit tiplere çevirir, şema dışı kolonları sona koyar.
+  Kimlik kolonları (conversation_id, sohbet_id) her zaman string'dir; böylece farklı kaynaklardan
+  gelen tablolar güvenle birleştirilir.
+
+Gereksinim (yalnızca Parquet/Arrow için):
+  pip install pyarrow
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+COLUMNAR_SUFFIXES = (".parquet", ".arrow", ".feather")
+
+_STR = "string"
+_INT = "Int64"
+_FLOAT = "float64"
+_DT = "datetime"
+
+_GOLD = {
+    "gold_sentiment": _STR, "gold_intent": _STR, "gold_yanit_durumu": _STR,
+    "gold_tur": _STR, "gold_intent_detay": _STR,
+}
+_PRED = {
+    "pred_sentiment": _STR, "pred_intent": _STR, "pred_yanit_durumu": _STR,
+    "pred_tur": _STR, "pred_intent_detay": _STR,
+}
+
+SCHEMAS: Dict[str, Dict[str, str]] = {
+    # data_load.load_conversations
+    "conversations": {
+        "conversation_id": _STR, "dialog_text": _STR,
+        "sohbet_baslangic": _STR, "sohbet_bitis": _STR, "toplam_sure_saniye": _INT,
+        **_GOLD,
+    },
+    # json_to_xlsx.normalize → 'sohbetler'
+    "sohbetler": {
+        "sohbet_id": _STR, "tarih_saat": _DT, "mesaj_sayisi": _INT,
+        "ilk_mesaj_zaman": _DT, "son_mesaj_zaman": _DT, "ilk_musteri_mesaji": _STR,
+        "yanit_durumu": _STR, "sentiment": _STR, "tur": _STR, "intent": _STR,
+        "intent_detay": _STR, "tam_sohbet": _STR,
+    },
+    # json_to_xlsx.normalize → 'mesajlar'
+    "messages": {
+        "sohbet_id": _STR, "mesaj_sira": _INT, "gonderen": _STR, "zaman": _DT, "metin": _STR,
+    },
+    # json_to_xlsx.normalize → 'özet'
+    "ozet": {"metric": _STR, "kategori": _STR, "adet": _INT, "yuzde": _FLOAT},
+    # intent_candidates.find_candidates_batch (eval_pipeline 'candidates' aşaması)
+    "candidates": {"conversation_id": _STR, "intent_candidates": _STR},
+    # llm_infer.predict_conversations
+    "predictions": {"conversation_id": _STR, "prediction": _STR, "tokens_in": _INT, "tokens_full": _INT},
+    # eval_pipeline: gold + pred birleşik
+    "eval": {
+        "conversation_id": _STR, "dialog_text": _STR,
+        "sohbet_baslangic": _STR, "sohbet_bitis": _STR, "toplam_sure_saniye": _INT,
+        **_GOLD, "prediction": _STR, **_PRED,
+    },
+}
+
+
+def require_pyarrow() -> None:
+    """Parquet/Arrow yazıp okumadan önce pyarrow kurulu mu diye bakar; değilse anlaşılır hatayla çıkar."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise SystemExit("Hata: Parquet/Arrow için pyarrow gerekli. Lütfen `pip install pyarrow` komutunu çalıştırın.")
+
+
+def is_columnar(path) -> bool:
+    """Dosya uzantısı Parquet/Arrow mı?"""
+    return Path(path).suffix.lower() in COLUMNAR_SUFFIXES
+
+
+def conform(df: pd.DataFrame, kind: str) -> pd.DataFrame:
+    """
+    DataFrame'i `SCHEMAS[kind]`'a uydurur: eksik kolonlar eklenir (boş), bilinen kolonlar sabit
+    tiplere çevrilir, şema dışı kolonlar korunur ve sona eklenir.
+    """
+    schema = SCHEMAS[kind]
+    out = df.copy()
+    for col, dtype in schema.items():
+        if col not in out.columns:
+            out[col] = pd.Series(pd.NA, index=out.index, dtype="object")
+        if dtype == _DT:
+            if not pd.api.types.is_datetime64_any_dtype(out[col]):
+                out[col] = pd.to_datetime(out[col], errors="coerce")
+        elif dtype == _STR:
+            s = out[col]
+            out[col] = s.where(s.isna(), s.astype(str)).astype(_STR)
+        elif dtype == _INT:
+            out[col] = pd.to_numeric(out[col], errors="coerce").astype(_INT)
+        else:
+            out[col] = pd.to_numeric(out[col], errors="coerce").astype(dtype)
+    rest = [c for c in out.columns if c not in schema]
+    return out[list(schema) + rest]
+
+
+def write_table(df: pd.DataFrame, path, kind: Optional[str] = None, sheet_name: str = "data") -> Path:
+    """
+    DataFrame'i uzantıya göre yazar. `kind` verilirse önce `conform` uygulanır.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if kind:
+        df = conform(df, kind)
+    suffix = path.suffix.lower()
+    if suffix == ".parquet":
+        require_pyarrow()
+        df.to_parquet(path, index=False)
+    elif suffix in (".arrow", ".feather"):
+        require_pyarrow()
+        df.reset_index(drop=True).to_feather(path)
+    elif suffix == ".xlsx":
+        df.to_excel(path, sheet_name=sheet_name, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def read_table(
+    path,
+    kind: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    sheet_name: str = "data",
+) -> pd.DataFrame:
+    """
+    Uzantıya göre okur (Arrow IPC bellek eşlemeli). `kind` verilirse `conform` uygulanır.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".parquet":
+        require_pyarrow()
+        df = pd.read_parquet(path, columns=columns)
+    elif suffix in (".arrow", ".feather"):
+        require_pyarrow()
+        from pyarrow import feather
+        df = feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+    elif suffix in (".xlsx", ".xls"):
+        df = pd.read_excel(path, sheet_name=sheet_name, usecols=columns)
+    else:
+        df = pd.read_csv(path, usecols=columns)
+    return conform(df, kind) if kind else df
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+Çevrimdışı batch API kipi (gecelik toplu çıkarım)
+-------------------------------------------------
+- Tüm prompt'lar sağlayıcının batch dosyası biçiminde (JSONL; satır başına
+  {"custom_id", "method", "url", "body"}) tek dosyaya yazılır, dosya yüklenip iş başlatılır ve
+  tamamlanana kadar belirli aralıklarla durum sorgulanır. İstemci tarafında eşzamanlılık,
+  hız sınırlama ya da yeniden deneme yönetimi gerekmez.
+- Dönen sonuçlar eşzamanlı kiple AYNI yoldan geçer: kademeli `IntentSchema` doğrulaması → checkpoint JSONL
+  → `compact_checkpoint` (aynı CSV/Parquet yazıcısı). Doğrulanamayan ya da sonuçsuz sohbetler
+  {"error": ...} kaydıyla yazılır; `--resume` ile yalnızca onlar yeniden gönderilir.
+- İş kimliği `<out>.batch.json` dosyasında tutulur: süreç kesilir ya da `timeout` dolarsa aynı komut
+  yeniden çalıştırıldığında iş yeniden gönderilmez, sorgulamaya kaldığı yerden devam edilir.
+- İstemciler:
+  * `OpenAIBatchClient`: OpenAI/Groq SDK'sının `files` + `batches` uç noktaları,
+  * `LocalBatchClient`: testler için dosya tabanlı yerel karşılık (istekleri bir sohbet istemcisiyle,
+    varsayılan `llm_stub.StubChatClient`, işler ve sağlayıcıyla aynı biçimde sonuç dosyası üretir).
+
+Kullanım:
+  python src/llm_infer.py --in-table outputs/stages/conversations.parquet --text-col dialog_text \
+    --id-col conversation_id --model gpt-4o-mini --batch-api --batch-poll 300
+  # yerel karşılık ile:
+  python src/llm_infer.py ... --model stub --batch-api --batch-local outputs/batch_local
+"""
+from __future__ import annotations
+
+import json
+import shutil
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from llm_cache import ResponseCache, cache_key
+from llm_infer import (
+    _build_system_prompt, _default_checkpoint_path, _is_success,
+    _read_checkpoint, _to_jsonable, compact_checkpoint, parse_intent_output,
+)
+from prompt_budget import PromptBudget, count_tokens
+
+ENDPOINT = "/v1/chat/completions"
+TERMINAL = ("completed", "failed", "expired", "cancelled")
+
+
+@dataclass
+class BatchStatus:
+    status: str                         # validating | in_progress | finalizing | completed | failed | ...
+    output_file_id: Optional[str] = None
+    error_file_id: Optional[str] = None
+    completed: int = 0
+    failed: int = 0
+    total: int = 0
+
+
+# ------------ İstemciler ------------
+class OpenAIBatchClient:
+    """OpenAI/Groq SDK istemcisi üzerinden batch işi (files + batches uç noktaları)."""
+
+    def __init__(self, client, completion_window: str = "24h"):
+        self.client = client
+        self.completion_window = completion_window
+
+    def submit(self, input_path: Path) -> str:
+        with Path(input_path).open("rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=ENDPOINT,
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    def retrieve(self, batch_id: str) -> BatchStatus:
+        b = self.client.batches.retrieve(batch_id)
+        counts = getattr(b, "request_counts", None)
+        return BatchStatus(
+            status=b.status,
+            output_file_id=getattr(b, "output_file_id", None),
+            error_file_id=getattr(b, "error_file_id", None),
+            completed=getattr(counts, "completed", 0) or 0,
+            failed=getattr(counts, "failed", 0) or 0,
+            total=getattr(counts, "total", 0) or 0,
+        )
+
+    def download(self, file_id: str) -> str:
+        return self.client.files.content(file_id).text
+
+
+class LocalBatchClient:
+    """
+    Dosya tabanlı yerel batch karşılığı (ağsız). İşler `root/<batch_id>/` altında tutulur.
+    :param root: İş klasörlerinin kökü.
+    :param client: İstekleri işleyecek sohbet istemcisi (varsayılan: `StubChatClient()`).
+    :param polls: İş tamamlanmadan önce kaç sorgunun 'in_progress' döneceği (bekleme simülasyonu).
+    """
+
+    def __init__(self, root, client=None, polls: int = 1):
+        if client is None:
+            from llm_stub import StubChatClient
+            client = StubChatClient()
+        self.root = Path(root)
+        self.client = client
+        self.polls = polls
+
+    def _state_path(self, batch_id: str) -> Path:
+        return self.root / batch_id / "state.json"
+
+    def _save_state(self, batch_id: str, state: Dict) -> None:
+        self._state_path(batch_id).write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+
+    def submit(self, input_path: Path) -> str:
+        batch_id = f"batch_local_{time.time_ns()}"
+        job = self.root / batch_id
+        job.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(input_path, job / "input.jsonl")
+        self._save_state(batch_id, {"status": "in_progress", "polls_left": self.polls})
+        return batch_id
+
+    def _process(self, batch_id: str) -> Dict:
+        job = self.root / batch_id
+        done = failed = 0
+        with (job / "input.jsonl").open("r", encoding="utf-8") as fin, \
+                (job / "output.jsonl").open("w", encoding="utf-8") as fout, \
+                (job / "errors.jsonl").open("w", encoding="utf-8") as ferr:
+            for line in fin:
+                if not line.strip():
+                    continue
+                req = json.loads(line)
+                try:
+                    resp = self.client.chat.completions.create(**req["body"])
+                    body = {"choices": [{"index": 0, "message": {"role": "assistant",
+                                                                 "content": resp.choices[0].message.content}}]}
+                    fout.write(json.dumps({"custom_id": req["custom_id"],
+                                           "response": {"status_code": 200, "body": body},
+                                           "error": None}, ensure_ascii=False) + "\n")
+                    done += 1
+                except Exception as e:
+                    ferr.write(json.dumps({"custom_id": req["custom_id"], "response": None,
+                                           "error": {"message": str(e)}}, ensure_ascii=False) + "\n")
+                    failed += 1
+        return {"status": "completed", "output_file_id": str(job / "output.jsonl"),
+                "error_file_id": str(job / "errors.jsonl"), "completed": done, "failed": failed,
+                "total": done + failed}
+
+    def retrieve(self, batch_id: str) -> BatchStatus:
+        state = json.loads(self._state_path(batch_id).read_text(encoding="utf-8"))
+        if state["status"] == "in_progress":
+            if state.get("polls_left", 0) > 0:
+                state["polls_left"] -= 1
+            else:
+                state = self._process(batch_id)
+            self._save_state(batch_id, state)
+        return BatchStatus(**{k: v for k, v in state.items() if k != "polls_left"})
+
+    def download(self, file_id: str) -> str:
+        return Path(file_id).read_text(encoding="utf-8")
+
+
+# ------------ İstek dosyası ------------
+def build_requests(
+    conversations: pd.DataFrame,
+    prompt_template: str,
+    model: str,
+    intents: Optional[List[str]] = None,
+    budget: Optional[PromptBudget] = None,
+) -> Iterable[Tuple[str, Dict, Tuple[int, int]]]:
+    """
+    Her sohbet için (custom_id, batch satırı, (tokens_in, tokens_full)) üretir.
+    Prompt'lar eşzamanlı kiple birebir aynıdır (aynı sistem mesajı, şablon ve token bütçesi).
+    """
+    budget = budget or PromptBudget()
+    system_prompt = _build_system_prompt(intents)
+    overhead = count_tokens(system_prompt) + count_tokens(prompt_template.replace("<<DIALOG_BLOK>>", ""))
+    for row in conversations.itertuples():
+        dialog, info = budget.fit(row.dialog_text, overhead=overhead)
+        line = {
+            "custom_id": str(row.conversation_id),
+            "method": "POST",
+            "url": ENDPOINT,
+            "body": {
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt_template.replace("<<DIALOG_BLOK>>", dialog)},
+                ],
+                "response_format": {"type": "json_object"},
+            },
+        }
+        yield line["custom_id"], line, (info.tokens_in, info.tokens_full)
+
+
+def _validate(content: Optional[str], intents: Optional[List[str]] = None):
+    """Eşzamanlı kipteki doğrulama: başarılıysa JSON string, değilse {"error": ...} sözlüğü."""
+    try:
+        return parse_intent_output(content, intents)[0].model_dump_json()
+    except Exception as e:
+        return {"error": f"Doğrulama hatası: {e}", "raw_model_output": content or ""}
+
+
+def _iter_results(text: str, intents: Optional[List[str]] = None) -> Iterable[Tuple[str, object]]:
+    """Sonuç/hata dosyası satırlarından (custom_id, tahmin) üretir."""
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        rec = json.loads(line)
+        resp = rec.get("response") or {}
+        if rec.get("error") or resp.get("status_code", 200) != 200:
+            err = rec.get("error") or resp.get("body", {}).get("error") or {}
+            msg = err.get("message") if isinstance(err, dict) else str(err)
+            yield str(rec.get("custom_id")), {"error": f"Batch isteği başarısız: {msg}", "raw_model_output": ""}
+            continue
+        try:
+            content = resp["body"]["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            content = None
+        yield str(rec.get("custom_id")), _validate(content, intents)
+
+
+def _user_prompts(input_path: Path) -> Iterable[Tuple[str, str]]:
+    """Gönderilen batch dosyasından (custom_id, kullanıcı prompt'u) üretir (önbellek anahtarı için)."""
+    with input_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                req = json.loads(line)
+                yield req["custom_id"], req["body"]["messages"][-1]["content"]
+
+
+# ------------ Çalıştırma ------------
+def _state_path(out_path: str) -> Path:
+    """`outputs/preds.csv` → `outputs/preds.batch.json`"""
+    return Path(out_path).with_suffix(".batch.json")
+
+
+def run_batch_job(
+    conversations: pd.DataFrame,
+    prompt_template: str,
+    out_path: str,
+    model: str,
+    batch_client,
+    intents: Optional[List[str]] = None,
+    budget: Optional[PromptBudget] = None,
+    cache: Optional[ResponseCache] = None,
+    checkpoint_path: Optional[str] = None,
+    resume: bool = False,
+    poll_interval: float = 60.0,
+    timeout: Optional[float] = None,
+) -> pd.DataFrame:
+    """
+    Sohbetleri batch işi olarak gönderir, tamamlanmasını bekler ve tahminleri yazar.
+    :param batch_client: `OpenAIBatchClient` ya da `LocalBatchClient`.
+    :param cache: Verilirse önbellekte olan sohbetler gönderilmez; yeni sonuçlar önbelleğe yazılır.
+    :param resume: True ise checkpoint'te başarılı tahmini olan sohbetler gönderilmez.
+    :param poll_interval: Durum sorgulama aralığı (saniye).
+    :param timeout: Bu süre (saniye) dolarsa beklemeyi bırakır; iş sağlayıcıda sürer, aynı komut
+                    yeniden çalıştırıldığında sorgulamaya devam edilir.
+    :return: Tahminleri içeren DataFrame (satırlar girdi sırasıyla).
+    """
+    if not model:
+        raise SystemExit("Hata: '--model' argümanı belirtilmedi.")
+    ckpt = Path(checkpoint_path) if checkpoint_path else _default_checkpoint_path(out_path)
+    ckpt.parent.mkdir(parents=True, exist_ok=True)
+    state_path = _state_path(out_path)
+    system_prompt = _build_system_prompt(intents)
+    ids = {str(cid): _to_jsonable(cid) for cid in conversations["conversation_id"]}
+
+    if state_path.exists():
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+        print(f"[batch] önceki iş sürdürülüyor: {state['batch_id']}")
+    else:
+        done = set()
+        if resume:
+            done = {cid for cid, rec in _read_checkpoint(ckpt).items() if _is_success(rec.get("prediction"))}
+        elif ckpt.exists():
+            ckpt.unlink()
+
+        input_path = Path(out_path).with_suffix(".batch_input.jsonl")
+        tokens: Dict[str, Tuple[int, int]] = {}   # yalnızca gönderilen sohbetler
+        seen = set(done)
+        n_cached = 0
+        with input_path.open("w", encoding="utf-8") as fin, ckpt.open("a", encoding="utf-8") as fck:
+            for cid, line, tok in build_requests(conversations, prompt_template, model, intents, budget):
+                if cid in seen:
+                    continue
+                seen.add(cid)
+                if cache is not None:
+                    hit = cache.get(cache_key(model, system_prompt, line["body"]["messages"][1]["content"]))
+                    if hit is not None:
+                        fck.write(json.dumps({"conversation_id": ids.get(cid, cid), "prediction": hit,
+                                              "tokens_in": tok[0], "tokens_full": tok[1]}, ensure_ascii=False) + "\n")
+                        n_cached += 1
+                        continue
+                tokens[cid] = tok
+                fin.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+        n_submit = len(tokens)
+        if n_cached:
+            print(f"[cache] {n_cached} sohbet önbellekten alındı.")
+        if n_submit == 0:
+            print("[batch] gönderilecek sohbet yok.")
+            return compact_checkpoint(ckpt, conversations["conversation_id"], out_path)
+
+        batch_id = batch_client.submit(input_path)
+        state = {"batch_id": batch_id, "model": model, "input_file": str(input_path),
+                 "submitted_at": time.time(), "tokens": tokens}
+        state_path.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+        print(f"[batch] {n_submit} istek gönderildi: {batch_id}")
+
+    # ---- tamamlanana kadar sorgula ----
+    t0 = time.monotonic()
+    while True:
+        st = batch_client.retrieve(state["batch_id"])
+        if st.status in TERMINAL:
+            break
+        if timeout is not None and time.monotonic() - t0 >= timeout:
+            raise SystemExit(
+                f"Hata: batch işi {state['batch_id']} henüz bitmedi (durum: {st.status}). "
+                f"Aynı komutu yeniden çalıştırarak sorgulamaya devam edebilirsiniz."
+            )
+        print(f"[batch] durum={st.status} tamamlanan={st.completed}/{st.total} hatalı={st.failed}", file=sys.stderr)
+        time.sleep(poll_interval)
+    print(f"[batch] iş bitti: durum={st.status} tamamlanan={st.completed} hatalı={st.failed}")
+
+    # ---- sonuçları aynı doğrulama + checkpoint yolundan al ----
+    tokens = {cid: tuple(v) for cid, v in state.get("tokens", {}).items()}
+    got: Dict[str, object] = {}
+    for file_id in (st.output_file_id, st.error_file_id):
+        if file_id:
+            for cid, pred in _iter_results(batch_client.download(file_id), intents):
+                if cid not in got or not _is_success(got[cid]):
+                    got[cid] = pred
+
+    if cache is not None:
+        for cid, prompt in _user_prompts(Path(state["input_file"])):
+            if _is_success(got.get(cid)):
+                cache.put(cache_key(model, system_prompt, prompt), got[cid], model=model)
+
+    n_ok = 0
+    with ckpt.open("a", encoding="utf-8") as f:
+        for cid, (tok_in, tok_full) in tokens.items():
+            pred = got.get(cid)
+            if pred is None:
+                pred = {"error": f"Batch sonucu yok (iş durumu: {st.status})", "raw_model_output": ""}
+            n_ok += _is_success(pred)
+            f.write(json.dumps({"conversation_id": ids.get(cid, cid), "prediction": pred,
+                                "tokens_in": tok_in, "tokens_full": tok_full}, ensure_ascii=False) + "\n")
+    state_path.unlink()
+    print(f"[batch] {n_ok} tahmin doğrulandı, {len(tokens) - n_ok} hatalı.")
+    return compact_checkpoint(ckpt, conversations["conversation_id"], out_path)
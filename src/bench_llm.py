@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+llm_infer verim kıyaslaması (yerel sahte LLM ile)
+------------------------------------------------
+- `predict_conversations` gerçek API çağrısı yapmadan, süreç içi sahte istemciyle
+  (`llm_stub.StubChatClient`) 1k / 10k / 100k sentetik sohbet (`synth_data`; gold etiketli,
+  böylece canlı metrik yolu da ölçülür) üzerinde koşturulur.
+- Sahte istemcide gecikme dağılımı (fixed/uniform/exponential/lognormal), HTTP 500, HTTP 429
+  (Retry-After ile) ve bozuk JSON oranları ayarlanabilir; böylece yeniden deneme ve geri çekilme
+  yolları da ölçülür.
+- Her boyut ayrı bir süreçte çalışır (tepe RSS boyuta özgü ölçülsün diye). Raporlanan değerler:
+  sohbet/sn, istek gecikmesi p50/p95/p99, sohbet başına uçtan uca gecikme (yeniden denemeler dahil)
+  p50/p95/p99, çağrı / yeniden deneme / 429 / 500 / bozuk yanıt sayıları, hatalı kalan tahminler,
+  tepe RSS (MB).
+- Sonuçlar sürümler arası karşılaştırma için JSON'a yazılır (git sürümü ve tüm ayarlar dahil).
+
+Kullanım:
+  python src/bench_llm.py --sizes 1000 10000 100000 --latency 0.2 --latency-dist lognormal \
+    --concurrency 64 --error-rate 0.01 --rate-limit-rate 0.02 --malformed-rate 0.01 \
+    --out outputs/bench/llm_bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_TEMPLATE = "Sohbeti sınıflandır ve tek satır JSON üret.\n\n<<DIALOG_BLOK>>\n"
+
+
+@dataclass
+class BenchConfig:
+    latency: float = 0.05
+    latency_dist: str = "lognormal"
+    latency_sigma: float = 0.5
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: Optional[float] = 0.05
+    malformed_rate: float = 0.0
+    concurrency: int = 32
+    max_tokens: Optional[int] = None
+    batch_size: int = 1
+    seed: int = 0
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(np.asarray(values, dtype=float), [50, 95, 99])
+    return {"p50": round(float(p50), 4), "p95": round(float(p95), 4), "p99": round(float(p99), 4)}
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux'ta KB, macOS'ta bayt
+    return round(kb / 1024 ** (2 if sys.platform == "darwin" else 1), 1)
+
+
+def run_one(n: int, cfg: BenchConfig) -> Dict[str, Any]:
+    """Tek boyut için kıyaslama (ayrı süreçte çağrılır)."""
+    from llm_infer import predict_conversations
+    from llm_stub import StubChatClient
+    from prompt_budget import PromptBudget
+    from synth_data import conversations_frame
+
+    df = conversations_frame(n, seed=cfg.seed)
+    client = StubChatClient(
+        latency=cfg.latency,
+        latency_dist=cfg.latency_dist,
+        latency_sigma=cfg.latency_sigma,
+        error_rate=cfg.error_rate,
+        rate_limit_rate=cfg.rate_limit_rate,
+        retry_after=cfg.retry_after,
+        malformed_rate=cfg.malformed_rate,
+        seed=cfg.seed,
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        preds = predict_conversations(
+            conversations=df,
+            prompt_template=_TEMPLATE,
+            out_path=str(Path(tmp) / "preds.csv"),
+            model="stub",
+            concurrency=cfg.concurrency,
+            client=client,
+            budget=PromptBudget(max_tokens=cfg.max_tokens),
+            batch_size=cfg.batch_size,
+        )
+        wall = time.perf_counter() - t0
+
+    st = client.stats()
+    failed = int(preds["prediction"].map(lambda v: not (isinstance(v, str) and v.startswith("{"))).sum())
+    requests = max(1, -(-n // cfg.batch_size))
+    return {
+        "n": n,
+        "wall_seconds": round(wall, 3),
+        "conversations_per_sec": round(n / wall, 2) if wall else None,
+        "request_latency": _percentiles(client.latencies),
+        "e2e_latency": _percentiles(client.e2e_latencies()),
+        "calls": st["calls"],
+        "retries": max(0, st["calls"] - requests),
+        "throttles_429": st["throttles"],
+        "errors_5xx": st["errors"],
+        "malformed": st["malformed"],
+        "failed_predictions": failed,
+        "tokens_in_mean": round(float(preds["tokens_in"].mean()), 1) if n else None,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=Path(__file__).resolve().parent, timeout=10)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_suite(sizes: List[int], cfg: BenchConfig) -> Dict[str, Any]:
+    """Her boyutu yeni bir süreçte sırayla koşturur."""
+    results = []
+    for n in sizes:
+        print(f"[bench] n={n} çalışıyor…")
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            res = pool.submit(run_one, n, cfg).result()
+        print(f"[OK] n={n}: {res['conversations_per_sec']} sohbet/sn, "
+              f"p95={res['request_latency']['p95']} sn, yeniden deneme={res['retries']}, "
+              f"RSS={res['peak_rss_mb']} MB")
+        results.append(res)
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": asdict(cfg),
+        },
+        "results": results,
+    }
+
+
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="llm_infer verim kıyaslaması (sahte LLM).")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--latency", type=float, default=0.05, help="Ortalama istek gecikmesi (saniye)")
+    ap.add_argument("--latency-dist", default="lognormal", choices=["fixed", "uniform", "exponential", "lognormal"])
+    ap.add_argument("--latency-sigma", type=float, default=0.5)
+    ap.add_argument("--error-rate", type=float, default=0.0, help="HTTP 500 oranı")
+    ap.add_argument("--rate-limit-rate", type=float, default=0.0, help="HTTP 429 oranı")
+    ap.add_argument("--retry-after", type=float, default=0.05, help="429 yanıtındaki Retry-After (saniye)")
+    ap.add_argument("--malformed-rate", type=float, default=0.0, help="Bozuk JSON yanıt oranı")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--max-tokens", type=int, default=None)
+    ap.add_argument("--batch-size", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="outputs/bench/llm_bench.json")
+    return ap.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    cfg = BenchConfig(
+        latency=args.latency,
+        latency_dist=args.latency_dist,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        malformed_rate=args.malformed_rate,
+        concurrency=args.concurrency,
+        max_tokens=args.max_tokens,
+        batch_size=args.batch_size,
+        seed=args.seed,
+    )
+    report = run_suite(args.sizes, cfg)
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"[OK] Kıyaslama sonuçları yazıldı: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
-import json
 import pandas as pd
 import os
 
+from metrics_core import FIELDS, parse_prediction, snap_predictions
+
 # 'trendyol_mila.xlsx' dosyasının içindeki 'sohbetler' sayfasını okuma
 df_truth = pd.read_excel(os.path.join('outputs', 'trendyol_mila.xlsx'), sheet_name='sohbetler')
 
@@ -11,53 +12,40 @@ df_preds = pd.read_csv(os.path.join('outputs', 'preds_mila_turfix.csv'))
 # Kolon isimlerini birleştirme için eşitleme
 df_preds = df_preds.rename(columns={'conversation_id': 'sohbet_id'})
 
-# Tahmin JSON'larını ayrıştırma ve yeni sütunlar oluşturma
-def parse_prediction(pred_json):
-    try:
-        data = json.loads(pred_json)
-        return pd.Series({
-            'pred_yanit_durumu': data.get('yanit_durumu'),
-            'pred_sentiment': data.get('sentiment'),
-            'pred_tur': data.get('tur'),
-            'pred_intent': data.get('intent'),
-            'pred_intent_detay': data.get('intent_detay')
-        })
-    except json.JSONDecodeError:
-        return pd.Series({
-            'pred_yanit_durumu': None,
-            'pred_sentiment': None,
-            'pred_tur': None,
-            'pred_intent': None,
-            'pred_intent_detay': None
-        })
-
-# 'prediction' sütunundaki JSON verisini yeni sütunlara dönüştür
-# Eğer prediction sütununuz yoksa ve doğrudan JSON objesi varsa,
-# 'df_preds' yerine doğrudan JSON'a apply yapabilirsiniz.
+# 'prediction' sütunundaki JSON verisini pred_* sütunlarına dönüştür
+# (metrics_core.parse_prediction: bozuk/hatalı tahmin {"error": ...} → boş)
 if 'prediction' in df_preds.columns:
-    parsed_preds = df_preds['prediction'].apply(parse_prediction)
-    df_preds = pd.concat([df_preds, parsed_preds], axis=1)
+    parsed_preds = pd.DataFrame([parse_prediction(v) for v in df_preds['prediction']], index=df_preds.index)
+    parsed_preds = parsed_preds.reindex(columns=[name for name, _, _ in FIELDS]).add_prefix('pred_')
+    df_preds = pd.concat([df_preds.drop(columns=parsed_preds.columns, errors='ignore'), parsed_preds], axis=1)
 
 # Verileri sohbet_id üzerinden birleştirme
 df_merged = pd.merge(df_truth, df_preds, on='sohbet_id', how='inner')
 
+# Gold kolonlarını ortak adlandırmaya çevir; tahminleri gold etiketlerine eşle
+# ("notr" → "Nötr", "Kargoo" → "Kargo"; yazım farkı yanlış sınıf sayılmaz, bkz. label_norm)
+df_merged = df_merged.rename(columns={name: gcol for name, gcol, _ in FIELDS})
+df_merged, changed = snap_predictions(df_merged)
+if changed:
+    print("[labels] gold etiketine eşlenen tahmin: " + " ".join(f"{k}={v}" for k, v in changed.items()))
+
 # Accuracy (Doğruluk) hesaplama
 total_conversations = len(df_merged)
 
 # Her bir kategori için doğruluk hesaplama
-yanit_durumu_accuracy = (df_merged['yanit_durumu'] == df_merged['pred_yanit_durumu']).mean() * 100
-sentiment_accuracy = (df_merged['sentiment'] == df_merged['pred_sentiment']).mean() * 100
-tur_accuracy = (df_merged['tur'] == df_merged['pred_tur']).mean() * 100
-intent_accuracy = (df_merged['intent'] == df_merged['pred_intent']).mean() * 100
-intent_detay_accuracy = (df_merged['intent_detay'] == df_merged['pred_intent_detay']).mean() * 100
+yanit_durumu_accuracy = (df_merged['gold_yanit_durumu'] == df_merged['pred_yanit_durumu']).mean() * 100
+sentiment_accuracy = (df_merged['gold_sentiment'] == df_merged['pred_sentiment']).mean() * 100
+tur_accuracy = (df_merged['gold_tur'] == df_merged['pred_tur']).mean() * 100
+intent_accuracy = (df_merged['gold_intent'] == df_merged['pred_intent']).mean() * 100
+intent_detay_accuracy = (df_merged['gold_intent_detay'] == df_merged['pred_intent_detay']).mean() * 100
 
 # Toplam doğruluk (tüm etiketlerin aynı olduğu durum)
 all_correct = (
-    (df_merged['yanit_durumu'] == df_merged['pred_yanit_durumu']) &
-    (df_merged['sentiment'] == df_merged['pred_sentiment']) &
-    (df_merged['tur'] == df_merged['pred_tur']) &
-    (df_merged['intent'] == df_merged['pred_intent']) &
-    (df_merged['intent_detay'] == df_merged['pred_intent_detay'])
+    (df_merged['gold_yanit_durumu'] == df_merged['pred_yanit_durumu']) &
+    (df_merged['gold_sentiment'] == df_merged['pred_sentiment']) &
+    (df_merged['gold_tur'] == df_merged['pred_tur']) &
+    (df_merged['gold_intent'] == df_merged['pred_intent']) &
+    (df_merged['gold_intent_detay'] == df_merged['pred_intent_detay'])
 )
 overall_accuracy = all_correct.mean() * 100
 
@@ -4,19 +4,32 @@ Veri yükleme yardımcıları.
 
 - load_conversations(in_json): model girişleri ve gold etiketleriyle DataFrame üretir.
   Zaman bilgisi kolonları (sohbet_baslangic, sohbet_bitis, toplam_sure_saniye) eklenir (varsa parse edilir).
+- iter_conversations(in_json, chunksize): aynı kolonları parça parça (DataFrame chunk'ları) üretir;
+  dosya belleğe tek seferde alınmaz. JSON dizi / JSONL ayrımı ilk boşluk-dışı karakterden yapılır,
+  JSON diziler de akış hâlinde (eleman eleman) çözülür. Çıktı doğrudan çıkarım katmanına verilebilir.
 - build_allowed_intents(df): gold_intent kolonundan izinli intent listesini üretir (fallback sabit liste).
 
+Kayıt şemaları:
+  - {conversation_id, dialog_text | messages[{role, text}], gold_*, sohbet_baslangic, sohbet_bitis}
+  - json_to_xlsx şeması: {sohbet_id, mesajlar[{sender, text, timestamp}], intent, sentiment, ...};
+    öneksiz etiketler gold_* olarak, ilk/son mesaj zamanı başlangıç/bitiş olarak alınır
+    (bkz. `synth_data` ile üretilen sentetik veri setleri).
+
 Not:
   Verinizin alan isimleri farklı olabilir; 'dialog_text', 'conversation_id', 'gold_*' alanları yoksa
   makul varsayılanlarla doldurulur (boş/NaN kalabilir). Pipeline bu durumda yine çalışır.
 """
 from __future__ import annotations
 from pathlib import Path
-from typing import List, Any, Dict
+from typing import List, Any, Dict, Iterator, Optional, TextIO, Tuple
 import json
 from datetime import datetime
+from itertools import islice
+import numpy as np
 import pandas as pd
 
+from profiling import span, traced
+
 # Bu sabit liste, gold_intent yoksa fallback olarak kullanılır
 INTENT_FALLBACK = [
     "Eksik ürün","Şifre sıfırlama","İade","Kupon","İptal","Stok","Ödeme","Kargo",
@@ -25,13 +38,16 @@ INTENT_FALLBACK = [
 ]
 
 # ---------- yardımcı: zaman alanları ----------
+# Denenecek formatlar (sıra önemli: ilk eşleşen kazanır)
+_DT_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M",
+               "%d.%m.%Y %H:%M", "%d/%m/%Y %H:%M")
+
 def _safe_parse_dt(x):
     if x is None or (isinstance(x, float) and pd.isna(x)):
         return None
     s = str(x).strip()
     # yaygın formatları dene
-    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M",
-                "%d.%m.%Y %H:%M", "%d/%m/%Y %H:%M"):
+    for fmt in _DT_FORMATS:
         try:
             return datetime.strptime(s, fmt)
         except Exception:
@@ -42,14 +58,62 @@ def _safe_parse_dt(x):
     except Exception:
         return None
 
+def _parse_dt_col(col: pd.Series) -> Tuple[np.ndarray, Dict[int, datetime]]:
+    """
+    `_safe_parse_dt`'nin vektörel karşılığı.
+    Her format tüm kolona tek `pd.to_datetime(format=..., errors="coerce")` çağrısıyla uygulanır;
+    bir sonraki format yalnızca hâlâ çözülemeyen satırlara denenir. Hiçbir formata uymayan
+    (ISO varyantları, saat dilimli, pandas aralığı dışı vb.) az sayıdaki satır skaler
+    `_safe_parse_dt` ile çözülür — böylece sonuç skaler yolla birebir aynı kalır.
+    :return: (datetime64[us] dizi; çözülemeyen yerlerde NaT,
+              {pozisyon: datetime} skaler yoldan çözülen satırlar)
+    """
+    vals = col.to_numpy(dtype=object)
+    parsed = np.full(len(vals), np.datetime64("NaT"), dtype="datetime64[us]")
+    pos = np.flatnonzero(~pd.isna(vals))
+    strs = pd.Series(vals[pos], dtype=object).astype(str).str.strip()
+    # pd.to_datetime %S'de 60/61'i (artık saniye) kabul edip dakikaya taşır, strptime reddeder
+    # → bu değerler skaler yola bırakılır (bkz. json_to_xlsx._to_datetime_col)
+    leap = strs.str.contains(r":6[01](?!\d)", regex=True).to_numpy(bool)
+    extra_pos, extra_strs = pos[leap], strs[leap]
+    pos, strs = pos[~leap], strs[~leap]
+
+    for fmt in _DT_FORMATS:
+        if len(pos) == 0:
+            break
+        got = pd.to_datetime(strs, format=fmt, errors="coerce")
+        ok = got.notna().to_numpy()
+        if ok.any():
+            parsed[pos[ok]] = got[ok].to_numpy().astype("datetime64[us]")
+            pos, strs = pos[~ok], strs[~ok]
+
+    extra: Dict[int, datetime] = {}
+    for p, x in zip(pos.tolist() + extra_pos.tolist(), strs.tolist() + extra_strs.tolist()):
+        dt = _safe_parse_dt(x)
+        if dt is not None:
+            extra[p] = dt
+    return parsed, extra
+
+def _like_map(values: np.ndarray, index: pd.Index, empty_dtype=object) -> pd.Series:
+    """
+    Nesne dizisinden, `Series.map` sonucu ile aynı dtype çıkarımını yapan Series üretir
+    (boş girdide map kaynak kolonun dtype'ını koruduğu için `empty_dtype` kullanılır).
+    """
+    if len(values) == 0:
+        return pd.Series(index=index, dtype=empty_dtype)
+    return pd.Series(values.tolist(), index=index)
+
+@traced("data_load.time_cols")
 def _add_time_cols(df: pd.DataFrame) -> pd.DataFrame:
     """
     Veri setinde zaman alanları varsa parse eder ve standart kolonları ekler:
     - sohbet_baslangic, sohbet_bitis (string)
     - toplam_sure_saniye (int)
     Eğer veri setinde zaman alanı yoksa kolonlar None/NaN olarak eklenir (yönerge uyumu için).
+    Parse, süre ve biçimlendirme kolon bazında vektörel yapılır (bkz. `_parse_dt_col`).
     """
     df = df.copy()
+    n = len(df)
 
     # Veri kaynaklarına göre muhtemel kolon isimleri
     start_candidates = ["sohbet_baslangic","start_ts","conversation_start","baslangic","start_time"]
@@ -58,27 +122,16 @@ def _add_time_cols(df: pd.DataFrame) -> pd.DataFrame:
     start_col = next((c for c in start_candidates if c in df.columns), None)
     end_col   = next((c for c in end_candidates if c in df.columns), None)
 
-    if start_col:
-        df["__start_dt"] = df[start_col].map(_safe_parse_dt)
-    else:
-        df["__start_dt"] = None
-
-    if end_col:
-        df["__end_dt"] = df[end_col].map(_safe_parse_dt)
-    else:
-        df["__end_dt"] = None
-
-    # süre
-    def _dur_seconds(row):
-        a, b = row["__start_dt"], row["__end_dt"]
-        if a and b:
-            try:
-                return int((b - a).total_seconds())
-            except Exception:
-                return None
-        return None
+    no_dt = (np.full(n, np.datetime64("NaT"), dtype="datetime64[us]"), {})
+    start_dt, start_extra = _parse_dt_col(df[start_col]) if start_col else no_dt
+    end_dt, end_extra     = _parse_dt_col(df[end_col]) if end_col else no_dt
 
-    df["toplam_sure_saniye"] = df.apply(_dur_seconds, axis=1)
+    # süre: (bitiş - başlangıç) saniye, sıfıra doğru kırpılmış (int(total_seconds()) ile aynı)
+    both = ~np.isnat(start_dt) & ~np.isnat(end_dt)
+    us = (end_dt - start_dt).astype(np.int64)
+    secs = np.sign(us) * (np.abs(us) // 1_000_000)
+    dur = np.full(n, None, dtype=object)
+    dur[both] = secs[both].astype(object)
 
     def _fmt(x):
         try:
@@ -86,43 +139,166 @@ def _add_time_cols(df: pd.DataFrame) -> pd.DataFrame:
         except Exception:
             return None
 
-    df["sohbet_baslangic"] = df["__start_dt"].map(_fmt)
-    df["sohbet_bitis"]     = df["__end_dt"].map(_fmt)
+    def _fmt_col(vec: np.ndarray, extra: Dict[int, datetime]) -> np.ndarray:
+        out = np.full(n, None, dtype=object)
+        ok = ~np.isnat(vec)
+        # "YYYY-MM-DDTHH:MM" → "YYYY-MM-DD HH:MM" (strftime'tan çok daha hızlı);
+        # 1000 öncesi yıllar strftime'da sıfır dolgusuz yazıldığı için skaler yoldan
+        old = ok & (vec < np.datetime64("1000-01-01"))
+        ok &= ~old
+        if ok.any():
+            iso = pd.Series(np.datetime_as_string(vec[ok], unit="m"), dtype=object)
+            out[ok] = iso.str.replace("T", " ", regex=False).to_numpy(dtype=object)
+        for p in np.flatnonzero(old).tolist():
+            out[p] = _fmt(pd.Timestamp(vec[p]).to_pydatetime())
+        for p, dt in extra.items():
+            out[p] = _fmt(dt)
+        return out
+
+    # skaler yoldan çözülen (nadir) satırlar: süre, orijinal datetime aritmetiğiyle
+    def _as_py(vec: np.ndarray, extra: Dict[int, datetime], p: int):
+        if p in extra:
+            return extra[p]
+        return None if np.isnat(vec[p]) else pd.Timestamp(vec[p]).to_pydatetime()
+
+    for p in set(start_extra) | set(end_extra):
+        a, b = _as_py(start_dt, start_extra, p), _as_py(end_dt, end_extra, p)
+        dur[p] = None
+        if a and b:
+            try:
+                dur[p] = int((b - a).total_seconds())
+            except Exception:
+                pass
+
+    start_dtype = df[start_col].dtype if start_col else object
+    end_dtype   = df[end_col].dtype if end_col else object
+    df["toplam_sure_saniye"] = _like_map(dur, df.index, float)
+    df["sohbet_baslangic"] = _like_map(_fmt_col(start_dt, start_extra), df.index, start_dtype)
+    df["sohbet_bitis"]     = _like_map(_fmt_col(end_dt, end_extra), df.index, end_dtype)
 
-    return df.drop(columns=["__start_dt","__end_dt"], errors="ignore")
+    return df
 
 # ---------- JSON okuma ----------
-def _load_json_any(path: Path) -> List[Dict[str, Any]]:
+_READ_BLOCK = 1 << 20  # 1 MB
+
+def _first_non_ws(f: TextIO) -> str:
+    """Dosyadaki ilk boşluk-dışı karakteri döndürür (dosya boşsa ""); okuma konumu başa alınır."""
+    ch = ""
+    while True:
+        block = f.read(4096)
+        if not block:
+            break
+        stripped = block.lstrip()
+        if stripped:
+            ch = stripped[0]
+            break
+    f.seek(0)
+    return ch
+
+def _iter_json_array(f: TextIO) -> Iterator[Any]:
     """
-    Tek JSON (liste) ya da JSONL (her satır bir JSON) dosyasını okur.
+    `[ {...}, {...}, ... ]` biçimli dosyayı eleman eleman çözer; tüm dizi belleğe alınmaz.
+    Bozuk içerikte json.JSONDecodeError fırlatır.
     """
-    raw = Path(path).read_text(encoding="utf-8").strip()
-    if not raw:
-        return []
-    # JSON array
-    if raw.startswith("["):
-        try:
-            data = json.loads(raw)
-            if isinstance(data, list):
-                return data
-        except Exception:
-            pass
-    # JSONL
-    recs: List[Dict[str, Any]] = []
-    for line in raw.splitlines():
+    dec = json.JSONDecoder()
+    buf = f.read(_READ_BLOCK).lstrip()
+    eof = False
+    if not buf.startswith("["):
+        raise json.JSONDecodeError("JSON dizi bekleniyordu", buf, 0)
+    pos = 1
+    expect_value = True
+
+    while True:
+        # boşlukları ve ayırıcıyı atla; gerekirse tampona ekle
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            more = f.read(_READ_BLOCK)
+            if not more:
+                eof = True
+            buf, pos = buf[pos:] + more, 0
+
+        if pos >= len(buf):
+            raise json.JSONDecodeError("JSON dizi kapanmadan dosya bitti", buf, pos)
+        ch = buf[pos]
+        if ch == "]":
+            return
+        if ch == ",":
+            if expect_value:
+                raise json.JSONDecodeError("Beklenmeyen ','", buf, pos)
+            pos += 1
+            expect_value = True
+            continue
+        if not expect_value:
+            raise json.JSONDecodeError("',' veya ']' bekleniyordu", buf, pos)
+
+        # tek elemanı çöz; tampon yetmiyorsa blok ekleyip yeniden dene
+        while True:
+            try:
+                obj, end = dec.raw_decode(buf, pos)
+                if end < len(buf) or eof:
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            more = f.read(_READ_BLOCK)
+            if not more:
+                eof = True
+            buf, pos = buf[pos:] + more, 0
+        yield obj
+        pos = end
+        expect_value = False
+        # tüketilen kısmı at (tampon büyümesin)
+        if pos > _READ_BLOCK:
+            buf, pos = buf[pos:], 0
+
+def _iter_jsonl(f: TextIO) -> Iterator[Dict[str, Any]]:
+    """Her satırı ayrı JSON olarak okur; boş/bozuk ve sözlük olmayan satırları atlar."""
+    for line in f:
         line = line.strip()
         if not line:
             continue
         try:
             obj = json.loads(line)
             if isinstance(obj, dict):
-                recs.append(obj)
+                yield obj
         except Exception:
             # boş/bozuk satırı atla
             continue
-    return recs
+
+def _iter_json_records(path: Path) -> Iterator[Any]:
+    """
+    Tek JSON (liste) ya da JSONL (her satır bir JSON) dosyasını kayıt kayıt üretir.
+    İlk boşluk-dışı karakter '[' ise dizi akış hâlinde çözülür; daha ilk eleman çözülemeden
+    hata alınırsa (ör. tek satırlık JSONL) JSONL olarak okunmaya geri dönülür.
+    """
+    with Path(path).open("r", encoding="utf-8-sig") as f:
+        if _first_non_ws(f) == "[":
+            yielded = False
+            try:
+                for obj in _iter_json_array(f):
+                    yielded = True
+                    yield obj
+                return
+            except json.JSONDecodeError:
+                if yielded:
+                    raise
+            f.seek(0)
+        yield from _iter_jsonl(f)
+
+def _load_json_any(path: Path) -> List[Dict[str, Any]]:
+    """
+    Tek JSON (liste) ya da JSONL (her satır bir JSON) dosyasını okur.
+    """
+    return list(_iter_json_records(path))
 
 # ---------- konuşma metni toparlama ----------
+def _messages(rec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Mesaj listesi: 'messages' / 'dialog' / 'turns' ya da json_to_xlsx şemasındaki 'mesajlar'."""
+    return rec.get("messages") or rec.get("dialog") or rec.get("turns") or rec.get("mesajlar") or []
+
 def _coalesce_dialog(rec: Dict[str, Any]) -> str:
     """
     'dialog_text' alanı rekte yoksa, 'messages' gibi yapıdan birleştir.
@@ -131,10 +307,10 @@ def _coalesce_dialog(rec: Dict[str, Any]) -> str:
     if "dialog_text" in rec and rec["dialog_text"]:
         return str(rec["dialog_text"])
 
-    msgs = rec.get("messages") or rec.get("dialog") or rec.get("turns") or []
+    msgs = _messages(rec)
     out_lines: List[str] = []
     for m in msgs:
-        role = str(m.get("role") or m.get("speaker") or "").strip().lower()
+        role = str(m.get("role") or m.get("speaker") or m.get("sender") or "").strip().lower()
         text = str(m.get("text") or m.get("content") or "").strip()
         if not text:
             continue
@@ -147,54 +323,105 @@ def _coalesce_dialog(rec: Dict[str, Any]) -> str:
         out_lines.append(f"{tag} {text}")
     return "\n".join(out_lines).strip()
 
-# ---------- public API ----------
-def load_conversations(in_json: str) -> pd.DataFrame:
+# ---------- kayıt → DataFrame ----------
+_PREFER_COLS = [
+    "conversation_id", "dialog_text",
+    "sohbet_baslangic", "sohbet_bitis", "toplam_sure_saniye",
+    "gold_sentiment", "gold_intent", "gold_yanit_durumu", "gold_tur", "gold_intent_detay",
+]
+
+@traced("data_load.records_to_frame")
+def _records_to_frame(records: List[Dict[str, Any]], offset: int = 0) -> pd.DataFrame:
     """
-    JSON/JSONL dosyadan temel kolonları üretir:
-      - conversation_id
-      - dialog_text
-      - gold_sentiment, gold_intent, gold_yanit_durumu, gold_tur, (opsiyonel) gold_intent_detay
-    + yönerge gereği zaman kolonları:
-      - sohbet_baslangic, sohbet_bitis, toplam_sure_saniye
+    Ham kayıtlardan standart kolonları üretir. `offset`, id'si olmayan kayıtlara verilecek
+    sıra numarasının başlangıcıdır (parça parça okumada genel sırayı korumak için).
     """
-    path = Path(in_json)
-    if not path.exists():
-        raise SystemExit(f"[ERR] Veri dosyası bulunamadı: {path.resolve()}")
-
-    records = _load_json_any(path)
     rows: List[Dict[str, Any]] = []
-    for i, rec in enumerate(records):
-        rid = rec.get("conversation_id") or rec.get("id") or rec.get("cid") or i
+    for i, rec in enumerate(records, start=offset):
+        rid = rec.get("conversation_id") or rec.get("id") or rec.get("cid") or rec.get("sohbet_id") or i
         dialog_text = _coalesce_dialog(rec)
+        msgs = _messages(rec)
 
         row = {
             "conversation_id": rid,
             "dialog_text": dialog_text,
-            # gold alanları varsa çek
-            "gold_sentiment": rec.get("gold_sentiment"),
-            "gold_intent": rec.get("gold_intent"),
-            "gold_yanit_durumu": rec.get("gold_yanit_durumu"),
-            "gold_tur": rec.get("gold_tur"),
-            "gold_intent_detay": rec.get("gold_intent_detay"),
-            # olası zaman alanlarını geçici taşı (parse için)
-            "sohbet_baslangic": rec.get("sohbet_baslangic") or rec.get("start_ts") or rec.get("conversation_start"),
-            "sohbet_bitis": rec.get("sohbet_bitis") or rec.get("end_ts") or rec.get("conversation_end"),
+            # gold alanları varsa çek (json_to_xlsx şemasında etiketler öneksiz: 'intent', 'sentiment', ...)
+            "gold_sentiment": rec.get("gold_sentiment", rec.get("sentiment")),
+            "gold_intent": rec.get("gold_intent", rec.get("intent")),
+            "gold_yanit_durumu": rec.get("gold_yanit_durumu", rec.get("yanit_durumu")),
+            "gold_tur": rec.get("gold_tur", rec.get("tur")),
+            "gold_intent_detay": rec.get("gold_intent_detay", rec.get("intent_detay")),
+            # olası zaman alanlarını geçici taşı (parse için); yoksa ilk/son mesaj zamanı
+            "sohbet_baslangic": rec.get("sohbet_baslangic") or rec.get("start_ts") or rec.get("conversation_start")
+                                or (msgs[0].get("timestamp") if msgs else None),
+            "sohbet_bitis": rec.get("sohbet_bitis") or rec.get("end_ts") or rec.get("conversation_end")
+                            or (msgs[-1].get("timestamp") if msgs else None),
         }
         rows.append(row)
 
+    if not rows:
+        return pd.DataFrame(columns=_PREFER_COLS)
+
     df = pd.DataFrame(rows)
 
     # Zaman sütunları ekle/parse et
     df = _add_time_cols(df)
 
     # Kolon sırasını okunur kıl
-    prefer = [
-        "conversation_id", "dialog_text",
-        "sohbet_baslangic", "sohbet_bitis", "toplam_sure_saniye",
-        "gold_sentiment", "gold_intent", "gold_yanit_durumu", "gold_tur", "gold_intent_detay",
-    ]
-    rest = [c for c in df.columns if c not in prefer]
-    df = df[prefer + rest]
+    rest = [c for c in df.columns if c not in _PREFER_COLS]
+    df = df[_PREFER_COLS + rest]
+    return df
+
+def _require_file(in_json: str) -> Path:
+    path = Path(in_json)
+    if not path.exists():
+        raise SystemExit(f"[ERR] Veri dosyası bulunamadı: {path.resolve()}")
+    return path
+
+# ---------- public API ----------
+def iter_conversations(in_json: str, chunksize: int = 10_000) -> Iterator[pd.DataFrame]:
+    """
+    `load_conversations` ile aynı kolonlara sahip DataFrame parçaları üretir (her biri en fazla
+    `chunksize` satır). Dosya akış hâlinde okunur; bellek kullanımı parça boyutuyla sınırlıdır.
+    """
+    records = _iter_json_records(_require_file(in_json))
+    offset = 0
+    while True:
+        with span("data_load.json_parse"):
+            chunk = list(islice(records, chunksize))
+        if not chunk:
+            break
+        yield _records_to_frame(chunk, offset)
+        offset += len(chunk)
+
+def load_conversations(in_json: str, chunksize: Optional[int] = None) -> pd.DataFrame:
+    """
+    JSON/JSONL dosyadan temel kolonları üretir:
+      - conversation_id
+      - dialog_text
+      - gold_sentiment, gold_intent, gold_yanit_durumu, gold_tur, (opsiyonel) gold_intent_detay
+    + yönerge gereği zaman kolonları:
+      - sohbet_baslangic, sohbet_bitis, toplam_sure_saniye
+    `chunksize` verilirse DataFrame parça parça kurulur (bkz. `iter_conversations`); kolon
+    dtype'ları parça sınırlarından bağımsız olarak tek seferde kurulmuş tabloyla aynıdır.
+    """
+    if not chunksize:
+        path = _require_file(in_json)
+        with span("data_load.json_parse"):
+            records = _load_json_any(path)
+        return _records_to_frame(records)
+
+    frames = list(iter_conversations(in_json, chunksize=chunksize))
+    if not frames:
+        return _records_to_frame([])
+    if len(frames) == 1:
+        return frames[0]
+    df = pd.concat(frames, ignore_index=True)
+    # dtype çıkarımı parça başına yapılır (örn. tümü None olan parçada toplam_sure_saniye object,
+    # diğerlerinde float64) → parçalar arasında farklı olan kolonlar birleşik değerlerden yeniden çıkarılır
+    for col in df.columns:
+        if len({f[col].dtype for f in frames}) > 1:
+            df[col] = pd.Series(df[col].tolist(), index=df.index)
     return df
 
 def build_allowed_intents(df: pd.DataFrame) -> List[str]:
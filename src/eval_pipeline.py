@@ -2,12 +2,25 @@
 """
 Uçtan uca değerlendirme pipeline'ı
 ----------------------------------
-Adımlar:
-  1) JSON/JSONL veri setini yükle (load_conversations)
-  2) Allowed intent listesini hazırla (gold'a göre)
-  3) LLM tahminlerini üret ve CSV'ye yaz (predict_conversations)
-  4) Gold + pred birleştir
-  5) Excel ve confusion çıktıları oluştur (write_excel_report, save_confusions)
+Aşamalar (bkz. `stage_runner`; her aşama girdileri + ayarlarından parmak izi alır, güncel olanlar atlanır):
+  1) load       JSON/JSONL veri setini yükle (load_conversations) → <work-dir>/conversations.<fmt>
+  2) candidates Heuristik intent adayları (find_candidates_batch) → <work-dir>/candidates.<fmt>
+  3) predict    LLM tahminlerini üret (predict_conversations; allowed intent listesi gold'dan;
+                gold'a karşı canlı metrikler, --abort-below ile belirgin gerilemede erken durdurma;
+                --max-tokens ile uzun sohbetler token bütçesine sığdırılır)
+  4) merge      Gold + pred (+ adaylar) birleştir; tahmin JSON'u pred_* kolonlarına açılır
+  5) metrics    Excel ve confusion çıktıları (write_excel_report, save_confusions;
+                --bootstrap B > 0 ise metriklere bootstrap güven aralıkları eklenir)
+  6) reports    PDF raporları (generate_reports; yalnızca --reports-dir verilirse)
+
+- Yalnızca değişen aşama ve ona bağlı olanlar yeniden çalışır: prompt değişirse load/candidates
+  atlanır; ham JSON yeniden parse edilmez. Yanıt önbelleği (varsayılan <work-dir>/llm_cache.sqlite)
+  sayesinde (model, prompt, sohbet) üçlüsü değişmeyen sohbetler API'ye tekrar gitmez.
+- `--force predict reports` (ya da `--force all`) ile aşamalar zorla yeniden çalıştırılır;
+  `--until merge` ile belirtilen aşamadan sonra durulur.
+- `--profile [YOL]` ile her aşama ve alt adımları (JSON parse, prompt kurma, ağ, doğrulama, Excel/PDF
+  yazımı…) duvar/CPU süresiyle (`--profile-alloc`: bellek ayırma farkıyla) ölçülür; Chrome trace JSON'u
+  ve özet tablo yazılır (bkz. profiling).
 
 Örnek:
   python src/eval_pipeline.py --in-json data/raw/20-sohbet-trendyol-mila.json \
@@ -15,48 +28,187 @@ Adımlar:
     --pred-out outputs/predictions/preds_mila.csv \
     --excel-out outputs/eval/mila_eval.xlsx \
     --cm-dir outputs/eval/confusions \
-    --model gpt-5-nano
+    --model gpt-5-nano \
+    --reports-dir deliverables
 """
 import argparse
+from datetime import datetime
 from pathlib import Path
+from typing import Dict
 import pandas as pd
 
-from data_load import load_conversations, build_allowed_intents
-from llm_infer import predict_conversations
-from metrics_eval import write_excel_report, save_confusions
+from artifacts import conform, read_table, require_pyarrow, write_table
+from profiling import DEFAULT_TRACE, session
+from stage_runner import Stage, StageRunner
 
-def main():
+def _parse_args() -> argparse.Namespace:
     ap = argparse.ArgumentParser()
     ap.add_argument("--in-json", required=True, help="data/raw/20-sohbet-trendyol-mila.json")
     ap.add_argument("--prompt", default="src/prompt_template.txt")
     ap.add_argument("--pred-out", default="outputs/predictions/preds_mila.csv")
     ap.add_argument("--excel-out", default="outputs/eval/mila_eval.xlsx")
     ap.add_argument("--cm-dir", default="outputs/eval/confusions")
+    ap.add_argument("--eval-data-out", default=None,
+                    help="Birleşik veri yolu (varsayılan: <work-dir>/eval.<fmt>)")
+    ap.add_argument("--reports-dir", default=None, help="Verilirse PDF raporları bu klasöre üretilir")
+    ap.add_argument("--project", default="Trendyol Mila Sohbet Botu")
+    ap.add_argument("--prepared-by", default="Analist")
+    ap.add_argument("--report-jobs", type=int, default=1, help="PDF'leri eşzamanlı üreten süreç sayısı")
     ap.add_argument("--model", default=None, help="gpt-5-nano | gpt-4o-mini | gpt-4.1-mini")
-    args = ap.parse_args()
+    ap.add_argument("--concurrency", type=int, default=1, help="Aynı anda uçuşta tutulacak istek sayısı")
+    ap.add_argument("--rpm", type=float, default=None, help="Dakikadaki istek sınırı (profil geçersiz kılma)")
+    ap.add_argument("--tpm", type=float, default=None, help="Dakikadaki token sınırı (profil geçersiz kılma)")
+    ap.add_argument("--no-rate-limit", action="store_true", help="İstemci tarafı hız sınırlamayı kapat")
+    ap.add_argument("--resume", action="store_true", help="Tahmin checkpoint'inden kaldığı yerden devam et")
+    ap.add_argument("--cache", default=None,
+                    help="Kalıcı LLM yanıt önbelleği (SQLite) yolu (varsayılan: <work-dir>/llm_cache.sqlite)")
+    ap.add_argument("--no-cache", action="store_true", help="Yanıt önbelleğini kullanma")
+    ap.add_argument("--cache-max-age-days", type=float, default=None)
+    ap.add_argument("--cache-max-mb", type=float, default=None)
+    ap.add_argument("--abort-below", type=float, default=None,
+                    help="Canlı metrik (--abort-metric) bu değerin altına düşerse tahmini erken durdur")
+    ap.add_argument("--abort-metric", default="triple_correct")
+    ap.add_argument("--max-tokens", type=int, default=None,
+                    help="İstek başına token bütçesi; aşan uzun sohbetlerin ortası kırpılır")
+    ap.add_argument("--keep-last-turns", type=int, default=6, help="Kırpmada korunacak son tur sayısı")
+    ap.add_argument("--batch-size", type=int, default=1, help="Tek istekte sınıflandırılacak sohbet sayısı")
+    ap.add_argument("--bootstrap", type=int, default=0,
+                    help="Güven aralıkları için bootstrap örnek sayısı (varsayılan 0 = kapalı; örn. 1000)")
+    ap.add_argument("--candidates-top-k", type=int, default=5)
+    ap.add_argument("--work-dir", default="outputs/stages", help="Aşama ara çıktıları ve manifest klasörü")
+    ap.add_argument("--stage-format", default="parquet", choices=["parquet", "arrow", "csv"],
+                    help="Ara çıktı biçimi (parquet/arrow için pyarrow gerekir; yoksa --stage-format csv)")
+    ap.add_argument("--force", nargs="*", default=[],
+                    help="Zorla yeniden çalıştırılacak aşamalar (load candidates predict merge metrics reports | all)")
+    ap.add_argument("--until", default=None, help="Bu aşamadan sonra dur")
+    ap.add_argument("--profile", nargs="?", const=DEFAULT_TRACE, default=None, metavar="TRACE_JSON",
+                    help=f"Aşama profilini aç; Chrome trace JSON'u + özet tablo yaz (varsayılan yol: {DEFAULT_TRACE})")
+    ap.add_argument("--profile-alloc", action="store_true",
+                    help="Profilde bellek ayırma farklarını da ölç (tracemalloc; koşuyu yavaşlatır)")
+    return ap.parse_args()
+
+def main():
+    args = _parse_args()
+    with session(args.profile, alloc=args.profile_alloc):
+        _run(args)
+
+def _run(args: argparse.Namespace) -> None:
+    prompt_path = Path(args.prompt)
+    if not prompt_path.exists():
+        raise SystemExit(f"[ERR] Prompt şablon dosyası bulunamadı: {prompt_path}")
+
+    work = Path(args.work_dir)
+    ext = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}[args.stage_format]
+    if args.stage_format != "csv":
+        require_pyarrow()  # LLM aşamasından sonra değil, koşu başında hata ver
+    conv_path = work / f"conversations{ext}"
+    cand_path = work / f"candidates{ext}"
+    eval_path = Path(args.eval_data_out) if args.eval_data_out else work / f"eval{ext}"
+
+    # Aşamalar arası tablolar: aynı koşuda bellekten, atlanan aşamalar için diskten (tembel)
+    tables: Dict[str, pd.DataFrame] = {}
+
+    def table(name: str, path: Path, kind: str) -> pd.DataFrame:
+        if name not in tables:
+            tables[name] = read_table(path, kind=kind)
+        return tables[name]
 
     # 1) Load data
-    df = load_conversations(args.in_json)
+    def run_load():
+        from data_load import load_conversations
+        df = conform(load_conversations(args.in_json), "conversations")
+        write_table(df, conv_path, kind="conversations")
+        tables["conversations"] = df
 
-    # 2) Allowed intents (gold set)
-    intents = build_allowed_intents(df)
+    # 2) Heuristik intent adayları (gold'dan türetilen allowed listesiyle)
+    def run_candidates():
+        from data_load import build_allowed_intents
+        from intent_candidates import find_candidates_batch
+        df = table("conversations", conv_path, "conversations")
+        batch = find_candidates_batch(df["dialog_text"].fillna(""), build_allowed_intents(df),
+                                      top_k=args.candidates_top_k)
+        cand = pd.DataFrame({
+            "conversation_id": df["conversation_id"],
+            "intent_candidates": ["; ".join(c) for c in batch.candidates],
+        })
+        write_table(cand, cand_path, kind="candidates")
+        tables["candidates"] = cand
 
     # 3) Predict (Structured Output; boşsa SystemExit ile durur)
-    predict_conversations(
-        df_convs=df,
-        prompt_template_path=args.prompt,
-        intents=intents,
-        out_path=args.pred_out,
-        model_override=args.model,
-    )
-
-    # 4) Merge gold + preds
-    pred = pd.read_csv(args.pred_out)
-    merged = df.merge(pred, on="conversation_id", how="left")
-
-    # 5) Reports
-    write_excel_report(merged, args.excel_out)
-    save_confusions(merged, args.cm_dir)
+    def run_predict():
+        from data_load import build_allowed_intents
+        from llm_infer import predict_conversations, open_cache
+        from prompt_budget import PromptBudget
+        from rate_limit import get_limiter
+        df = table("conversations", conv_path, "conversations")
+        cache_path = None if args.no_cache else (args.cache or str(work / "llm_cache.sqlite"))
+        Path(args.pred_out).parent.mkdir(parents=True, exist_ok=True)
+        predict_conversations(
+            conversations=df,
+            prompt_template=prompt_path.read_text(encoding="utf-8"),
+            intents=build_allowed_intents(df),
+            out_path=args.pred_out,
+            model=args.model,
+            concurrency=args.concurrency,
+            cache=open_cache(cache_path, args.cache_max_age_days, args.cache_max_mb),
+            resume=args.resume,
+            limiter=None if args.no_rate_limit else get_limiter(
+                args.model, rpm=args.rpm, tpm=args.tpm, max_concurrency=args.concurrency),
+            abort_below=args.abort_below,
+            abort_metric=args.abort_metric,
+            budget=PromptBudget(max_tokens=args.max_tokens, keep_last=args.keep_last_turns),
+            batch_size=args.batch_size,
+        )
+
+    # 4) Merge gold + preds (+ adaylar)
+    def run_merge():
+        from metrics_eval import expand_predictions
+        pred = read_table(args.pred_out, kind="predictions")
+        merged = (table("conversations", conv_path, "conversations")
+                  .merge(pred, on="conversation_id", how="left")
+                  .merge(table("candidates", cand_path, "candidates"), on="conversation_id", how="left"))
+        merged = expand_predictions(merged)
+        write_table(merged, eval_path, kind="eval")
+        tables["eval"] = merged
+
+    # 5) Excel + confusion
+    def run_metrics():
+        from metrics_eval import write_excel_report, save_confusions
+        merged = table("eval", eval_path, "eval")
+        write_excel_report(merged, args.excel_out, n_boot=args.bootstrap)
+        save_confusions(merged, args.cm_dir)
+
+    # 6) PDF raporları
+    def run_reports():
+        from generate_reports import Inputs, generate_all
+        inp = Inputs(
+            xlsx_path=eval_path,
+            preds_path=Path(args.pred_out),
+            outdir=Path(args.reports_dir),
+            project=args.project,
+            model=args.model or "",
+            prepared_by=args.prepared_by,
+            run_date=datetime.now().strftime("%Y-%m-%d"),
+        )
+        generate_all(inp, table("eval", eval_path, "eval"), n_boot=args.bootstrap, jobs=args.report_jobs)
+
+    runner = StageRunner(work / "stages.json", force=args.force)
+    runner.add(Stage("load", run_load, outputs=[conv_path], files=[Path(args.in_json)]))
+    runner.add(Stage("candidates", run_candidates, outputs=[cand_path], deps=["load"],
+                     config={"top_k": args.candidates_top_k}))
+    runner.add(Stage("predict", run_predict, outputs=[Path(args.pred_out)], deps=["load"],
+                     files=[prompt_path],
+                     config={"model": args.model, "max_tokens": args.max_tokens,
+                             "keep_last_turns": args.keep_last_turns, "batch_size": args.batch_size}))
+    runner.add(Stage("merge", run_merge, outputs=[eval_path], deps=["load", "candidates", "predict"]))
+    runner.add(Stage("metrics", run_metrics, outputs=[Path(args.excel_out), Path(args.cm_dir)], deps=["merge"],
+                     config={"bootstrap": args.bootstrap}))
+    if args.reports_dir:
+        runner.add(Stage("reports", run_reports, outputs=[Path(args.reports_dir) / "01_dogruluk_ozet.pdf"],
+                         deps=["merge"],
+                         config={"bootstrap": args.bootstrap, "project": args.project,
+                                 "prepared_by": args.prepared_by, "model": args.model}))
+    runner.run(until=args.until)
 
 if __name__ == "__main__":
     main()
@@ -2,25 +2,39 @@
 """
 Rapor üretim scripti (PDF)
 --------------------------
-- Girdi: mila_eval.xlsx (sheet=data), preds_mila.csv (opsiyonel)
+- Girdi: mila_eval.xlsx (sheet=data) ya da aynı verinin Parquet/Arrow kopyası
+         (mila_eval.parquet / .arrow; Excel parse maliyeti olmadan), preds_mila.csv (opsiyonel)
 - Çıktı: deliverables/ altında 5 PDF (Doğruluk Özeti, SWOT, Geliştirme Önerileri,
          Müşteri Talepleri Özeti, Teknik Notlar)
 
 Notlar:
 - Türkçe glifler için font kaydı (DejaVuSans → Arial → Helvetica fallback).
 - Tablolarda header bold, gövde regular; raporlar sade & anlaşılır.
+- Doğruluk özetinde bootstrap güven aralıkları (--bootstrap B; 0 = kapalı).
+- Metrikler ve confusion'lar bir kez hesaplanıp raporlara aktarılır; 5 PDF `--jobs N` ile süreç
+  havuzunda eşzamanlı üretilir (font kaydı, stil sayfası ve veri/metrik girdileri işçi başına bir
+  kez aktarılır; görevlere yalnızca rapor adı gönderilir).
+- Toplu (çok kiracılı) mod: `--manifest` ile (project, model, input, outdir) satırlarından oluşan
+  bir liste tek, uzun ömürlü süreçte işlenir; kiracılar `--jobs N` işçili havuza dağıtılır.
+  İçe aktarma ve font kaydı işçi başına bir kez ödenir. Manifest: .csv / .json (liste) / .jsonl;
+  opsiyonel kolonlar: prepared_by, preds, bootstrap. Hatalı kiracı diğerlerini durdurmaz.
+- `--profile [YOL]`: veri okuma, metrik hesabı ve rapor başına çizim süreleri Chrome trace JSON'u
+  + özet tablo olarak yazılır (bkz. profiling; havuz işçilerindeki bölümler kaydedilmez).
 
 Çalıştırma:
   python src/generate_reports.py --xlsx outputs/eval/mila_eval.xlsx \
     --preds outputs/predictions/preds_mila.csv --outdir deliverables \
     --project "Trendyol Mila Sohbet Botu" --model gpt-5-nano --prepared_by "Ad Soyad"
+  python src/generate_reports.py --manifest configs/weekly_tenants.csv --jobs 8
 """
 from __future__ import annotations
 import argparse
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
 import numpy as np
@@ -35,6 +49,11 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from pathlib import Path
 
+from artifacts import is_columnar, read_table
+from metrics_bootstrap import bootstrap_fields, bootstrap_proportion
+from metrics_core import acc_f1 as metrics_acc_f1
+from profiling import DEFAULT_TRACE, session, span, traced
+
 # --------------------------
 # Yardımcılar
 # --------------------------
@@ -82,6 +101,8 @@ class Metrics:
     tur_acc: float
     tur_f1: float
     triple_correct: float
+    # bootstrap güven aralıkları: alan → metrik → (düşük, yüksek); boşsa PDF'te gösterilmez
+    ci: Dict[str, Dict[str, Tuple[float, float]]] = field(default_factory=dict)
 
 @dataclass
 class ConfusionTop:
@@ -99,10 +120,14 @@ class Inputs:
     prepared_by: str
     run_date: str
 
+@traced("generate_reports.load_data")
 def load_data(xlsx_path: Path) -> pd.DataFrame:
-    """Excel'den 'data' sheet'ini okur; zorunlu kolonları kontrol eder."""
-    xl = pd.ExcelFile(xlsx_path)
-    df = pd.read_excel(xl, sheet_name="data")
+    """Excel'den 'data' sheet'ini (ya da .parquet/.arrow kopyasını) okur; zorunlu kolonları kontrol eder."""
+    if is_columnar(xlsx_path):
+        df = read_table(xlsx_path)
+    else:
+        xl = pd.ExcelFile(xlsx_path)
+        df = pd.read_excel(xl, sheet_name="data")
     needed = ["conversation_id","dialog_text","gold_sentiment","gold_intent",
               "gold_yanit_durumu","pred_sentiment","pred_intent","pred_yanit_durumu"]
     for col in needed:
@@ -110,27 +135,14 @@ def load_data(xlsx_path: Path) -> pd.DataFrame:
             raise SystemExit(f"Girdi sheet 'data' içinde beklenen kolon yok: {col}")
     return df
 
-def compute_basic_metrics(df: pd.DataFrame) -> Metrics:
-    """Basit Accuracy & Macro-F1 hesapları (küçük veri için güvenli)."""
+@traced("generate_reports.compute_basic_metrics")
+def compute_basic_metrics(df: pd.DataFrame, n_boot: int = 0) -> Metrics:
+    """
+    Accuracy & Macro-F1 (ortak `metrics_core`; gold+pred birlikte dolu satırlar).
+    `n_boot` > 0 ise bootstrap güven aralıkları da hesaplanır (`metrics_bootstrap`).
+    """
     def acc_f1(gold_col, pred_col):
-        m = df[gold_col].notna() & df[pred_col].notna()
-        g = df.loc[m, gold_col].astype(str)
-        p = df.loc[m, pred_col].astype(str)
-        if len(g)==0:
-            return 0.0, 0.0
-        acc = (g.values == p.values).mean()
-        classes = sorted(set(g.unique()) | set(p.unique()))
-        f1s = []
-        for c in classes:
-            tp = ((g==c) & (p==c)).sum()
-            fp = ((g!=c) & (p==c)).sum()
-            fn = ((g==c) & (p!=c)).sum()
-            prec = tp / (tp+fp) if (tp+fp)>0 else 0.0
-            rec  = tp / (tp+fn) if (tp+fn)>0 else 0.0
-            f1   = (2*prec*rec)/(prec+rec) if (prec+rec)>0 else 0.0
-            f1s.append(f1)
-        mf1 = float(np.mean(f1s)) if f1s else 0.0
-        return float(acc), float(mf1)
+        return metrics_acc_f1(df[gold_col], df[pred_col])
 
     N = len(df)
     s_acc, s_f1 = acc_f1("gold_sentiment", "pred_sentiment")
@@ -140,11 +152,17 @@ def compute_basic_metrics(df: pd.DataFrame) -> Metrics:
     if "gold_tur" in df.columns and "pred_tur" in df.columns:
         t_acc, t_f1 = acc_f1("gold_tur", "pred_tur")
 
-    triple = (
+    hits = (
         (df["gold_sentiment"].astype(str) == df["pred_sentiment"].astype(str)) &
         (df["gold_intent"].astype(str) == df["pred_intent"].astype(str)) &
         (df["gold_yanit_durumu"].astype(str) == df["pred_yanit_durumu"].astype(str))
-    ).mean()
+    )
+    triple = hits.mean()
+
+    ci: Dict[str, Dict[str, Tuple[float, float]]] = {}
+    if n_boot > 0:
+        ci = bootstrap_fields(df, n_boot=n_boot)
+        ci["triple"] = {"accuracy": bootstrap_proportion(hits, n_boot=n_boot)}
 
     return Metrics(
         N=N,
@@ -152,9 +170,11 @@ def compute_basic_metrics(df: pd.DataFrame) -> Metrics:
         intent_acc=i_acc, intent_f1=i_f1,
         ans_acc=y_acc, ans_f1=y_f1,
         tur_acc=t_acc, tur_f1=t_f1,
-        triple_correct=float(triple)
+        triple_correct=float(triple),
+        ci=ci,
     )
 
+@traced("generate_reports.top_confusions")
 def top_confusions(df: pd.DataFrame, k: int = 5) -> List[ConfusionTop]:
     """Intent özelinde en sık karışan (gold,pred) çiftlerinden top-k."""
     tmp = (
@@ -176,8 +196,10 @@ from pathlib import Path
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
+@lru_cache(maxsize=None)
 def register_tr_font_family():
     """
+    Font kaydı süreç başına BİR KEZ yapılır (sonuç önbelleklenir; havuz işçilerinde de tek sefer).
     Font fallback zinciri:
     1) Proje içi DejaVuSans → 2) Windows Arial → 3) Helvetica (Türkçe eksik olabilir)
     """
@@ -206,8 +228,12 @@ def register_tr_font_family():
     print("[fonts] Fallback to Helvetica (Turkish glyphs may be broken)")
     return ("Helvetica", "Helvetica-Bold")
 
+@lru_cache(maxsize=None)
 def base_styles():
-    """Paragraf stilleri + seçilen fontları _base/_bold olarak sakla (tablolar için)."""
+    """
+    Paragraf stilleri + seçilen fontları _base/_bold olarak sakla (tablolar için).
+    Stil sayfası süreç başına bir kez kurulur ve raporlar arasında paylaşılır (salt okunur kullanılır).
+    """
     base_font, bold_font = register_tr_font_family()
     styles = getSampleStyleSheet()
     styles.add(ParagraphStyle(name="TitleBig", fontName=bold_font, fontSize=18, leading=22, spaceAfter=12))
@@ -263,10 +289,21 @@ def make_report_accuracy(inp: Inputs, df: pd.DataFrame, metrics: Metrics):
         ["Tür", pct(metrics.tur_acc), pct(metrics.tur_f1), str(metrics.N)],
         ["Üçü birden doğru", pct(metrics.triple_correct), "—", str(metrics.N)],
     ]
+    col_widths = [5*cm, 3*cm, 3*cm, 2*cm]
+    if metrics.ci:
+        # bootstrap güven aralıkları (accuracy / macro-F1) ayrı kolonlarda
+        keys = ["sentiment", "intent", "yanit_durumu", "tur", "triple"]
+        def ci_str(key, metric):
+            lo_hi = metrics.ci.get(key, {}).get(metric)
+            return f"{pct(lo_hi[0], 1)} – {pct(lo_hi[1], 1)}" if lo_hi else "—"
+        data_tbl[0][3:3] = ["Acc %95 GA", "F1 %95 GA"]
+        for row, key in zip(data_tbl[1:], keys):
+            row[3:3] = [ci_str(key, "accuracy"), ci_str(key, "macro_f1")]
+        col_widths = [3.6*cm, 2.2*cm, 2.2*cm, 3.4*cm, 3.4*cm, 1.2*cm]
     base_font = getattr(st, "_base_font", "Helvetica")
     bold_font = getattr(st, "_bold_font", "Helvetica-Bold")
 
-    tbl = build_table(data_tbl, col_widths=[5*cm, 3*cm, 3*cm, 2*cm])
+    tbl = build_table(data_tbl, col_widths=col_widths)
     tbl.setStyle(TableStyle([
         ("FONTNAME", (0,0), (-1,0), bold_font),   # header bold
         ("FONTNAME", (0,1), (-1,-1), base_font),  # body regular
@@ -478,15 +515,152 @@ def make_report_tech_notes(inp: Inputs):
 # --------------------------
 # Main
 # --------------------------
+# Rapor adı → (işlev, ihtiyaç duyduğu argümanlar)
+REPORTS = {
+    "accuracy": (lambda inp, df, m, c: make_report_accuracy(inp, df, m)),
+    "swot": (lambda inp, df, m, c: make_report_swot(inp, df, m, c)),
+    "suggestions": (lambda inp, df, m, c: make_report_suggestions(inp, df, m)),
+    "customer_needs": (lambda inp, df, m, c: make_report_customer_needs(inp, df)),
+    "tech_notes": (lambda inp, df, m, c: make_report_tech_notes(inp)),
+}
+
+# İşçi başına bir kez aktarılan ortak rapor girdileri (inp, df, metrics, confs)
+_SHARED: Optional[Tuple[Inputs, pd.DataFrame, Metrics, List[ConfusionTop]]] = None
+
+def _init_worker(shared: Optional[Tuple[Inputs, pd.DataFrame, Metrics, List[ConfusionTop]]] = None):
+    """
+    Havuz işçisi başlangıcı: font kaydı + stil sayfası (işçi başına bir kez). `shared` verilirse
+    rapor girdileri işçide saklanır; böylece DataFrame her görevle yeniden pickle edilmez.
+    """
+    global _SHARED
+    base_styles()
+    if shared is not None:
+        _SHARED = shared
+
+def render_report(name: str, inp: Inputs, df: pd.DataFrame, metrics: Metrics, confs: List[ConfusionTop]) -> str:
+    """Tek bir raporu üretir (süreç havuzunda çalıştırılabilir; modül seviyesinde olduğu için pickle edilir)."""
+    with span("generate_reports.render", report=name):
+        REPORTS[name](inp, df, metrics, confs)
+    return name
+
+def _render_shared(name: str) -> str:
+    """Havuz görevi: yalnızca rapor adı gönderilir, girdiler `_init_worker` ile aktarılmıştır."""
+    return render_report(name, *_SHARED)
+
+@traced("generate_reports.generate_all")
+def generate_all(inp: Inputs, df: pd.DataFrame, n_boot: int = 0, jobs: int = 1) -> None:
+    """
+    Yüklenmiş veriden 5 raporu üretir (CLI ve eval_pipeline 'reports' aşaması ortak kullanır).
+    Metrikler/confusion'lar bir kez hesaplanır; `jobs` > 1 ise PDF'ler süreç havuzunda eşzamanlı çizilir.
+    """
+    inp.outdir.mkdir(parents=True, exist_ok=True)
+    metrics = compute_basic_metrics(df, n_boot=n_boot)
+    confs = top_confusions(df, k=5)
+
+    # 5 raporu üret
+    if jobs <= 1:
+        for name in REPORTS:
+            render_report(name, inp, df, metrics, confs)
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(REPORTS)), initializer=_init_worker,
+                                 initargs=((inp, df, metrics, confs),)) as pool:
+            futures = [pool.submit(_render_shared, name) for name in REPORTS]
+            for fut in futures:
+                fut.result()  # işçideki hatayı burada yükselt
+
+    print(f"[OK] Raporlar üretildi: {inp.outdir}")
+
+# --------------------------
+# Toplu (çok kiracılı) mod
+# --------------------------
+MANIFEST_REQUIRED = ["project", "model", "input", "outdir"]
+
+def load_manifest(path: Path) -> List[Dict]:
+    """Manifest'i (.csv / .json / .jsonl) okur; zorunlu kolonları kontrol eder."""
+    suffix = path.suffix.lower()
+    if suffix == ".jsonl":
+        entries = pd.read_json(path, lines=True).to_dict("records")
+    elif suffix == ".json":
+        entries = pd.read_json(path).to_dict("records")
+    else:
+        entries = pd.read_csv(path, dtype=str).to_dict("records")
+    for i, e in enumerate(entries):
+        missing = [k for k in MANIFEST_REQUIRED if pd.isna(e.get(k)) or not str(e.get(k)).strip()]
+        if missing:
+            raise SystemExit(f"Hata: manifest satırı {i + 1} eksik alan içeriyor: {missing}")
+    return entries
+
+def _entry_value(entry: Dict, key: str, default):
+    v = entry.get(key)
+    return default if v is None or (isinstance(v, float) and pd.isna(v)) or v == "" else v
+
+def render_tenant(entry: Dict, n_boot: int, run_date: str) -> Tuple[str, str]:
+    """
+    Tek bir kiracının 5 raporunu üretir (havuz işçisinde çalışır).
+    :return: (outdir, hata mesajı; başarılıysa boş string)
+    """
+    try:
+        preds = _entry_value(entry, "preds", None)
+        inp = Inputs(
+            xlsx_path=Path(entry["input"]),
+            preds_path=Path(preds) if preds else None,
+            outdir=Path(entry["outdir"]),
+            project=str(entry["project"]),
+            model=str(entry["model"]),
+            prepared_by=str(_entry_value(entry, "prepared_by", "Analist")),
+            run_date=run_date,
+        )
+        generate_all(inp, load_data(inp.xlsx_path), n_boot=int(_entry_value(entry, "bootstrap", n_boot)))
+        return str(entry["outdir"]), ""
+    except (Exception, SystemExit) as e:  # load_data eksik kolonda SystemExit fırlatır
+        return str(entry["outdir"]), f"{type(e).__name__}: {e}"
+
+@traced("generate_reports.run_batch")
+def run_batch(entries: List[Dict], jobs: int = 1, n_boot: int = 0) -> List[Tuple[str, str]]:
+    """Manifest satırlarını tek süreçte (jobs=1) ya da `jobs` işçili süreç havuzunda işler."""
+    run_date = datetime.now().strftime("%Y-%m-%d")
+    results: List[Tuple[str, str]] = []
+    if jobs <= 1:
+        results = [render_tenant(e, n_boot, run_date) for e in entries]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+            results = list(pool.map(render_tenant, entries, [n_boot] * len(entries), [run_date] * len(entries),
+                                    chunksize=max(1, len(entries) // (jobs * 4))))
+    failed = [(out, err) for out, err in results if err]
+    for out, err in failed:
+        print(f"[ERR] {out}: {err}")
+    print(f"[OK] Toplu rapor: {len(results) - len(failed)}/{len(results)} kiracı tamamlandı")
+    return results
+
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--xlsx", required=True, help="outputs/eval/mila_eval.xlsx")
+    ap.add_argument("--xlsx", required=False, help="outputs/eval/mila_eval.xlsx (veya .parquet / .arrow)")
     ap.add_argument("--preds", required=False, default=None, help="outputs/predictions/preds_mila.csv (opsiyonel)")
-    ap.add_argument("--outdir", required=True, help="deliverables/")
+    ap.add_argument("--outdir", required=False, help="deliverables/")
     ap.add_argument("--project", default="Trendyol Mila Sohbet Botu")
     ap.add_argument("--model", default="gpt-5-nano")
     ap.add_argument("--prepared_by", default="Analist")
+    ap.add_argument("--bootstrap", type=int, default=0,
+                    help="Doğruluk özetinde güven aralığı için bootstrap örnek sayısı (varsayılan 0 = kapalı; örn. 1000)")
+    ap.add_argument("--jobs", type=int, default=1,
+                    help="Süreç sayısı: tekli modda PDF'ler, --manifest modunda kiracılar paralel (1 = sıralı)")
+    ap.add_argument("--manifest", default=None,
+                    help="Toplu mod: project,model,input,outdir satırları (.csv / .json / .jsonl)")
+    ap.add_argument("--profile", nargs="?", const=DEFAULT_TRACE, default=None, metavar="TRACE_JSON",
+                    help="Aşama profilini aç; Chrome trace JSON'u + özet tablo yaz (--jobs 1 ile PDF'ler ayrı ayrı ölçülür)")
+    ap.add_argument("--profile-alloc", action="store_true", help="Profilde tracemalloc ile ayırma farklarını da ölç")
     args = ap.parse_args()
+    if not args.manifest and (not args.xlsx or not args.outdir):
+        ap.error("--xlsx ve --outdir gerekli (ya da --manifest verin)")
+    with session(args.profile, alloc=args.profile_alloc):
+        _run(args)
+
+def _run(args: argparse.Namespace) -> None:
+    if args.manifest:
+        results = run_batch(load_manifest(Path(args.manifest)), jobs=args.jobs, n_boot=args.bootstrap)
+        if any(err for _, err in results):
+            raise SystemExit(1)
+        return
 
     inputs = Inputs(
         xlsx_path=Path(args.xlsx),
@@ -498,19 +672,7 @@ def main():
         run_date=datetime.now().strftime("%Y-%m-%d"),
     )
 
-    inputs.outdir.mkdir(parents=True, exist_ok=True)
-    df = load_data(inputs.xlsx_path)
-    metrics = compute_basic_metrics(df)
-    confs = top_confusions(df, k=5)
-
-    # 5 raporu üret
-    make_report_accuracy(inputs, df, metrics)
-    make_report_swot(inputs, df, metrics, confs)
-    make_report_suggestions(inputs, df, metrics)
-    make_report_customer_needs(inputs, df)
-    make_report_tech_notes(inputs)
-
-    print(f"[OK] Raporlar üretildi: {inputs.outdir}")
+    generate_all(inputs, load_data(inputs.xlsx_path), n_boot=args.bootstrap, jobs=args.jobs)
 
 if __name__ == "__main__":
     main()
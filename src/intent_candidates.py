@@ -6,11 +6,21 @@ Heuristik intent aday bulucu
 - Sadece verilen `allowed` listesinden etiket döndürür (skora göre sıralı).
 - Hiç eşleşme yoksa `allowed[:top_k]` fallback'i kullanılır.
 - "İade" sapmasını azaltmak için iade ipuçları yoksa "İade" adayı elenir.
+- Eşleştirme: tüm anahtar kelimelerden modül yüklenirken BİR KEZ derlenen tek bir regex
+  (kelime sınırlı alternasyon, ileri bakış ile çakışan eşleşmeler dahil) kullanılır; metin tek
+  geçişte taranır ve tüm etiketlerin skorları aynı anda çıkar.
+- Toplu kullanım: `find_candidates_batch(texts, allowed, top_k)` bir Series/dizi üzerindeki tüm
+  diyaloglar için NumPy tabanlı (etiket × doküman) skor matrisi ve argpartition ile top-k adayları
+  üretir; büyük korpuslar `n_jobs` ile süreç havuzuna dağıtılabilir.
 """
 
 import re
 from collections import Counter
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
 
 # Anahtar kelime sözlüğü (basit, domain-özel örnekler)
 INTENT_KEYWORDS = {
@@ -37,13 +47,68 @@ INTENT_KEYWORDS = {
 }
 IADE_CUES = ["iade", "para iadesi", "ücret iadesi", "refund", "return", "iade kodu", "iade etiketi", "geri göndermek"]
 
+def _is_word(ch: str) -> bool:
+    """`re` modülündeki \\w ile aynı: harf/rakam ya da '_'."""
+    return ch.isalnum() or ch == "_"
+
+
+class _KeywordMatcher:
+    """
+    Anahtar kelime sözlüğünden bir kez kurulan çoklu desen eşleyici.
+    - Tek regex: `(?=\\b(kw1|kw2|...)\\b)` — alternatifler uzundan kısaya sıralı olduğundan her
+      konumda kelime sınırına uyan EN UZUN anahtar kelime bulunur.
+    - Aynı konumdan başlayan daha kısa eşleşmeler (örn. "iade kodu" içindeki "iade") yalnızca o
+      anahtar kelimenin önekleri olabilir; bunlar kurulumda önceden hesaplanır.
+    - Her anahtar kelime için sayım `re.findall(r"\\bkw\\b")` ile aynıdır (çakışmayan eşleşmeler).
+    """
+
+    def __init__(self, keywords: Dict[str, List[str]]):
+        kws = sorted({k for ks in keywords.values() for k in ks}, key=len, reverse=True)
+        self.keywords = kws
+        self.index = {k: i for i, k in enumerate(kws)}
+        self.pattern = re.compile(r"(?=\b(" + "|".join(re.escape(k) for k in kws) + r")\b)")
+        # kw → aynı konumda birlikte eşleşen önekleri (önekten sonraki karakter kelime sınırı ise)
+        self.prefixes: List[List[int]] = []
+        for k in kws:
+            self.prefixes.append([
+                self.index[p] for p in kws
+                if len(p) < len(k) and k.startswith(p)
+                and _is_word(k[len(p) - 1]) != _is_word(k[len(p)])
+            ])
+        self.label_keys: Dict[str, List[int]] = {
+            label: [self.index[k] for k in ks] for label, ks in keywords.items()
+        }
+
+    def count(self, text: str) -> List[int]:
+        """Her anahtar kelimenin metindeki (çakışmayan) tam-kelime eşleşme sayısı."""
+        counts = [0] * len(self.keywords)
+        next_free = [0] * len(self.keywords)
+        if not text:
+            return counts
+        for m in self.pattern.finditer(text):
+            pos = m.start()
+            longest = self.index[m.group(1)]
+            for i in (longest, *self.prefixes[longest]):
+                if pos >= next_free[i]:
+                    counts[i] += 1
+                    next_free[i] = pos + len(self.keywords[i])
+        return counts
+
+    def score(self, label: str, counts: List[int]) -> int:
+        return sum(counts[i] for i in self.label_keys.get(label, ()))
+
+
+_MATCHER = _KeywordMatcher(INTENT_KEYWORDS)
+
+
 def _score_for(label: str, text: str) -> int:
     """Basit anahtar kelime sayımı (tam kelime) ile skor üretir."""
-    keys = INTENT_KEYWORDS.get(label, [])
-    s = 0
-    for k in keys:
-        s += len(re.findall(r"\b"+re.escape(k)+r"\b", text))
-    return s
+    return _MATCHER.score(label, _MATCHER.count(text))
+
+def _last_user(lower: str) -> str:
+    """Son kullanıcı bloklarını yakala (örn. "[müşteri]" veya "müşteri:" içeren satırlar)."""
+    blocks = [b.strip() for b in lower.split("\n") if b.strip()]
+    return " ".join([b for b in blocks[-6:] if b.startswith("[müşteri]") or b.startswith("[u]") or "müşteri:" in b or "kullanıcı:" in b])
 
 def find_candidates(dialog_text: str, allowed: List[str], top_k: int = 5) -> List[str]:
     """
@@ -54,15 +119,16 @@ def find_candidates(dialog_text: str, allowed: List[str], top_k: int = 5) -> Lis
     if not dialog_text:
         return allowed[:top_k]
     lower = dialog_text.lower()
+    last_user = _last_user(lower)
 
-    # Son kullanıcı bloklarını yakala (örn. "[müşteri]" veya "müşteri:" içeren satırlar)
-    blocks = [b.strip() for b in lower.split("\n") if b.strip()]
-    last_user = " ".join([b for b in blocks[-6:] if b.startswith("[müşteri]") or b.startswith("[u]") or "müşteri:" in b or "kullanıcı:" in b])
+    # tüm etiketler için tek geçiş: önce anahtar kelime sayıları, sonra etiket skorları
+    c_all  = _MATCHER.count(lower)
+    c_last = _MATCHER.count(last_user)
 
     base = Counter()
     for label in allowed:
-        s_all  = _score_for(label, lower)
-        s_last = _score_for(label, last_user) * 2  # recency: son kullanıcı sözlerine 2x
+        s_all  = _MATCHER.score(label, c_all)
+        s_last = _MATCHER.score(label, c_last) * 2  # recency: son kullanıcı sözlerine 2x
         score = s_all + s_last
         if score != 0:
             base[label] = score
@@ -75,3 +141,103 @@ def find_candidates(dialog_text: str, allowed: List[str], top_k: int = 5) -> Lis
     if base:
         return [lab for lab, _ in base.most_common(top_k)]
     return allowed[:top_k]
+
+
+# ---------- Toplu (batch) aday üretimi ----------
+@dataclass
+class CandidateBatch:
+    """
+    labels: skor matrisinin satır etiketleri (allowed sırası, tekrarsız)
+    scores: (len(labels) × doküman) tam sayı skor matrisi (İade kuralı uygulanmış)
+    candidates: doküman başına top-k etiket listesi (`find_candidates` ile aynı sıralama)
+    """
+    labels: List[str]
+    scores: np.ndarray
+    candidates: List[List[str]]
+
+
+def _score_matrix(texts: List[str], labels: Tuple[str, ...]) -> np.ndarray:
+    """Bir doküman parçası için (etiket × doküman) skor matrisi; süreç havuzunda da çalışır."""
+    n_kw = len(_MATCHER.keywords)
+    counts = np.zeros((n_kw, len(texts)), dtype=np.int64)
+    no_iade_cue = np.zeros(len(texts), dtype=bool)
+    for j, text in enumerate(texts):
+        if not text:
+            continue
+        lower = text.lower()
+        last_user = _last_user(lower)
+        counts[:, j] = np.asarray(_MATCHER.count(lower)) + 2 * np.asarray(_MATCHER.count(last_user))
+        no_iade_cue[j] = not (any(k in lower for k in IADE_CUES) or any(k in last_user for k in IADE_CUES))
+
+    # etiket × anahtar kelime ilişki matrisi (aynı kelime birden çok etikette olabilir)
+    incidence = np.zeros((len(labels), n_kw), dtype=np.int64)
+    for r, label in enumerate(labels):
+        for i in _MATCHER.label_keys.get(label, ()):
+            incidence[r, i] += 1
+    scores = incidence @ counts
+
+    if "İade" in labels:
+        scores[labels.index("İade"), no_iade_cue] = 0
+    return scores
+
+
+def _top_k(scores: np.ndarray, labels: List[str], allowed: List[str], top_k: int) -> List[List[str]]:
+    """
+    Her doküman (kolon) için skoru > 0 olan en iyi top_k etiket; eşitlikte allowed sırası
+    (Counter.most_common ile aynı). Hiç eşleşme yoksa allowed[:top_k].
+    """
+    n_labels, n_docs = scores.shape
+    if n_docs == 0:
+        return []
+    fallback = allowed[:top_k]
+    k = min(top_k, n_labels)
+    if k <= 0:
+        return [fallback[:] for _ in range(n_docs)]
+    # eşitlikleri etiket sırasına göre kıran tekil anahtar: skor*L + (L-1-satır)
+    key = scores * n_labels + (n_labels - 1 - np.arange(n_labels))[:, None]
+    if k < n_labels:
+        idx = np.argpartition(-key, k - 1, axis=0)[:k]
+    else:
+        idx = np.broadcast_to(np.arange(n_labels)[:, None], (n_labels, n_docs))
+    order = np.argsort(-np.take_along_axis(key, idx, axis=0), axis=0)
+    idx = np.take_along_axis(idx, order, axis=0)
+    top_scores = np.take_along_axis(scores, idx, axis=0)
+
+    out: List[List[str]] = []
+    for j in range(n_docs):
+        picked = [labels[i] for i, sc in zip(idx[:, j].tolist(), top_scores[:, j].tolist()) if sc > 0]
+        out.append(picked if picked else fallback[:])
+    return out
+
+
+def find_candidates_batch(
+    texts: Iterable[str],
+    allowed: List[str],
+    top_k: int = 5,
+    n_jobs: int = 1,
+    chunksize: int = 5_000,
+) -> CandidateBatch:
+    """
+    Çok sayıda diyalog için `find_candidates`'in toplu karşılığı.
+    :param texts: pandas Series, NumPy dizisi ya da liste (str olmayan/boş değerler boş sayılır).
+    :param allowed: İzinli etiketler.
+    :param top_k: Doküman başına aday sayısı.
+    :param n_jobs: >1 ise skorlar `chunksize`'lık parçalar hâlinde süreç havuzunda hesaplanır.
+    :return: CandidateBatch (etiket × doküman skor matrisi + doküman başına adaylar).
+    """
+    docs = [t if isinstance(t, str) else "" for t in (texts.tolist() if hasattr(texts, "tolist") else texts)]
+    labels = tuple(dict.fromkeys(allowed))
+
+    if n_jobs > 1 and len(docs) > chunksize:
+        chunks = [docs[i:i + chunksize] for i in range(0, len(docs), chunksize)]
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            parts = list(pool.map(_score_matrix, chunks, [labels] * len(chunks)))
+        scores = np.hstack(parts)
+    else:
+        scores = _score_matrix(docs, labels)
+
+    return CandidateBatch(
+        labels=list(labels),
+        scores=scores,
+        candidates=_top_k(scores, list(labels), allowed, top_k),
+    )
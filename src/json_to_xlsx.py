@@ -5,12 +5,27 @@ JSON sohbet veri setini okunaklı bir XLSX'e dönüştürür.
 - 'mesajlar'  sayfası: mesaj başına 1 satır
 - 'özet'      sayfası: yanit_durumu / sentiment / tur / intent dağılımları (adet + %)
 
+`normalize` kolon bazlıdır: kayıtlar tek geçişte düz kolon listelerine açılır, tarih kolonları
+benzersiz değerler üzerinden tek seferde (vektörel) çevrilir, 'tam_sohbet' groupby + join ile kurulur.
+Sonuç, eleman bazlı `_to_datetime` ile üretilen tabloyla birebir aynıdır.
+
 Kullanım (Windows):
   cd C:\Users\User\Desktop\mila-ai-eval
   python src\json_to_xlsx.py --in data\raw\20-sohbet-trendyol-mila.json --out outputs\trendyol_mila.xlsx
 
+  # Aşamalar arası hızlı aktarım için kolon bazlı kopyalar (Excel'siz de olabilir):
+  python src\json_to_xlsx.py --in data\raw\20-sohbet-trendyol-mila.json --tables-dir outputs\tables --no-excel
+
+Excel çıktısı akış (streaming) kipinde yazılır: xlsxwriter `constant_memory` ile satırlar ve biçimler
+tek geçişte diske akıtılır (satır parçaları halinde; bellek kullanımı satır sayısından bağımsız).
+Sütun genişlikleri vektörel uzunluk istatistiklerinden (büyük tablolarda örneklemden) hesaplanır.
+
+`--profile [YOL]` okuma / normalize / tarih çevirme / sayfa yazımı sürelerini Chrome trace JSON'u
+ve özet tablo olarak kaydeder (bkz. profiling).
+
 Gereksinimler:
-  pip install pandas openpyxl
+  pip install pandas xlsxwriter
+  pip install pyarrow   # yalnızca --tables-dir (Parquet/Arrow) için
 """
 from __future__ import annotations
 
@@ -19,22 +34,98 @@ import json
 from pathlib import Path
 from typing import List, Dict, Any
 
+import numpy as np
 import pandas as pd
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import Alignment
+
+from artifacts import write_table
+from profiling import DEFAULT_TRACE, session, traced
+
+# Akış yazımında bir seferde Python nesnesine çevrilen satır sayısı
+_WRITE_CHUNK = 50_000
+# Genişlik istatistiği için bu sayıdan büyük kolonlarda örneklem kullanılır
+_WIDTH_SAMPLE = 200_000
+
+_DATETIME_FMT = "yyyy-mm-dd HH:MM:SS"
 
 
 # ---------- Yardımcılar ----------
 
-def _autowidth(writer: pd.ExcelWriter, sheet_name: str, df: pd.DataFrame, min_w: int = 10, max_w: int = 80):
-    """Excel sütun genişliklerini, içerik uzunluğuna göre makul şekilde ayarlar."""
-    ws = writer.sheets[sheet_name]
-    for i, col in enumerate(df.columns, start=1):
-        series = df[col].astype(str) if not df.empty else pd.Series([], dtype=str)
-        max_len = max([len(str(col))] + [len(s) for s in series.tolist()]) if len(series) else len(str(col))
-        width = max(min_w, min(int(max_len * 1.1), max_w))
-        col_letter = get_column_letter(i)
-        ws.column_dimensions[col_letter].width = width
+def _col_width(series: pd.Series, header: str, min_w: int = 10, max_w: int = 80) -> int:
+    """
+    Sütun genişliği: başlık ve hücre metin uzunluklarının en büyüğü × 1.1, [min_w, max_w] aralığında.
+    Uzunluklar vektörel `str.len()` ile; büyük kolonlarda sabit boyutlu örneklem üzerinden hesaplanır.
+    """
+    s = series
+    if len(s) > _WIDTH_SAMPLE:
+        s = s.sample(_WIDTH_SAMPLE, random_state=0)
+    if len(s) == 0:
+        max_len = len(str(header))
+    elif pd.api.types.is_datetime64_any_dtype(s):
+        max_len = max(len(str(header)), 19)  # 'yyyy-mm-dd HH:MM:SS'
+    else:
+        longest = s.astype(str).str.len().max()  # pandas ≥ 3: eksik değerler NaN kalır, max'te atlanır
+        max_len = max(len(str(header)), 0 if pd.isna(longest) else int(longest))
+    return max(min_w, min(int(max_len * 1.1), max_w))
+
+
+def _column_values(series: pd.Series) -> list:
+    """Kolonu xlsxwriter'a yazılabilir Python değerlerine çevirir (NaN/NaT/NA → None)."""
+    if pd.api.types.is_datetime64_any_dtype(series) and series.dt.tz is not None:
+        series = series.dt.tz_localize(None)
+    values = series.astype(object)
+    return values.where(series.notna(), None).tolist()
+
+
+@traced("json_to_xlsx.stream_sheet")
+def _stream_sheet(wb, name: str, df: pd.DataFrame, cols: List[str], max_w: int,
+                  col_formats: Dict[str, Any], header_fmt) -> None:
+    """
+    Tek sayfayı constant_memory kipinde yazar: önce genişlikler (satırlardan önce yazılmalı),
+    sonra başlık ve satırlar sırayla; filtre satırı en sonda tanımlanır.
+    """
+    ws = wb.add_worksheet(name)
+    df = df.reindex(columns=cols)
+    for j, col in enumerate(cols):
+        ws.set_column(j, j, _col_width(df[col], col, max_w=max_w), col_formats.get(col))
+
+    for j, col in enumerate(cols):
+        ws.write_string(0, j, col, col_formats.get(f"{col}:header", header_fmt))
+
+    writers = []
+    for col in cols:
+        fmt = col_formats.get(col)
+        dtype = df[col].dtype
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            writers.append((ws.write_datetime, fmt))
+        elif pd.api.types.is_bool_dtype(dtype):
+            writers.append((ws.write_boolean, fmt))
+        elif pd.api.types.is_numeric_dtype(dtype):
+            writers.append((ws.write_number, fmt))
+        else:
+            writers.append((None, fmt))  # object: değere göre
+
+    n = len(df)
+    for start in range(0, n, _WRITE_CHUNK):
+        part = df.iloc[start:start + _WRITE_CHUNK]
+        columns = [_column_values(part[c]) for c in cols]
+        for i, row in enumerate(zip(*columns), start=start + 1):
+            for j, v in enumerate(row):
+                if v is None:
+                    continue
+                write, fmt = writers[j]
+                if write is None:
+                    if isinstance(v, str):
+                        ws.write_string(i, j, v, fmt)
+                    elif isinstance(v, bool):
+                        ws.write_boolean(i, j, v, fmt)
+                    elif isinstance(v, (int, float)):
+                        ws.write_number(i, j, v, fmt)
+                    else:
+                        ws.write(i, j, str(v) if not hasattr(v, "year") else v, fmt)
+                else:
+                    write(i, j, v, fmt)
+
+    ws.autofilter(0, 0, n, len(cols) - 1)
 
 
 def _to_datetime(s: Any):
@@ -45,6 +136,73 @@ def _to_datetime(s: Any):
     return pd.to_datetime(s, dayfirst=True, errors="coerce")
 
 
+# `_to_datetime` (dayfirst=True) ile aynı sonucu veren katı biçimler. Yıl başta iken dateutil,
+# dayfirst'te önce yıl-gün-ay dener (2024-05-01 → 5 Ocak); gün başta iken gün-ay, olmazsa ay-gün.
+# Bu sırayla denenir; eşleşmeyen değerler eleman bazlı `_to_datetime`'a düşer (tam uyum için).
+_TIME_SUFFIXES = ("", " %H:%M", " %H:%M:%S", "T%H:%M", "T%H:%M:%S")
+_FAST_DT_FORMATS = tuple(
+    f"{date}{t}"
+    for dates in (("%Y-%d-%m", "%Y-%m-%d"), ("%Y/%d/%m", "%Y/%m/%d"),
+                  ("%d.%m.%Y", "%m.%d.%Y"), ("%d/%m/%Y", "%m/%d/%Y"), ("%d-%m-%Y", "%m-%d-%Y"))
+    for t in _TIME_SUFFIXES
+    for date in dates
+)
+
+
+@traced("json_to_xlsx.to_datetime_col")
+def _to_datetime_col(values: List[Any]) -> pd.Series:
+    """
+    `_to_datetime`'ın kolon (vektörel) karşılığı: her elemana `_to_datetime` uygulanıp DataFrame'e
+    konmuş haliyle aynı değer ve dtype'ı üretir.
+    - Benzersiz string'ler katı biçimlerle (`_FAST_DT_FORMATS`) toplu çevrilir.
+    - Kalanlar (saat dilimli, kesirli saniye, serbest metin, string olmayan) eleman bazlı çevrilir.
+    """
+    obj = pd.Series(values, dtype=object)
+    if len(obj) == 0:
+        return pd.Series([], dtype="datetime64[s]")
+    blank = obj.map(lambda v: v is None or (isinstance(v, str) and v.strip() == "")).to_numpy(bool)
+    codes, uniques = pd.factorize(obj.where(~blank, None), use_na_sentinel=True)
+
+    parsed = np.full(len(uniques), np.datetime64("NaT"), dtype="datetime64[us]")
+    is_str = np.array([isinstance(u, str) for u in uniques], dtype=bool)
+    pos = np.flatnonzero(is_str)
+    strs = pd.Series(np.asarray(uniques, dtype=object)[pos], dtype=object)
+    # strptime %S 60/61'i (artık saniye) kabul eder, `_to_datetime` etmez → eleman bazlı yola bırak
+    leap = strs.str.contains(r":6[01](?!\d)", regex=True).to_numpy(bool)
+    pos, strs = pos[~leap], strs[~leap].reset_index(drop=True)
+    for fmt in _FAST_DT_FORMATS:
+        if len(pos) == 0:
+            break
+        got = pd.to_datetime(strs, format=fmt, errors="coerce")
+        ok = got.notna().to_numpy()
+        if ok.any():
+            parsed[pos[ok]] = got[ok].to_numpy().astype("datetime64[us]")
+            pos, strs = pos[~ok], strs[~ok].reset_index(drop=True)
+
+    # Katı biçimlere uymayanlar: eleman bazlı (benzersiz değer başına bir kez)
+    rest = np.setdiff1d(np.arange(len(uniques)), np.flatnonzero(~np.isnat(parsed)))
+    extra = {int(i): _to_datetime(uniques[i]) for i in rest}
+    exotic = any(
+        ts is not pd.NaT and (ts.tzinfo is not None or getattr(ts, "unit", "us") != "us")
+        for ts in extra.values()
+    )
+    if exotic:
+        # saat dilimli / ns çözünürlüklü değerler: orijinal nesne listesinden tip çıkarımı
+        lookup = [extra[i] if i in extra else (pd.Timestamp(parsed[i]) if not np.isnat(parsed[i]) else pd.NaT)
+                  for i in range(len(uniques))]
+        return pd.Series([pd.NaT if c < 0 else lookup[c] for c in codes])
+    for i, ts in extra.items():
+        if ts is not pd.NaT:
+            parsed[i] = np.datetime64(ts.to_datetime64(), "us")
+
+    out = parsed[np.maximum(codes, 0)] if len(parsed) else np.full(len(codes), np.datetime64("NaT"), "datetime64[us]")
+    out[codes < 0] = np.datetime64("NaT")
+    if np.isnat(out).all():
+        return pd.Series(out.astype("datetime64[s]"))  # tümü NaT: DataFrame çıkarımı saniye çözünürlüğü verir
+    return pd.Series(out)
+
+
+@traced("json_to_xlsx.load_json")
 def load_json(path: Path) -> List[Dict[str, Any]]:
     with path.open("r", encoding="utf-8") as f:
         data = json.load(f)
@@ -55,68 +213,87 @@ def load_json(path: Path) -> List[Dict[str, Any]]:
 
 # ---------- Dönüştürme ----------
 
+@traced("json_to_xlsx.normalize")
 def normalize(convs: List[Dict[str, Any]]):
-    sohbet_kayitlari: List[Dict[str, Any]] = []
-    mesaj_kayitlari: List[Dict[str, Any]] = []
-
-    for c in convs:
-        sohbet_id = c.get("sohbet_id")
-        tarih_saat = _to_datetime(c.get("tarih_saat"))
-        yanit_durumu = c.get("yanit_durumu")
-        sentiment = c.get("sentiment")
-        tur = c.get("tur")
-        intent = c.get("intent")
-        intent_detay = c.get("intent_detay")
-
-        ms = c.get("mesajlar", []) or []
-        msg_count = len(ms)
-
-        first_msg_ts = _to_datetime(ms[0].get("timestamp")) if msg_count else pd.NaT
-        last_msg_ts  = _to_datetime(ms[-1].get("timestamp")) if msg_count else pd.NaT
-        first_customer_text = next(
-            (m.get("text") for m in ms if (m.get("sender") or "").lower().startswith("müşteri")),
-            None
-        )
-
-        # ---- Tüm sohbeti tek metne çevir (multi-line) ----
-        def _fmt(m):
-            sender = (m.get("sender") or "").strip()
-            text = (m.get("text") or "").strip()
-            if not sender and not text:
-                return ""
-            return f"{sender}: {text}"
-
-        conv_text_lines = [line for line in (_fmt(m) for m in ms) if line]
-        full_conv_text = "\n".join(conv_text_lines)
-        # Çok uç durumlarda Excel hücre sınırına yaklaşmamak için kırpma (opsiyonel):
-        # full_conv_text = full_conv_text[:30000]
-
-        sohbet_kayitlari.append({
-            "sohbet_id": sohbet_id,
-            "tarih_saat": tarih_saat,
-            "mesaj_sayisi": msg_count,
-            "ilk_mesaj_zaman": first_msg_ts,
-            "son_mesaj_zaman": last_msg_ts,
-            "ilk_musteri_mesaji": first_customer_text,
-            "yanit_durumu": yanit_durumu,
-            "sentiment": sentiment,
-            "tur": tur,
-            "intent": intent,
-            "intent_detay": intent_detay,
-            "tam_sohbet": full_conv_text,  # <-- yeni alan
-        })
-
-        for idx, m in enumerate(ms, start=1):
-            mesaj_kayitlari.append({
-                "sohbet_id": sohbet_id,
-                "mesaj_sira": idx,
-                "gonderen": m.get("sender"),
-                "zaman": _to_datetime(m.get("timestamp")),
-                "metin": m.get("text"),
-            })
-
-    df_sohbet = pd.DataFrame(sohbet_kayitlari).sort_values(["tarih_saat", "sohbet_id"], ignore_index=True)
-    df_mesaj  = pd.DataFrame(mesaj_kayitlari).sort_values(["sohbet_id", "mesaj_sira"], ignore_index=True)
+    # ---- Kayıtları tek geçişte düz kolonlara aç ----
+    n = len(convs)
+    mesaj_listeleri = [c.get("mesajlar", []) or [] for c in convs]
+    msg_counts = np.fromiter((len(ms) for ms in mesaj_listeleri), dtype=np.int64, count=n)
+    conv_pos = np.repeat(np.arange(n), msg_counts)            # mesaj → sohbet satırı
+    flat = [m for ms in mesaj_listeleri for m in ms]
+    senders = [m.get("sender") for m in flat]
+    texts = [m.get("text") for m in flat]
+    timestamps = [m.get("timestamp") for m in flat]
+    sohbet_ids = [c.get("sohbet_id") for c in convs]
+
+    # ---- Mesaj tablosu ----
+    starts = np.cumsum(msg_counts) - msg_counts
+    mesaj_sira = np.arange(len(flat), dtype=np.int64) - np.repeat(starts, msg_counts) + 1
+    zaman = _to_datetime_col(timestamps)
+
+    # ilk/son mesaj zamanı (mesajı olmayan sohbette NaT)
+    has_msg = msg_counts > 0
+    z = zaman.to_numpy()
+    first_ts = np.full(n, np.datetime64("NaT"), dtype=z.dtype) if z.dtype.kind == "M" else np.full(n, pd.NaT, dtype=object)
+    last_ts = first_ts.copy()
+    first_ts[has_msg] = z[starts[has_msg]]
+    last_ts[has_msg] = z[starts[has_msg] + msg_counts[has_msg] - 1]
+
+    # ---- ilk müşteri mesajı: gönderen 'müşteri' ile başlayan ilk mesajın metni ----
+    sender_s = pd.Series([s or "" for s in senders], dtype=object)
+    text_s = pd.Series([t or "" for t in texts], dtype=object)
+    is_customer = sender_s.str.lower().str.startswith("müşteri").to_numpy(bool) if len(flat) else np.zeros(0, bool)
+    first_customer = [None] * n
+    if is_customer.any():
+        idx = np.flatnonzero(is_customer)
+        conv_of = conv_pos[idx]
+        keep = np.r_[True, conv_of[1:] != conv_of[:-1]]   # sohbet başına ilk eşleşme
+        for ci, mi in zip(conv_of[keep].tolist(), idx[keep].tolist()):
+            first_customer[ci] = texts[mi]
+
+    # ---- Tüm sohbeti tek metne çevir (multi-line): groupby + join ----
+    sender_st = sender_s.str.strip()
+    text_st = text_s.str.strip()
+    lines = sender_st + ": " + text_st
+    nonempty = ((sender_st != "") | (text_st != "")).to_numpy(bool) if len(flat) else np.zeros(0, bool)
+    joined = lines[nonempty].groupby(conv_pos[nonempty]).agg("\n".join)
+    full_texts = [""] * n
+    for ci, txt in zip(joined.index.tolist(), joined.tolist()):
+        full_texts[ci] = txt
+    # Çok uç durumlarda Excel hücre sınırına yaklaşmamak için kırpma (opsiyonel):
+    # full_texts = [t[:30000] for t in full_texts]
+
+    def _field(key: str) -> List[Any]:
+        return [c.get(key) for c in convs]
+
+    sohbet_cols = {
+        "sohbet_id": sohbet_ids,
+        "tarih_saat": _to_datetime_col(_field("tarih_saat")).to_numpy(),
+        "mesaj_sayisi": msg_counts,
+        "ilk_mesaj_zaman": first_ts,
+        "son_mesaj_zaman": last_ts,
+        "ilk_musteri_mesaji": first_customer,
+        "yanit_durumu": _field("yanit_durumu"),
+        "sentiment": _field("sentiment"),
+        "tur": _field("tur"),
+        "intent": _field("intent"),
+        "intent_detay": _field("intent_detay"),
+        "tam_sohbet": full_texts,  # <-- yeni alan
+    }
+    mesaj_cols = {
+        "sohbet_id": [sohbet_ids[i] for i in conv_pos.tolist()],
+        "mesaj_sira": mesaj_sira,
+        "gonderen": senders,
+        "zaman": zaman.to_numpy(),
+        "metin": texts,
+    }
+    # Kayıt listesinden kurulan tabloyla aynı tip çıkarımı: nesne dizileri DataFrame'e liste olarak verilir
+    def _frame(cols: Dict[str, Any]) -> pd.DataFrame:
+        return pd.DataFrame({k: (v.tolist() if isinstance(v, np.ndarray) and v.dtype == object else v)
+                             for k, v in cols.items()})
+
+    df_sohbet = _frame(sohbet_cols).sort_values(["tarih_saat", "sohbet_id"], ignore_index=True)
+    df_mesaj = _frame(mesaj_cols).sort_values(["sohbet_id", "mesaj_sira"], ignore_index=True)
 
     # ---- Özet pivotları (0-1 arası yüzde; Excel'de % biçimi uygulanacak) ----
     def _pct_table(s: pd.Series) -> pd.DataFrame:
@@ -137,44 +314,63 @@ def normalize(convs: List[Dict[str, Any]]):
     return df_sohbet, df_mesaj, df_ozet
 
 
+@traced("json_to_xlsx.write_excel")
 def write_excel(out_path: Path, df_sohbet: pd.DataFrame, df_mesaj: pd.DataFrame, df_ozet: pd.DataFrame):
+    """
+    Üç sayfayı akış kipinde tek geçişte yazar (xlsxwriter constant_memory): sütun genişliği, tarih ve
+    yüzde biçimleri, 'tam_sohbet' için satır kaydırma ve filtre satırı yazım sırasında uygulanır.
+    """
+    try:
+        import xlsxwriter
+    except ImportError:
+        raise SystemExit("Hata: Excel çıktısı için xlsxwriter gerekli. Lütfen `pip install xlsxwriter` komutunu çalıştırın.")
+
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    with pd.ExcelWriter(out_path, engine="openpyxl", datetime_format="yyyy-mm-dd HH:MM:SS", date_format="yyyy-mm-dd") as writer:
-        sohbet_cols = [
-            "sohbet_id","tarih_saat","mesaj_sayisi","ilk_mesaj_zaman","son_mesaj_zaman",
-            "ilk_musteri_mesaji","yanit_durumu","sentiment","tur","intent","intent_detay",
-            "tam_sohbet",  # tüm sohbet metni (multi-line)
-        ]
-        mesaj_cols = ["sohbet_id","mesaj_sira","gonderen","zaman","metin"]
-        ozet_cols  = ["metric","kategori","adet","yuzde"]
-
-        # Sayfaları yaz
-        df_sohbet.reindex(columns=sohbet_cols).to_excel(writer, sheet_name="sohbetler", index=False)
-        df_mesaj.reindex(columns=mesaj_cols).to_excel(writer, sheet_name="mesajlar", index=False)
-        df_ozet.reindex(columns=ozet_cols).to_excel(writer, sheet_name="özet", index=False)
-
-        # Otomatik genişlik
-        _autowidth(writer, "sohbetler", df_sohbet.reindex(columns=sohbet_cols), max_w=120)  # tam_sohbet geniş olabilir
-        _autowidth(writer, "mesajlar",  df_mesaj.reindex(columns=mesaj_cols), max_w=100)
-        _autowidth(writer, "özet",      df_ozet.reindex(columns=ozet_cols),  max_w=30)
-
-        # Filtre satırı
-        for name in ["sohbetler", "mesajlar", "özet"]:
-            ws = writer.sheets[name]
-            ws.auto_filter.ref = ws.dimensions
-
-        # Özet sayfasında yüzde kolonuna % biçimi
-        ws_ozet = writer.sheets["özet"]
-        if len(df_ozet) > 0:
-            for row in range(2, 2 + len(df_ozet)):
-                ws_ozet[f"D{row}"].number_format = "0.00%"
-
-        # 'tam_sohbet' sütununda satırların katlanarak görünmesi (wrap text)
-        ws_sohbet = writer.sheets["sohbetler"]
-        tam_idx = sohbet_cols.index("tam_sohbet") + 1  # 1-based column index
-        col_letter = get_column_letter(tam_idx)
-        for row in range(1, ws_sohbet.max_row + 1):
-            ws_sohbet[f"{col_letter}{row}"].alignment = Alignment(wrap_text=True)
+    sohbet_cols = [
+        "sohbet_id","tarih_saat","mesaj_sayisi","ilk_mesaj_zaman","son_mesaj_zaman",
+        "ilk_musteri_mesaji","yanit_durumu","sentiment","tur","intent","intent_detay",
+        "tam_sohbet",  # tüm sohbet metni (multi-line)
+    ]
+    mesaj_cols = ["sohbet_id","mesaj_sira","gonderen","zaman","metin"]
+    ozet_cols  = ["metric","kategori","adet","yuzde"]
+
+    wb = xlsxwriter.Workbook(str(out_path), {
+        "constant_memory": True,
+        "strings_to_numbers": False,
+        "strings_to_formulas": False,
+        "strings_to_urls": False,
+        "remove_timezone": True,
+        "nan_inf_to_errors": True,
+    })
+    try:
+        header = wb.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+        dt = wb.add_format({"num_format": _DATETIME_FMT})
+        pct = wb.add_format({"num_format": "0.00%"})
+        wrap = wb.add_format({"text_wrap": True})
+        wrap_header = wb.add_format({"bold": True, "border": 1, "align": "center", "valign": "top", "text_wrap": True})
+
+        _stream_sheet(wb, "sohbetler", df_sohbet, sohbet_cols, max_w=120,  # tam_sohbet geniş olabilir
+                      col_formats={"tarih_saat": dt, "ilk_mesaj_zaman": dt, "son_mesaj_zaman": dt,
+                                   "tam_sohbet": wrap, "tam_sohbet:header": wrap_header},
+                      header_fmt=header)
+        _stream_sheet(wb, "mesajlar", df_mesaj, mesaj_cols, max_w=100,
+                      col_formats={"zaman": dt}, header_fmt=header)
+        _stream_sheet(wb, "özet", df_ozet, ozet_cols, max_w=30,
+                      col_formats={"yuzde": pct}, header_fmt=header)
+    finally:
+        wb.close()
+
+
+@traced("json_to_xlsx.write_tables")
+def write_tables(out_dir: Path, df_sohbet: pd.DataFrame, df_mesaj: pd.DataFrame, df_ozet: pd.DataFrame,
+                 fmt: str = "parquet") -> List[Path]:
+    """Üç tabloyu kararlı şemalarla Parquet ya da Arrow IPC olarak yazar (bkz. artifacts.SCHEMAS)."""
+    suffix = ".arrow" if fmt == "arrow" else ".parquet"
+    return [
+        write_table(df_sohbet, out_dir / f"sohbetler{suffix}", kind="sohbetler"),
+        write_table(df_mesaj,  out_dir / f"mesajlar{suffix}",  kind="messages"),
+        write_table(df_ozet,   out_dir / f"ozet{suffix}",      kind="ozet"),
+    ]
 
 
 # ---------- CLI ----------
@@ -183,8 +379,18 @@ def main():
     ap = argparse.ArgumentParser(description="JSON sohbetlerini okunaklı XLSX'e dönüştür.")
     ap.add_argument("--in", dest="in_path", required=True, help="Girdi JSON yolu (örn: data\\raw\\20-sohbet-trendyol-mila.json)")
     ap.add_argument("--out", dest="out_path", default=None, help="Çıkış XLSX yolu (örn: outputs\\trendyol_mila.xlsx)")
+    ap.add_argument("--tables-dir", default=None, help="Kolon bazlı ara çıktı klasörü (örn: outputs\\tables)")
+    ap.add_argument("--tables-format", choices=["parquet", "arrow"], default="parquet")
+    ap.add_argument("--no-excel", action="store_true", help="XLSX yazma (yalnızca --tables-dir)")
+    ap.add_argument("--profile", nargs="?", const=DEFAULT_TRACE, default=None, metavar="TRACE_JSON",
+                    help="Aşama profilini aç; Chrome trace JSON'u + özet tablo yaz")
+    ap.add_argument("--profile-alloc", action="store_true", help="Profilde tracemalloc ile ayırma farklarını da ölç")
     args = ap.parse_args()
+    with session(args.profile, alloc=args.profile_alloc):
+        _run(args)
+
 
+def _run(args: argparse.Namespace) -> None:
     in_path = Path(args.in_path)
     if not in_path.exists():
         raise SystemExit(f"Girdi bulunamadı: {in_path}")
@@ -193,6 +399,11 @@ def main():
 
     convs = load_json(in_path)
     df_sohbet, df_mesaj, df_ozet = normalize(convs)
+    if args.tables_dir:
+        for p in write_tables(Path(args.tables_dir), df_sohbet, df_mesaj, df_ozet, fmt=args.tables_format):
+            print(f"[OK] Tablo: {p}")
+    if args.no_excel:
+        return
     write_excel(out_path, df_sohbet, df_mesaj, df_ozet)
 
     print(f"[OK] Yazıldı: {out_path.resolve()}")
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Kapalı küme etiket normalizasyonu ve bulanık eşleme
+--------------------------------------------------
+- Model çıktılarındaki yazım farklarını ("notr", "ÇÖZÜLDÜ", "bilgi_alma", "Kargo takibii")
+  kanonik etikete ("Nötr", "Çözüldü", "Bilgi alma", "Kargo takibi") eşler; böylece şema
+  doğrulaması yeni bir API çağrısı gerektirmeden geçer ve metriklerde yazım farkı hata sayılmaz.
+- Anahtar (`fold`): Türkçe'ye duyarlı küçük harf (İ → i, I → ı), aksan/şapka temizliği
+  (ç ğ ı ö ş ü â î û → c g i o s u a i u), boşluk/alt çizgi/tire tek boşluğa indirgenir.
+- `LabelIndex` tabloları bir kez kurar:
+  * tam eşleşme: katlanmış anahtar → etiket (tek sözlük erişimi, O(1)),
+  * bulanık eşleşme: her anahtarın en fazla `max_dist` harf silinmiş biçimleri (simetrik silme
+    indeksi). Sorgunun silme komşuları (k adet) aranır, adaylar sınırlı düzenleme mesafesiyle
+    (harf yer değiştirme 1 sayılır) doğrulanır: O(k), etiket sayısından bağımsız.
+  * Kısa etiketlerde izin verilen mesafe azalır (≤3 harf: 0, ≤6 harf: 1); en iyi mesafede birden
+    çok aday varsa tahmin yapılmaz (None). Bulanık sorgu sonuçları indeks başına önbelleklenir
+    (model çıktıları büyük ölçüde tekrar eder).
+
+Kullanım:
+  idx = LabelIndex(["Pozitif", "Negatif", "Nötr"])
+  idx.lookup("NOTR")        # → "Nötr"   (tam, katlanmış)
+  idx.lookup("Pozitf")      # → "Pozitif" (bulanık, mesafe 1)
+  idx.lookup("belki")       # → None
+  snap_series(df["pred_intent"], idx)   # eşlenemeyen değerler olduğu gibi kalır
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set
+
+import pandas as pd
+
+_TR_UPPER = str.maketrans({"İ": "i", "I": "ı"})
+_ASCII = str.maketrans("çğıöşüâîû", "cgiosuaiu")
+_SEP_RE = re.compile(r"[\s_\-]+")
+_STRIP = " .,;:!?\"'`"
+_MEMO_SIZE = 10_000  # bulanık sorgu sonuç önbelleği (etiket indeksi başına)
+
+
+def fold(text) -> str:
+    """Karşılaştırma anahtarı: Türkçe küçük harf + aksansız + tek boşluk."""
+    s = str(text).translate(_TR_UPPER).lower().translate(_ASCII)
+    s = "".join(ch for ch in unicodedata.normalize("NFKD", s) if not unicodedata.combining(ch))
+    return _SEP_RE.sub(" ", s).strip(_STRIP)
+
+
+def _deletes(key: str, max_dist: int) -> Set[str]:
+    """Anahtardan en fazla `max_dist` harf silinerek elde edilen biçimler (kendisi dahil)."""
+    out = level = {key}
+    for _ in range(max_dist):
+        level = {w[:i] + w[i + 1:] for w in level for i in range(len(w))}
+        out = out | level
+    return out
+
+
+def _allowed_dist(length: int, max_dist: int) -> int:
+    if length <= 3:
+        return 0
+    if length <= 6:
+        return min(1, max_dist)
+    return max_dist
+
+
+def bounded_distance(a: str, b: str, limit: int) -> int:
+    """
+    Düzenleme mesafesi (ekle/sil/değiştir + bitişik yer değiştirme); `limit`'i aşarsa `limit + 1`.
+    Satır minimumu sınırı geçince erken çıkar.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2: List[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1] if prev[-1] <= limit else limit + 1
+
+
+class LabelIndex:
+    """
+    Kanonik etiketlerin katlanmış anahtar ve silme komşuluğu tabloları.
+    :param labels: Kanonik etiketler (sıra korunur; katlanınca çakışanlarda ilki kazanır).
+    :param max_dist: Bulanık eşlemede izin verilen en büyük düzenleme mesafesi (0 = yalnızca tam).
+    """
+
+    def __init__(self, labels: Iterable[str], max_dist: int = 2):
+        self.labels: List[str] = [str(l) for l in labels]
+        self.max_dist = max(0, int(max_dist))
+        self._exact: Dict[str, str] = {}
+        for label in self.labels:
+            self._exact.setdefault(fold(label), label)
+        self._canonical = set(self.labels)
+        self._memo: Dict[str, Optional[str]] = {}
+        self._neighbors: Dict[str, Set[str]] = {}
+        if self.max_dist:
+            for key in self._exact:
+                for d in _deletes(key, _allowed_dist(len(key), self.max_dist)):
+                    self._neighbors.setdefault(d, set()).add(key)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def is_canonical(self, value) -> bool:
+        return value in self._canonical
+
+    def lookup(self, value, fuzzy: bool = True) -> Optional[str]:
+        """
+        Değerin kanonik karşılığı: önce katlanmış tam eşleşme, sonra (fuzzy=True ise) sınırlı
+        düzenleme mesafesiyle en yakın tek etiket. Bulunamazsa ya da belirsizse None.
+        """
+        if value is None or (isinstance(value, float) and value != value):
+            return None
+        key = fold(value)
+        hit = self._exact.get(key)
+        if hit is not None or not fuzzy or not self._neighbors or not key:
+            return hit
+        if key in self._memo:
+            return self._memo[key]
+        best, best_keys = self.max_dist + 1, []
+        seen: Set[str] = set()
+        for d in _deletes(key, self.max_dist):
+            for cand in self._neighbors.get(d, ()):
+                if cand in seen:
+                    continue
+                seen.add(cand)
+                limit = min(_allowed_dist(min(len(key), len(cand)), self.max_dist), best)
+                dist = bounded_distance(key, cand, limit)
+                if dist > limit:
+                    continue
+                if dist < best:
+                    best, best_keys = dist, [cand]
+                elif dist == best:
+                    best_keys.append(cand)
+        canon = self._exact[best_keys[0]] if len(best_keys) == 1 else None
+        if len(self._memo) >= _MEMO_SIZE:
+            self._memo.clear()
+        self._memo[key] = canon
+        return canon
+
+
+def snap_series(values: pd.Series, index: LabelIndex, fuzzy: bool = True) -> pd.Series:
+    """
+    Seriyi kanonik etiketlere eşler (benzersiz değerler üzerinden; eşlenemeyen ve eksik değerler
+    olduğu gibi kalır).
+    """
+    uniques = values.dropna().unique()
+    mapping = {}
+    for v in uniques:
+        if index.is_canonical(v):
+            continue
+        canon = index.lookup(v, fuzzy=fuzzy)
+        if canon is not None and canon != v:
+            mapping[v] = canon
+    if not mapping:
+        return values
+    return values.map(lambda v: mapping.get(v, v) if isinstance(v, str) else v)
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+LLM yanıt önbelleği (içerik adresli, kalıcı)
+-------------------------------------------
+- Anahtar: (model, sistem prompt'u, tam prompt) üçlüsünün SHA-256 özeti.
+  Sohbet metni, prompt şablonu, intent listesi ve model değişmedikçe anahtar da değişmez.
+- Depo: tek bir SQLite dosyası (WAL kipinde; birden çok iş parçacığı/işlem güvenle okuyup yazabilir).
+- Tahliye (eviction):
+  * yaşa göre: `max_age_days`'den eski kayıtlar silinir,
+  * boyuta göre: toplam boyut `max_bytes`'ı aşarsa en uzun süredir kullanılmayanlar (LRU) silinir.
+- İsabetlerde erişim zamanı (LRU için) bellekte biriktirilir ve toplu yazılır: her `touch_every`
+  isabette, bir sonraki `put`/`evict`'te ya da `close`'da (isabet başına UPDATE + commit yoktur).
+- Sayaçlar: hits / misses / puts / evictions (`stats()`).
+
+Yalnızca Pydantic doğrulamasından geçmiş yanıtlar saklanır; hatalı yanıtlar önbelleğe girmez.
+
+Kullanım:
+  cache = ResponseCache("outputs/cache/llm_cache.sqlite", max_age_days=30, max_bytes=512 * 2**20)
+  predict_conversations(..., cache=cache)
+  print(cache.stats())
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+
+def cache_key(model: str, system_prompt: str, prompt: str) -> str:
+    """(model, sistem prompt'u, prompt) için kararlı içerik anahtarı üretir."""
+    payload = json.dumps([model, system_prompt, prompt], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite tabanlı kalıcı yanıt önbelleği.
+    :param path: SQLite dosya yolu (klasör yoksa oluşturulur).
+    :param max_age_days: Bu yaştan eski kayıtlar tahliye edilir (None = sınırsız).
+    :param max_bytes: Toplam değer boyutu üst sınırı (None = sınırsız); aşılırsa LRU tahliye.
+    :param evict_every: Kaç yazmada bir tahliye kontrolü yapılacağı.
+    :param touch_every: Erişim zamanlarının kaç isabette bir toplu yazılacağı.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_age_days: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        evict_every: int = 500,
+        touch_every: int = 256,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.evict_every = max(1, evict_every)
+        self.touch_every = max(1, touch_every)
+
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}   # anahtar → henüz yazılmamış son erişim zamanı
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_accessed ON responses(accessed)")
+        self._conn.commit()
+        self.evict()
+
+    # ---------- okuma / yazma ----------
+    def get(self, key: str) -> Optional[str]:
+        """Anahtara karşılık gelen değeri döndürür; yoksa (veya süresi dolmuşsa) None."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self._expired(row[1], now):
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.evictions += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= self.touch_every:
+                self._flush_touched()
+                self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def _flush_touched(self) -> None:
+        """Biriken erişim zamanlarını yazar (kilit altında çağrılır; commit çağırana aittir)."""
+        if self._touched:
+            self._conn.executemany("UPDATE responses SET accessed = ? WHERE key = ?",
+                                   [(t, k) for k, t in self._touched.items()])
+            self._touched.clear()
+
+    def put(self, key: str, value: str, model: Optional[str] = None) -> None:
+        """Değeri yazar (aynı anahtar varsa üzerine yazar)."""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._flush_touched()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, value, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, value, size, now, now),
+            )
+            self._conn.commit()
+            self.puts += 1
+            due = self.puts % self.evict_every == 0
+        if due:
+            self.evict()
+
+    # ---------- tahliye ----------
+    def _expired(self, created: float, now: float) -> bool:
+        return self.max_age_days is not None and created < now - self.max_age_days * 86400
+
+    def evict(self) -> int:
+        """Yaş ve boyut sınırlarını uygular; silinen kayıt sayısını döndürür."""
+        removed = 0
+        with self._lock:
+            self._flush_touched()  # LRU sırası güncel erişim zamanlarıyla belirlenir
+            if self.max_age_days is not None:
+                cutoff = time.time() - self.max_age_days * 86400
+                cur = self._conn.execute("DELETE FROM responses WHERE created < ?", (cutoff,))
+                removed += cur.rowcount
+            if self.max_bytes is not None:
+                total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+                if total > self.max_bytes:
+                    excess = total - self.max_bytes
+                    freed = 0
+                    victims = []
+                    for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed ASC"):
+                        victims.append((key,))
+                        freed += size
+                        if freed >= excess:
+                            break
+                    self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+                    removed += len(victims)
+            self._conn.commit()
+            self.evictions += removed
+        return removed
+
+    # ---------- bilgi ----------
+    def stats(self) -> Dict[str, int]:
+        """İsabet/ıska sayaçları ve depodaki kayıt/bayt sayısı."""
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "puts": self.puts,
+            "evictions": self.evictions,
+            "entries": int(entries),
+            "bytes": int(size),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self) -> "ResponseCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
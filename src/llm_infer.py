@@ -4,8 +4,15 @@ LLM çıkarım katmanı (yapılandırılmış çıktı)
 -----------------------------------------
 - Amaç: Tek bir sohbetten tek satırlık etiketler üretmek.
 - Yöntem: Pydantic şeması ile "yapılandırılmış çıktı" (structured output) kullanılır.
-  * İlk olarak, çıktıyı doğrudan Pydantic nesnesine dönüştürmeye çalışır.
-  * Başarısız olursa, bir JSON nesnesi çıkarmaya geri döner ve ardından Pydantic ile doğrular.
+  Yanıt kademeli ayrıştırılır (`parse_intent_output`); ağ üzerinden yeniden deneme yalnızca üç
+  kademe de başarısızsa yapılır:
+  * strict: orjson (yüklü değilse json) + şemanın derlenmiş doğrulayıcısı,
+  * extract: yanıt saf JSON değilse (açıklama metni, ``` çitleri) dengeli parantez taramasıyla
+    ilk JSON nesnesi çıkarılır,
+  * normalized: etiketler büyük/küçük harf ve aksan katlamasıyla, olmazsa sınırlı düzenleme
+    mesafesiyle kapalı kümelere eşlenir ("notr" → "Nötr", "COZULDU" → "Çözüldü",
+    "Pozitf" → "Pozitif"; bkz. `label_norm`). `intents` verilmişse listede olmayan intent de
+    en yakın izinli intent'e eşlenir (eşlenemezse olduğu gibi kalır).
 - Güvenlik: Kullanıcı isteğine uygun olarak, eğer yanıt boş veya uygunsuz gelirse, süreci durdurmak için bir RuntimeError/SystemExit hatası fırlatır ("boşsa durdur" kuralına göre).
 
 Kullanım:
@@ -15,15 +22,56 @@ Kullanım:
 YENİ eklemeler (yapıyı bozmadan entegre edildi):
 - XLSX'ten okumak için yardımcı işlevler.
 - Komut satırı arayüzü (CLI): `--in-xlsx` argümanı dosyadan okur ve `predict_conversations` işlevini çağırır.
+- Eşzamanlı çıkarım: `--concurrency N` ile aynı anda N istek uçuşta tutulur (iş parçacığı havuzu);
+  çıktı satırları yine girdi sırasıyla yazılır. Testler için `client=` ile yerel bir stub
+  istemci (bkz. `llm_stub.StubChatClient`) verilebilir.
+- Yanıt önbelleği: `--cache PATH` ile (model, sistem prompt'u, prompt) anahtarlı kalıcı SQLite
+  önbelleği kullanılır (bkz. `llm_cache.ResponseCache`); değişmeyen sohbetler API'ye tekrar gitmez.
+- Checkpoint: her tahmin tamamlandıkça `<out>.ckpt.jsonl` dosyasına eklenir (append-only).
+  `--resume` ile checkpoint'te başarılı tahmini olan sohbetler atlanır; son CSV checkpoint'in
+  sıkıştırılmasıyla (her sohbet için son kayıt, girdi sırasıyla) üretilir.
+- Girdi/çıktı biçimi: `--in-table` ile Parquet/Arrow/CSV girdisi okunabilir; `--out` uzantısı
+  .parquet/.arrow ise tahminler kolon bazlı yazılır (bkz. `artifacts`).
+- Hız sınırlama: model başına RPM/TPM token kovası, 429'da Retry-After'a uyan üstel geri çekilme
+  ve uyarlanabilir eşzamanlılık (bkz. `rate_limit`). `--rpm/--tpm` ile profil geçersiz kılınır.
+- Canlı kalite: girdi gold_* kolonları içeriyorsa her tahmin geldikçe `metrics_core.MetricsAccumulator`
+  güncellenir (tahminler gold etiketlerine `metrics_eval` ile aynı şekilde eşlenir), ilerleme
+  çubuğunda anlık accuracy gösterilir; `abort_below` ile belirgin bir
+  prompt gerilemesinde koşu erken durdurulur (checkpoint korunur, `--resume` ile devam edilebilir).
+- Token bütçesi: her isteğin token'ı yerel olarak sayılır ve checkpoint/çıktıya `tokens_in` /
+  `tokens_full` olarak yazılır. `--max-tokens` verilirse uzun sohbetlerin ortası kırpılır
+  (ilk müşteri mesajı + son `--keep-last-turns` tur korunur; bkz. `prompt_budget`).
+  Sistem mesajı (şema + intent listesi) bir kez kurulup yeniden kullanılır.
+- Çoklu sohbet istekleri: `--batch-size K` ile K sohbet tek istekte gönderilir; model
+  `{"results": [...]}` içinde conversation_id anahtarlı K kayıt döndürür. Her kayıt ayrı doğrulanır,
+  yalnızca geçersiz/eksik olanlar tekli isteğe bölünür (istek sayısı ~K kat azalır).
+- Çevrimdışı batch API: `--batch-api` ile tüm prompt'lar sağlayıcının batch dosyasına yazılıp tek iş
+  olarak gönderilir, sonuçlar aynı doğrulama ve yazıcıdan geçer (bkz. `batch_api`).
+- Profil: `--profile [YOL]` ile prompt kurma, önbellek, hız sınırı bekleme, ağ, doğrulama ve
+  checkpoint yazımı ayrı bölümler olarak ölçülür (bkz. `profiling`).
 """
 from __future__ import annotations
 
-import os, json, re, sys, argparse
+import os, json, re, sys, time, argparse, threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Literal, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Literal, Optional, Tuple
 import pandas as pd
 from dotenv import load_dotenv
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, ValidationError, field_validator
+
+from artifacts import read_table, write_table
+from label_norm import LabelIndex, fold
+from llm_cache import ResponseCache, cache_key
+from metrics_core import FIELDS, MetricsAccumulator, gold_vocab, parse_prediction
+from profiling import DEFAULT_TRACE, session, span, traced
+from prompt_budget import PromptBudget, count_tokens
+from rate_limit import (
+    RateLimiter, get_limiter,
+    backoff_delay, is_rate_limited, is_transient, retry_after_seconds,
+)
 
 # API istemcilerini koşullu olarak içe aktar
 try:
@@ -36,6 +84,13 @@ try:
 except ImportError:
     OpenAI = None
 
+# İsteğe bağlı hızlı JSON ayrıştırıcı
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads  # orjson yüklü değilse standart kütüphane
+
 # İsteğe bağlı ilerleme çubuğu
 try:
     from tqdm import tqdm as _tqdm
@@ -85,18 +140,117 @@ class IntentSchema(BaseModel):
 # ------------ Yardımcı Fonksiyonlar ------------
 def _extract_json(text: str) -> Optional[Dict]:
     """
-    Verilen metinden bir JSON nesnesi çıkarır (eğer varsa).
+    Metindeki ilk geçerli JSON nesnesini çıkarır (eğer varsa).
+    Süslü parantezler dengeli taranır (string içindekiler sayılmaz); böylece nesneden sonra gelen
+    açıklama ya da ikinci bir nesne yakalanmaz. Çözülemeyen aday atlanıp sonrakine geçilir.
     """
-    text = text.strip()
-    match = re.search(r"\{.*\}", text, re.DOTALL)
-    if not match:
+    if not text:
         return None
-    
-    json_str = match.group(0)
+    start = text.find("{")
+    while start != -1:
+        depth = 0
+        in_str = escaped = False
+        for i in range(start, len(text)):
+            ch = text[i]
+            if in_str:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_str = False
+            elif ch == '"':
+                in_str = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    try:
+                        obj = _json_loads(text[start:i + 1])
+                    except ValueError:
+                        break
+                    if isinstance(obj, dict):
+                        return obj
+                    break
+        start = text.find("{", start + 1)
+    return None
+
+
+# ------------ Kademeli yanıt ayrıştırma ------------
+_LABEL_INDEX = {
+    "yanit_durumu": LabelIndex(ANS_ALLOWED),
+    "sentiment": LabelIndex(SENT_ALLOWED),
+    "tur": LabelIndex(TUR_ALLOWED),
+}
+_FIELD_KEYS = {fold(k): k for k in IntentSchema.model_fields}
+_parse_counts: Counter = Counter()
+_parse_lock = threading.Lock()
+
+
+def _parse_object(text: Optional[str]) -> Tuple[Optional[Dict], str]:
+    """Kademe 1–2: yanıtın tamamı JSON nesnesiyse 'strict', değilse içinden çıkarılan nesne ('extract')."""
     try:
-        return json.loads(json_str)
-    except json.JSONDecodeError:
-        return None
+        obj = _json_loads(text or "")
+    except ValueError:
+        obj = None
+    if isinstance(obj, dict):
+        return obj, "strict"
+    return _extract_json(text or ""), "extract"
+
+
+def _normalize_labels(obj: Dict) -> Dict:
+    """Kademe 3: alan adlarını ve kapalı küme etiketlerini katlanmış anahtarla kanonik biçime eşler."""
+    out = {_FIELD_KEYS.get(fold(k), k): v for k, v in obj.items()}
+    for field, index in _LABEL_INDEX.items():
+        canon = index.lookup(out.get(field))
+        if canon is not None:
+            out[field] = canon
+    for field in ("intent", "intent_detay"):
+        if isinstance(out.get(field), str):
+            out[field] = out[field].strip()
+    return out
+
+
+@lru_cache(maxsize=32)
+def _intent_index(intents: Tuple[str, ...]) -> Optional[LabelIndex]:
+    """İzinli intent listesinin eşleme indeksi (liste başına bir kez kurulur)."""
+    return LabelIndex(intents) if intents else None
+
+
+def _validate_tiered(model, obj: Dict, tier: str, intents: Optional[List[str]] = None):
+    """
+    Nesneyi doğrular; olmazsa etiketleri normalize edip bir kez daha dener.
+    `intents` verilmişse listede olmayan intent en yakın izinli intent'e eşlenir.
+    """
+    try:
+        validated = model.model_validate(obj)
+    except ValidationError:
+        validated, tier = model.model_validate(_normalize_labels(obj)), "normalized"
+    index = _intent_index(tuple(intents or ()))
+    if index is not None and not index.is_canonical(validated.intent):
+        canon = index.lookup(validated.intent)
+        if canon is not None:
+            validated, tier = validated.model_copy(update={"intent": canon}), "normalized"
+    return validated, tier
+
+
+def parse_intent_output(text: Optional[str], intents: Optional[List[str]] = None) -> Tuple[IntentSchema, str]:
+    """
+    Model yanıtını kademeli olarak `IntentSchema`'ya çevirir (strict → extract → normalized).
+    :return: (doğrulanmış şema, başarılı kademe adı)
+    :raises ValueError: hiçbir kademe geçerli çıktı üretemezse (pydantic ValidationError dahil)
+    """
+    obj, tier = _parse_object(text)
+    if obj is None:
+        raise ValueError(f"Yanıtta JSON nesnesi bulunamadı: {(text or '')[:80]!r}")
+    return _validate_tiered(IntentSchema, obj, tier, intents)
+
+
+def _count_parse(tier: str, n: int = 1) -> None:
+    with _parse_lock:
+        _parse_counts[tier] += n
+
 
 def read_conversations_from_xlsx(
     xlsx_path: str,
@@ -112,15 +266,85 @@ def read_conversations_from_xlsx(
     return df[["conversation_id", "dialog_text"]]
 
 
+@traced("llm_infer.read_conversations")
+def read_conversations(
+    path: str,
+    id_col: str = "sohbet_id",
+    text_col: str = "tam_sohbet",
+    sheet_name: str = "sohbetler",
+) -> pd.DataFrame:
+    """
+    Sohbetleri XLSX, Parquet, Arrow IPC ya da CSV dosyasından okur (uzantıya göre).
+    Kolon bazlı biçimlerde yalnızca gereken iki kolon okunur.
+    """
+    if Path(path).suffix.lower() in (".xlsx", ".xls"):
+        return read_conversations_from_xlsx(path, id_col=id_col, text_col=text_col, sheet_name=sheet_name)
+    df = read_table(path, columns=[id_col, text_col])
+    df = df.rename(columns={id_col: "conversation_id", text_col: "dialog_text"})
+    return df[["conversation_id", "dialog_text"]]
+
+
+def _build_system_prompt(intents: Optional[List[str]] = None) -> str:
+    """
+    Şema (ve varsa intent listesi) ile sistem mesajını oluşturur.
+    Her çağrıda yeniden kurulmaz: intent listesi başına bir kez üretilip önbellekte tutulur.
+    """
+    return _system_prompt_for(tuple(intents or ()))
+
+
+@lru_cache(maxsize=32)
+def _system_prompt_for(intents: Tuple[str, ...]) -> str:
+    system_prompt = (
+        f"Verilen sohbeti aşağıdaki formatta sınıflandır: "
+        f"{IntentSchema.model_json_schema()}"
+    )
+    if intents:
+        system_prompt += f"\nSadece bu intent'leri kullan: {list(intents)}"
+    return system_prompt
+
+
+def _chat_completion(client, model: str, messages: List[Dict], limiter: Optional[RateLimiter], est_tokens: int) -> str:
+    """
+    Tek bir JSON kipli sohbet isteği atar ve yanıt metnini döndürür
+    (sınırlayıcı varsa slot + kova beklemesi).
+    """
+    if limiter is not None:
+        with limiter.slot():
+            with span("llm_infer.rate_limit_wait"):
+                limiter.acquire(tokens=est_tokens)
+            with span("llm_infer.network", model=model):
+                response = client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    response_format={"type": "json_object"},
+                )
+        limiter.on_success()
+    else:
+        with span("llm_infer.network", model=model):
+            response = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                response_format={"type": "json_object"},
+            )
+    return response.choices[0].message.content
+
+
 def _call_llm_with_retries(
     client,
     prompt: str,
     intents: Optional[List[str]] = None,
     max_retries: int = 2,
     model: Optional[str] = None,
+    cache: Optional[ResponseCache] = None,
+    limiter: Optional[RateLimiter] = None,
+    max_throttle_retries: int = 8,
 ) -> Dict:
     """
     LLM'i çağırır ve yanıtı doğrulamaya çalışır.
+    `cache` verilirse önce önbelleğe bakılır; doğrulanmış yanıtlar önbelleğe yazılır.
+    `limiter` verilirse istekler model başına RPM/TPM kovalarından ve uyarlanabilir eşzamanlılık
+    kapısından geçer. 429 yanıtları `max_retries` hakkından düşülmez; üstel geri çekilme + jitter
+    ile (Retry-After'a uyularak) en fazla `max_throttle_retries` kez yeniden denenir.
     """
     if not prompt:
         return {"error": "Boş prompt", "raw_model_output": ""}
@@ -129,61 +353,194 @@ def _call_llm_with_retries(
         raise SystemExit("Hata: '--model' argümanı belirtilmedi.")
 
     # Sistem mesajına intent listesi ekleniyor
-    system_prompt = (
-        f"Verilen sohbeti aşağıdaki formatta sınıflandır: "
-        f"{IntentSchema.model_json_schema()}"
-    )
-    if intents:
-        system_prompt += f"\nSadece bu intent'leri kullan: {intents}"
+    system_prompt = _build_system_prompt(intents)
+
+    key = None
+    if cache is not None:
+        key = cache_key(model, system_prompt, prompt)
+        with span("llm_infer.cache_get"):
+            cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt},
+    ]
+    est_tokens = count_tokens(system_prompt) + count_tokens(prompt) + 150
 
-    for attempt in range(max_retries):
+    attempt = 0
+    throttles = 0
+    while attempt < max_retries:
+        model_output = ""
         try:
-            # İstemci türüne göre API çağrısını yap
-            response = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt},
-                ],
-                response_format={"type": "json_object"},
-            )
-            
-            model_output = response.choices[0].message.content
-            
-            # Pydantic ile doğrulama
-            validated_output = IntentSchema.model_validate_json(model_output)
-            return validated_output.model_dump_json()
+            model_output = _chat_completion(client, model, messages, limiter, est_tokens)
+
+            # Kademeli ayrıştırma + Pydantic doğrulaması (hepsi başarısızsa yeniden istek)
+            with span("llm_infer.validate"):
+                validated_output, tier = parse_intent_output(model_output, intents)
+                result = validated_output.model_dump_json()
+            _count_parse(tier)
+            if cache is not None:
+                cache.put(key, result, model=model)
+            return result
 
         except Exception as e:
+            # 429: deneme hakkı yakmadan geri çekil (Retry-After'a uy), eşzamanlılığı düşür
+            if is_rate_limited(e) and throttles < max_throttle_retries:
+                throttles += 1
+                retry_after = retry_after_seconds(e)
+                if limiter is not None:
+                    limiter.on_throttle(retry_after)
+                delay = backoff_delay(throttles, retry_after=retry_after)
+                print(f"Hız sınırı (429), {delay:.1f} sn bekleniyor ({throttles}/{max_throttle_retries})", file=sys.stderr)
+                time.sleep(delay)
+                continue
+
             # Hata durumunda yeniden dene
-            print(f"Hata oluştu (deneme {attempt+1}/{max_retries}): {e}", file=sys.stderr)
-            if attempt == max_retries - 1:
-                return {"error": f"Maksimum deneme sayısı aşıldı: {e}", "raw_model_output": model_output if 'model_output' in locals() else ""}
+            attempt += 1
+            print(f"Hata oluştu (deneme {attempt}/{max_retries}): {e}", file=sys.stderr)
+            if attempt >= max_retries:
+                return {"error": f"Maksimum deneme sayısı aşıldı: {e}", "raw_model_output": model_output}
+            # Geçici ağ/sunucu hatasında bekle; doğrulama hatasında hemen yeniden dene
+            if is_transient(e):
+                time.sleep(backoff_delay(attempt))
     
     return {"error": "Tahmin yapılamadı.", "raw_model_output": ""}
 
-def predict_conversations(
-    conversations: pd.DataFrame,
+# ------------ Çoklu sohbet (batch) istekleri ------------
+class BatchItem(IntentSchema):
+    conversation_id: str
+
+
+class BatchResponse(BaseModel):
+    results: List[Dict]
+
+
+_BATCH_HEADER = "=== SOHBET conversation_id={cid} ==="
+_BATCH_INSTRUCTION = (
+    "\n\nÇOKLU SOHBET KİPİ:\n"
+    "- Yukarıda {k} ayrı sohbet var; her biri '=== SOHBET conversation_id=… ===' satırıyla başlar.\n"
+    "- Her sohbeti diğerlerinden BAĞIMSIZ olarak sınıflandır.\n"
+    "- Tek satırlık JSON yerine şu biçimde TEK bir JSON nesnesi üret (her conversation_id için bir kayıt):\n"
+    '{{"results":[{{"conversation_id":"…","yanit_durumu":"…","sentiment":"…","tur":"…",'
+    '"intent":"…","intent_detay":"…"}}, …]}}'
+)
+
+
+@lru_cache(maxsize=32)
+def _batch_system_prompt_for(intents: Tuple[str, ...]) -> str:
+    system_prompt = (
+        f"Verilen sohbetlerin her birini aşağıdaki formatta sınıflandır ve sonuçları "
+        f"'results' dizisinde döndür: {BatchItem.model_json_schema()}"
+    )
+    if intents:
+        system_prompt += f"\nSadece bu intent'leri kullan: {list(intents)}"
+    return system_prompt
+
+
+def _build_batch_prompt(prompt_template: str, items: List[Tuple[str, str]]) -> str:
+    """K sohbeti başlık satırlarıyla tek bloğa koyar ve çoklu çıktı talimatını ekler."""
+    block = "\n\n".join(f"{_BATCH_HEADER.format(cid=cid)}\n{dialog}" for cid, dialog in items)
+    return prompt_template.replace("<<DIALOG_BLOK>>", block) + _BATCH_INSTRUCTION.format(k=len(items))
+
+
+def _call_llm_batch(
+    client,
+    items: List[Tuple[str, str]],
     prompt_template: str,
-    out_path: str,
     intents: Optional[List[str]] = None,
     model: Optional[str] = None,
-) -> pd.DataFrame:
+    limiter: Optional[RateLimiter] = None,
+    max_throttle_retries: int = 8,
+) -> Dict[str, str]:
     """
-    Sohbetleri tahmin eder ve CSV'ye yazar.
-    :param conversations: 'conversation_id' ve 'dialog_text' sütunlarını içeren DataFrame.
-    :param prompt_template: `<<DIALOG_BLOK>>` içeren prompt şablonu.
-    :param out_path: Çıktı CSV dosya yolu.
-    :param intents: İsteğe bağlı intent listesi (kapalı küme).
-    :param model: Kullanılacak modelin adı.
-    :return: Tahminleri içeren bir DataFrame.
+    K sohbeti (conversation_id, sohbet metni) tek istekte sınıflandırır.
+    Yanıttaki her kayıt `IntentSchema` ile ayrı ayrı doğrulanır.
+    :return: str(conversation_id) → doğrulanmış JSON. Geçersiz, eksik ya da istek hatası nedeniyle
+             dönmeyen sohbetler sözlükte yer almaz (çağıran tekli isteğe böler).
     """
-    if not _tqdm:
-        print("Uyarı: tqdm kütüphanesi yüklü değil, ilerleme çubuğu gösterilmeyecek.")
+    if not model:
+        raise SystemExit("Hata: '--model' argümanı belirtilmedi.")
+    system_prompt = _batch_system_prompt_for(tuple(intents or ()))
+    prompt = _build_batch_prompt(prompt_template, items)
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt},
+    ]
+    est_tokens = count_tokens(system_prompt) + count_tokens(prompt) + 150 * len(items)
 
-    # API istemcisini başlat
+    throttles = 0
+    while True:
+        try:
+            model_output = _chat_completion(client, model, messages, limiter, est_tokens)
+            break
+        except Exception as e:
+            if is_rate_limited(e) and throttles < max_throttle_retries:
+                throttles += 1
+                retry_after = retry_after_seconds(e)
+                if limiter is not None:
+                    limiter.on_throttle(retry_after)
+                delay = backoff_delay(throttles, retry_after=retry_after)
+                print(f"Hız sınırı (429), {delay:.1f} sn bekleniyor ({throttles}/{max_throttle_retries})", file=sys.stderr)
+                time.sleep(delay)
+                continue
+            print(f"Hata oluştu (çoklu istek, {len(items)} sohbet tekli isteğe bölünüyor): {e}", file=sys.stderr)
+            return {}
+
+    with span("llm_infer.validate", k=len(items)):
+        try:
+            obj, wrapper_tier = _parse_object(model_output)
+            if obj is None:
+                raise ValueError("yanıtta JSON nesnesi yok")
+            results = BatchResponse.model_validate(obj).results
+        except Exception as e:
+            print(f"Hata oluştu (çoklu yanıt çözülemedi, {len(items)} sohbet tekli isteğe bölünüyor): {e}", file=sys.stderr)
+            return {}
+
+        wanted = {cid for cid, _ in items}
+        out: Dict[str, str] = {}
+        for item in results:
+            if isinstance(item, dict) and "conversation_id" in item:
+                item = {**item, "conversation_id": str(item["conversation_id"])}
+            try:
+                validated, tier = _validate_tiered(BatchItem, item, wrapper_tier, intents)
+            except Exception:
+                continue
+            if validated.conversation_id in wanted and validated.conversation_id not in out:
+                out[validated.conversation_id] = IntentSchema.model_validate(
+                    validated.model_dump(exclude={"conversation_id"})).model_dump_json()
+                _count_parse(tier)
+    return out
+
+
+def _chunked(items: Iterable, size: int) -> Iterator[List]:
+    """Öğeleri `size` uzunluğunda listeler hâlinde üretir (son parça kısa olabilir)."""
+    chunk: List = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _flatten(chunks: Iterator[List]) -> Iterator:
+    """Liste üreten bir üreticiyi düzleştirir; kapatılınca alttaki üreticiyi de kapatır."""
+    try:
+        for chunk in chunks:
+            yield from chunk
+    finally:
+        chunks.close()
+
+
+def _build_client(model: Optional[str]):
+    """
+    Model adına göre API istemcisini kurar ('gpt' içeren modeller OpenAI, diğerleri Groq).
+    """
     load_dotenv()
-    
+
     client = None
     if model and 'gpt' in model.lower():
         if OpenAI:
@@ -195,35 +552,339 @@ def predict_conversations(
             client = Groq(api_key=os.getenv("GROQ_API_KEY"))
         else:
             raise SystemExit("Hata: Groq kütüphanesi yüklü değil. Lütfen `pip install groq` komutunu çalıştırın.")
-    
+
     if not client:
         raise SystemExit("Hata: '--model' argümanı veya .env içinde API anahtarı tanımlı değil.")
-        
-    predictions = []
-    
-    iter_convs = _tqdm(conversations.itertuples(), total=len(conversations)) if _tqdm else conversations.itertuples()
-    
-    for row in iter_convs:
-        full_prompt = prompt_template.replace("<<DIALOG_BLOK>>", row.dialog_text)
-        
+    return client
+
+
+def _run_ordered(fn: Callable, items: Iterable, concurrency: int = 1) -> Iterator:
+    """
+    `fn`'i her öğeye uygular ve sonuçları GİRDİ SIRASIYLA üretir.
+    - concurrency <= 1: sıradan, tek iş parçacıklı döngü.
+    - concurrency > 1: en fazla `concurrency` çağrı aynı anda çalışır; bekleyen iş kuyruğu
+      2×concurrency ile sınırlıdır (tüm girdi bir kerede kuyruğa alınmaz, bellek sabit kalır).
+    """
+    if concurrency <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    window = 2 * concurrency
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending: deque = deque()
+        try:
+            for item in items:
+                pending.append(pool.submit(fn, item))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # tüketici erken çıkarsa (örn. erken durdurma) başlamamış işler iptal edilir
+            for fut in pending:
+                fut.cancel()
+
+
+def _default_checkpoint_path(out_path: str) -> Path:
+    """`outputs/preds.csv` → `outputs/preds.ckpt.jsonl`"""
+    return Path(out_path).with_suffix(".ckpt.jsonl")
+
+
+def _to_jsonable(v):
+    """NumPy skalerlerini (örn. int64 conversation_id) JSON'a yazılabilir Python tiplerine çevirir."""
+    return v.item() if hasattr(v, "item") else v
+
+
+def _read_checkpoint(path: Path) -> Dict[str, Dict]:
+    """
+    Checkpoint JSONL'ini okur: str(conversation_id) → son kayıt.
+    Yarım yazılmış (kesintiyle bozulmuş) son satır sessizce atlanır.
+    """
+    records: Dict[str, Dict] = {}
+    if not path.exists():
+        return records
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[str(rec.get("conversation_id"))] = rec
+    return records
+
+
+def _is_success(prediction) -> bool:
+    """Başarılı tahminler JSON string'dir; hatalar {"error": ...} sözlüğü olarak saklanır."""
+    return isinstance(prediction, str)
+
+
+@traced("llm_infer.compact_checkpoint")
+def compact_checkpoint(checkpoint_path: Path, conversation_ids: Iterable, out_path: str) -> pd.DataFrame:
+    """
+    Checkpoint'i son CSV'ye sıkıştırır: her sohbet için son kayıt, `conversation_ids` sırasıyla.
+    Checkpoint'te olmayan sohbetler çıktıya yazılmaz.
+    """
+    records = _read_checkpoint(Path(checkpoint_path))
+    rows = []
+    for cid in conversation_ids:
+        rec = records.get(str(cid))
+        if rec is not None:
+            rows.append({"conversation_id": cid, "prediction": rec.get("prediction"),
+                         "tokens_in": rec.get("tokens_in"), "tokens_full": rec.get("tokens_full")})
+    df_preds = pd.DataFrame(rows, columns=["conversation_id", "prediction", "tokens_in", "tokens_full"])
+    write_table(df_preds, out_path, kind="predictions")
+    return df_preds
+
+
+def _gold_lookup(conversations: pd.DataFrame) -> Dict[str, Dict]:
+    """str(conversation_id) → {gold_* kolonu: değer}; gold kolonu yoksa boş sözlük."""
+    cols = [g for _, g, _ in FIELDS if g in conversations.columns]
+    if not cols:
+        return {}
+    ids = conversations["conversation_id"].astype(str)
+    return dict(zip(ids, conversations[cols].to_dict("records")))
+
+
+def _format_live(snap: Dict[str, float]) -> Dict[str, str]:
+    """İlerleme çubuğu için kısa anlık metrikler."""
+    keys = [("intent_acc", "int"), ("sentiment_acc", "sent"), ("yanit_durumu_acc", "yd"), ("triple_correct", "3x")]
+    return {short: f"{snap[k]:.2f}" for k, short in keys if k in snap}
+
+
+@traced("llm_infer.predict_conversations")
+def predict_conversations(
+    conversations: pd.DataFrame,
+    prompt_template: str,
+    out_path: str,
+    intents: Optional[List[str]] = None,
+    model: Optional[str] = None,
+    concurrency: int = 1,
+    client=None,
+    cache: Optional[ResponseCache] = None,
+    checkpoint_path: Optional[str] = None,
+    resume: bool = False,
+    limiter: Optional[RateLimiter] = None,
+    accumulator: Optional[MetricsAccumulator] = None,
+    abort_below: Optional[float] = None,
+    abort_metric: str = "triple_correct",
+    abort_min_n: int = 30,
+    budget: Optional[PromptBudget] = None,
+    batch_size: int = 1,
+) -> pd.DataFrame:
+    """
+    Sohbetleri tahmin eder ve CSV'ye yazar.
+    :param conversations: 'conversation_id' ve 'dialog_text' sütunlarını içeren DataFrame.
+    :param prompt_template: `<<DIALOG_BLOK>>` içeren prompt şablonu.
+    :param out_path: Çıktı CSV dosya yolu.
+    :param intents: İsteğe bağlı intent listesi (kapalı küme).
+    :param model: Kullanılacak modelin adı.
+    :param concurrency: Aynı anda uçuşta tutulacak istek sayısı (1 = sıralı).
+    :param client: İsteğe bağlı hazır istemci (örn. testlerde `llm_stub.StubChatClient`);
+                   verilmezse model adına göre OpenAI/Groq istemcisi kurulur.
+    :param cache: İsteğe bağlı kalıcı yanıt önbelleği (`llm_cache.ResponseCache`).
+    :param checkpoint_path: Tahminlerin akıtıldığı JSONL (varsayılan: `<out>.ckpt.jsonl`).
+    :param resume: True ise checkpoint'te başarılı tahmini olan sohbetler atlanır
+                   (hatalı kalanlar yeniden denenir); False ise checkpoint baştan yazılır.
+    :param limiter: İsteğe bağlı paylaşılan hız sınırlayıcı (`rate_limit.get_limiter(model)`).
+    :param accumulator: Canlı metrik toplayıcı; verilmezse ve girdide gold_* kolonları varsa oluşturulur.
+    :param abort_below: En az `abort_min_n` sohbetten sonra `abort_metric` (örn. 'triple_correct',
+                        'intent_acc') bu değerin altındaysa koşu durdurulur (SystemExit).
+    :param budget: İstek başına token bütçesi (`prompt_budget.PromptBudget`); verilmezse sohbetler
+                   kırpılmaz, yalnızca token sayıları raporlanır.
+    :param batch_size: >1 ise K sohbet tek istekte sınıflandırılır (sabit prompt payı K'ya bölünür);
+                       yanıtta geçersiz/eksik kalan sohbetler tekli isteğe düşer. Önbellek her sohbet
+                       için tekli istek anahtarıyla paylaşılır. `tokens_in` bu kipte paylaştırılmış paydır.
+    :return: Tahminleri içeren bir DataFrame (satırlar girdi sırasıyla).
+    """
+    if not _tqdm:
+        print("Uyarı: tqdm kütüphanesi yüklü değil, ilerleme çubuğu gösterilmeyecek.")
+
+    # API istemcisini başlat
+    if client is None:
+        client = _build_client(model)
+
+    ckpt = Path(checkpoint_path) if checkpoint_path else _default_checkpoint_path(out_path)
+    ckpt.parent.mkdir(parents=True, exist_ok=True)
+
+    todo = conversations
+    if resume:
+        done = {cid for cid, rec in _read_checkpoint(ckpt).items() if _is_success(rec.get("prediction"))}
+        if done:
+            todo = conversations[~conversations["conversation_id"].astype(str).isin(done)]
+            print(f"[resume] {len(conversations) - len(todo)} sohbet checkpoint'ten alındı, {len(todo)} kaldı.")
+    elif ckpt.exists():
+        ckpt.unlink()
+
+    gold = _gold_lookup(conversations)
+    if accumulator is None and gold:
+        accumulator = MetricsAccumulator(vocab=gold_vocab(conversations))
+    if accumulator is not None and resume:
+        for cid, rec in _read_checkpoint(ckpt).items():
+            if cid in gold and _is_success(rec.get("prediction")):
+                accumulator.update(gold[cid], parse_prediction(rec["prediction"]))
+
+    budget = budget or PromptBudget()
+    with _parse_lock:
+        parse_before = Counter(_parse_counts)
+    # sohbet dışındaki sabit pay (sistem mesajı + şablon) bir kez sayılır
+    overhead = count_tokens(_build_system_prompt(intents)) + count_tokens(prompt_template.replace("<<DIALOG_BLOK>>", ""))
+
+    def _predict_one(row) -> Dict:
+        with span("llm_infer.prompt_build"):
+            dialog, info = budget.fit(row.dialog_text, overhead=overhead)
+            full_prompt = prompt_template.replace("<<DIALOG_BLOK>>", dialog)
+
         llm_response = _call_llm_with_retries(
             client,
             full_prompt,
             intents=intents,
             model=model,
+            cache=cache,
+            limiter=limiter,
         )
-        
-        predictions.append({
-            "conversation_id": row.conversation_id,
-            "prediction": llm_response
-        })
 
-    df_preds = pd.DataFrame(predictions)
-    
-    df_preds.to_csv(out_path, index=False)
+        return {
+            "conversation_id": _to_jsonable(row.conversation_id),
+            "prediction": llm_response,
+            "tokens_in": info.tokens_in,
+            "tokens_full": info.tokens_full,
+        }
+
+    system_prompt = _build_system_prompt(intents)
+    batch_overhead = (count_tokens(_batch_system_prompt_for(tuple(intents or ())))
+                      + count_tokens(_build_batch_prompt(prompt_template, [])))
+
+    def _predict_chunk(rows) -> List[Dict]:
+        with span("llm_infer.prompt_build", k=len(rows)):
+            fitted = [(row, *budget.fit(row.dialog_text, overhead=overhead)) for row in rows]
+            prompts = [prompt_template.replace("<<DIALOG_BLOK>>", dialog) for _, dialog, _ in fitted]
+            keys = [cache_key(model, system_prompt, p) for p in prompts] if cache is not None and model else None
+        preds: Dict[int, object] = {}
+        shared: Dict[int, int] = {}
+
+        todo_idx = []
+        with span("llm_infer.cache_get", k=len(rows)):
+            for i in range(len(fitted)):
+                hit = cache.get(keys[i]) if keys else None
+                if hit is not None:
+                    preds[i] = hit
+                else:
+                    todo_idx.append(i)
+
+        if len(todo_idx) > 1:
+            got = _call_llm_batch(
+                client,
+                [(str(fitted[i][0].conversation_id), fitted[i][1]) for i in todo_idx],
+                prompt_template,
+                intents=intents,
+                model=model,
+                limiter=limiter,
+            )
+            share = -(-batch_overhead // len(todo_idx))
+            for i in todo_idx:
+                res = got.get(str(fitted[i][0].conversation_id))
+                if res is None:
+                    continue
+                preds[i] = res
+                shared[i] = share + fitted[i][2].tokens_in - overhead
+                if keys:
+                    cache.put(keys[i], res, model=model)
+
+        out = []
+        for i, (row, _, info) in enumerate(fitted):
+            if i not in preds:
+                # çoklu yanıtta geçersiz/eksik → tekli istek (önbellek yukarıda zaten sorgulandı;
+                # yeniden sorgulamak ıskalamayı iki kez sayardı)
+                preds[i] = _call_llm_with_retries(
+                    client, prompts[i], intents=intents, model=model, cache=None, limiter=limiter)
+                if keys and _is_success(preds[i]):
+                    cache.put(keys[i], preds[i], model=model)
+            out.append({
+                "conversation_id": _to_jsonable(row.conversation_id),
+                "prediction": preds[i],
+                "tokens_in": shared.get(i, info.tokens_in),
+                "tokens_full": info.tokens_full,
+            })
+        return out
+
+    if batch_size > 1:
+        chunks = _run_ordered(_predict_chunk, _chunked(todo.itertuples(), batch_size), concurrency=concurrency)
+        results = _flatten(chunks)
+    else:
+        results = _run_ordered(_predict_one, todo.itertuples(), concurrency=concurrency)
+    iter_results = _tqdm(results, total=len(todo)) if _tqdm else results
+
+    # Her tahmin tamamlanır tamamlanmaz diske (bellekte liste biriktirilmez)
+    aborted = None
+    tok_in = tok_full = n_compacted = 0
+    with ckpt.open("a", encoding="utf-8") as f:
+        for rec in iter_results:
+            with span("llm_infer.checkpoint_write"):
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                f.flush()
+            tok_in += rec["tokens_in"]
+            tok_full += rec["tokens_full"]
+            n_compacted += rec["tokens_in"] < rec["tokens_full"]
+
+            g = gold.get(str(rec["conversation_id"]))
+            if accumulator is None or g is None:
+                continue
+            accumulator.update(g, parse_prediction(rec["prediction"]))
+            if accumulator.n % 10 and abort_below is None:
+                continue
+            snap = accumulator.snapshot()
+            if _tqdm and accumulator.n % 10 == 0:
+                iter_results.set_postfix(_format_live(snap), refresh=False)
+            if (abort_below is not None and accumulator.n >= abort_min_n
+                    and snap.get(abort_metric, 1.0) < abort_below):
+                aborted = snap
+                break
+        if aborted is not None:
+            results.close()  # bekleyen (başlamamış) istekleri iptal et
+
+    df_preds = compact_checkpoint(ckpt, conversations["conversation_id"], out_path)
+
+    if tok_full:
+        saved = 1 - tok_in / tok_full
+        print(f"[tokens] girdi={tok_in} (kırpılmamış {tok_full}, tasarruf %{100 * saved:.1f}); "
+              f"azaltılan sohbet={n_compacted}")
+    with _parse_lock:
+        parsed = _parse_counts - parse_before
+    if parsed:
+        print("[parse] " + " ".join(f"{t}={parsed[t]}" for t in ("strict", "extract", "normalized")))
+
+    if accumulator is not None and accumulator.n:
+        snap = accumulator.snapshot()
+        print("[metrics] " + " ".join(f"{k}={v}" for k, v in _format_live(snap).items()) + f" (n={snap['n']})")
+    if aborted is not None:
+        raise SystemExit(
+            f"Hata: erken durdurma — {abort_metric}={aborted.get(abort_metric, 0.0):.3f} < {abort_below} "
+            f"(n={aborted['n']}). Tamamlanan tahminler {ckpt} içinde; --resume ile devam edilebilir."
+        )
+
+    if cache is not None:
+        st = cache.stats()
+        print(f"[cache] hit={st['hits']} miss={st['misses']} kayıt={st['entries']}")
 
     return df_preds
 
+def open_cache(
+    path: Optional[str],
+    max_age_days: Optional[float] = None,
+    max_mb: Optional[float] = None,
+) -> Optional[ResponseCache]:
+    """
+    CLI argümanlarından önbelleği açar; yol verilmemişse None döner.
+    """
+    if not path:
+        return None
+    max_bytes = int(max_mb * 2**20) if max_mb else None
+    return ResponseCache(path, max_age_days=max_age_days, max_bytes=max_bytes)
+
 # ------------ CLI Giriş Noktası ------------
 def _parse_args() -> argparse.Namespace:
     """
@@ -232,6 +893,8 @@ def _parse_args() -> argparse.Namespace:
     ap = argparse.ArgumentParser(description="LLM Çıkarım CLI.")
     ap.add_argument("--in-xlsx", type=str, required=False,
                     help="Girdi XLSX yolu (CLI için zorunlu)")
+    ap.add_argument("--in-table", type=str, required=False,
+                    help="Girdi tablo yolu (.parquet / .arrow / .csv); --in-xlsx yerine kullanılabilir")
     ap.add_argument("--sheet-name", type=str, required=False, default="sohbetler",
                     help="XLSX içindeki sayfa adı")
     ap.add_argument("--id-col", type=str, required=False, default="sohbet_id",
@@ -246,6 +909,48 @@ def _parse_args() -> argparse.Namespace:
                     help="Modeli geçersiz kılma (örn: gpt-3.5-turbo).")
     ap.add_argument("--intents", type=str, nargs="*", default=None,
                     help="İsteğe bağlı intent listesi (kullanılmıyorsa boş bırak)")
+    ap.add_argument("--concurrency", type=int, default=1,
+                    help="Aynı anda uçuşta tutulacak istek sayısı (1 = sıralı)")
+    ap.add_argument("--rpm", type=float, default=None,
+                    help="Dakikadaki istek sınırı (varsayılan: sağlayıcı/model profili)")
+    ap.add_argument("--tpm", type=float, default=None,
+                    help="Dakikadaki token sınırı (varsayılan: sağlayıcı/model profili)")
+    ap.add_argument("--no-rate-limit", action="store_true",
+                    help="İstemci tarafı hız sınırlamayı kapat")
+    ap.add_argument("--checkpoint", type=str, default=None,
+                    help="Checkpoint JSONL yolu (varsayılan: <out>.ckpt.jsonl)")
+    ap.add_argument("--resume", action="store_true",
+                    help="Checkpoint'te başarılı tahmini olan sohbetleri atla ve kaldığı yerden devam et")
+    ap.add_argument("--cache", type=str, default=None,
+                    help="Kalıcı yanıt önbelleği (SQLite) yolu, örn: outputs/cache/llm_cache.sqlite")
+    ap.add_argument("--cache-max-age-days", type=float, default=None,
+                    help="Bu yaştan eski önbellek kayıtlarını tahliye et")
+    ap.add_argument("--cache-max-mb", type=float, default=None,
+                    help="Önbellek boyut üst sınırı (MB); aşılırsa en eski kullanılanlar silinir")
+    ap.add_argument("--abort-below", type=float, default=None,
+                    help="Gold varsa: canlı metrik bu değerin altına düşerse koşuyu durdur")
+    ap.add_argument("--abort-metric", type=str, default="triple_correct",
+                    help="Erken durdurmada izlenecek metrik (triple_correct, intent_acc, sentiment_f1, ...)")
+    ap.add_argument("--abort-min-n", type=int, default=30,
+                    help="Erken durdurma kararı için gereken en az sohbet sayısı")
+    ap.add_argument("--max-tokens", type=int, default=None,
+                    help="İstek başına token bütçesi (sistem + prompt); aşan sohbetlerin ortası kırpılır")
+    ap.add_argument("--keep-last-turns", type=int, default=6,
+                    help="Kırpmada korunacak son tur sayısı (ilk müşteri mesajı her zaman korunur)")
+    ap.add_argument("--batch-size", type=int, default=1,
+                    help="Tek istekte sınıflandırılacak sohbet sayısı (1 = sohbet başına bir istek)")
+    ap.add_argument("--batch-api", action="store_true",
+                    help="Eşzamanlı istekler yerine sağlayıcının çevrimdışı batch API'sini kullan (bkz. batch_api)")
+    ap.add_argument("--batch-local", type=str, default=None,
+                    help="Batch API yerine bu klasörde dosya tabanlı yerel karşılığı kullan (test)")
+    ap.add_argument("--batch-poll", type=float, default=60.0,
+                    help="Batch işi durum sorgulama aralığı (saniye)")
+    ap.add_argument("--batch-timeout", type=float, default=None,
+                    help="Batch işini en fazla bu kadar bekle (saniye); iş sürer, komut yeniden çalıştırılınca devam edilir")
+    ap.add_argument("--profile", nargs="?", const=DEFAULT_TRACE, default=None, metavar="TRACE_JSON",
+                    help=f"Aşama profilini aç; Chrome trace JSON'u yaz (varsayılan yol: {DEFAULT_TRACE})")
+    ap.add_argument("--profile-alloc", action="store_true",
+                    help="Profilde bellek ayırma farklarını da ölç (tracemalloc; koşuyu yavaşlatır)")
 
     return ap.parse_args()
 
@@ -255,13 +960,18 @@ def main() -> None:
     CLI'yı çalıştırmak için ana işlev.
     """
     args = _parse_args()
+    with session(args.profile, alloc=args.profile_alloc):
+        _run(args)
+
 
-    if not args.in_xlsx:
-        print("Uyarı: --in-xlsx verilmedi. Bu dosya normalde dışarıdan DataFrame alarak da çalışır (predict_conversations). CLI ile XLSX kullanmak için --in-xlsx verin.", file=sys.stderr)
+def _run(args: argparse.Namespace) -> None:
+    in_path = args.in_table or args.in_xlsx
+    if not in_path:
+        print("Uyarı: --in-xlsx / --in-table verilmedi. Bu dosya normalde dışarıdan DataFrame alarak da çalışır (predict_conversations). CLI ile dosyadan okumak için --in-xlsx veya --in-table verin.", file=sys.stderr)
         sys.exit(2)
 
-    df_convs = read_conversations_from_xlsx(
-        xlsx_path=args.in_xlsx,
+    df_convs = read_conversations(
+        in_path,
         id_col=args.id_col,
         text_col=args.text_col,
         sheet_name=args.sheet_name,
@@ -274,12 +984,47 @@ def main() -> None:
         raise SystemExit(f"Hata: Prompt şablon dosyası bulunamadı: {prompt_path}")
     prompt_template = prompt_path.read_text(encoding="utf-8")
 
+    cache = open_cache(args.cache, args.cache_max_age_days, args.cache_max_mb)
+    budget = PromptBudget(max_tokens=args.max_tokens, keep_last=args.keep_last_turns)
+
+    if args.batch_api:
+        from batch_api import LocalBatchClient, OpenAIBatchClient, run_batch_job
+        batch_client = (LocalBatchClient(args.batch_local) if args.batch_local
+                        else OpenAIBatchClient(_build_client(args.model)))
+        run_batch_job(
+            conversations=df_convs,
+            prompt_template=prompt_template,
+            out_path=args.out,
+            model=args.model,
+            batch_client=batch_client,
+            intents=intents,
+            budget=budget,
+            cache=cache,
+            checkpoint_path=args.checkpoint,
+            resume=args.resume,
+            poll_interval=args.batch_poll,
+            timeout=args.batch_timeout,
+        )
+        print(f"\nTahminler başarıyla {args.out} dosyasına yazıldı.")
+        return
+
     predict_conversations(
         conversations=df_convs,
         prompt_template=prompt_template,
         out_path=args.out,
         intents=intents,
         model=args.model,
+        concurrency=args.concurrency,
+        cache=cache,
+        checkpoint_path=args.checkpoint,
+        resume=args.resume,
+        limiter=None if args.no_rate_limit else get_limiter(
+            args.model, rpm=args.rpm, tpm=args.tpm, max_concurrency=args.concurrency),
+        abort_below=args.abort_below,
+        abort_metric=args.abort_metric,
+        abort_min_n=args.abort_min_n,
+        budget=budget,
+        batch_size=args.batch_size,
     )
 
     print(f"\nTahminler başarıyla {args.out} dosyasına yazıldı.")
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Yerel stub LLM istemcisi
+------------------------
+- Amaç: `predict_conversations` işlevini gerçek API çağrısı yapmadan (ücretsiz, ağsız) çalıştırmak.
+- `client.chat.completions.create(...)` arayüzünü taklit eder; yanıt gecikmesi `time.sleep` ile simüle edilir.
+- Varsayılan yanıt, `IntentSchema`'dan geçen sabit bir JSON'dur; `responder` ile özelleştirilebilir.
+  Çoklu sohbet isteklerinde (`--batch-size`) her conversation_id için bir kayıt içeren
+  `{"results": [...]}` döndürülür.
+- Kıyaslama (bkz. `bench_llm`) için hata enjeksiyonu:
+  * gecikme dağılımı: fixed | uniform | exponential | lognormal (ortalama = `latency`),
+  * `error_rate`: HTTP 500 (geçici hata → `rate_limit.is_transient`),
+  * `rate_limit_rate`: HTTP 429 (`retry-after-ms` başlığıyla → `rate_limit.is_rate_limited`),
+  * `malformed_rate`: şemaya uymayan / yarım JSON (doğrulama hatası → yeniden deneme).
+  Çağrı başına gecikmeler ve sayaçlar (`calls`, `errors`, `throttles`, `malformed`) tutulur;
+  `e2e_latencies()` aynı prompt'un ilk denemesinden son yanıtına kadar geçen süreleri verir.
+
+Kullanım:
+  from llm_stub import StubChatClient
+  client = StubChatClient(latency=0.05)
+  predict_conversations(df, template, "outputs/preds.csv", model="stub", concurrency=8, client=client)
+"""
+from __future__ import annotations
+
+import json
+import math
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+LATENCY_DISTS = ("fixed", "uniform", "exponential", "lognormal")
+
+DEFAULT_RESPONSE = {
+    "yanit_durumu": "Çözüldü",
+    "sentiment": "Nötr",
+    "tur": "Soru",
+    "intent": "Kargo",
+    "intent_detay": "Kargo takibi",
+}
+
+
+_BATCH_ID_RE = re.compile(r"^=== SOHBET conversation_id=(.*) ===$", re.MULTILINE)
+
+
+def default_content(messages: List[Dict]) -> str:
+    """Sabit yanıt; kullanıcı mesajı çoklu sohbet başlıkları içeriyorsa her sohbet için bir kayıt."""
+    ids = _BATCH_ID_RE.findall(messages[-1]["content"]) if messages else []
+    if ids:
+        payload = {"results": [{"conversation_id": cid, **DEFAULT_RESPONSE} for cid in ids]}
+    else:
+        payload = DEFAULT_RESPONSE
+    return json.dumps(payload, ensure_ascii=False)
+
+
+class StubAPIError(Exception):
+    """Sağlayıcı SDK hatalarını taklit eder (`status_code` + `response.headers`)."""
+
+    def __init__(self, message: str, status_code: int, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+def _make_response(content: str):
+    """OpenAI/Groq yanıt nesnesinin kullanılan kısmını (`choices[0].message.content`) taklit eder."""
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class _Completions:
+    def __init__(self, owner: "StubChatClient"):
+        self._owner = owner
+
+    def create(self, model: str, messages: List[Dict], **kwargs):
+        return self._owner._complete(model, messages, **kwargs)
+
+
+class StubChatClient:
+    """
+    Gecikme ve hata simüle eden, iş parçacığı güvenli sahte sohbet istemcisi.
+    :param latency: Çağrı başına ortalama gecikme (saniye).
+    :param responder: (model, messages) → yanıt metni üreten isteğe bağlı işlev.
+    :param latency_dist: Gecikme dağılımı (`LATENCY_DISTS`).
+    :param latency_sigma: lognormal dağılımın log-uzay standart sapması (kuyruk kalınlığı).
+    :param error_rate: Çağrının HTTP 500 ile başarısız olma olasılığı.
+    :param rate_limit_rate: Çağrının HTTP 429 ile reddedilme olasılığı.
+    :param retry_after: 429 yanıtındaki Retry-After (saniye; None = başlık yok).
+    :param malformed_rate: Yanıtın şemaya uymayan/yarım JSON olma olasılığı.
+    :param seed: Rastgelelik tohumu (tekrarlanabilir koşular için).
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        responder: Optional[Callable[[str, List[Dict]], str]] = None,
+        latency_dist: str = "fixed",
+        latency_sigma: float = 0.5,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: Optional[float] = None,
+        malformed_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        if latency_dist not in LATENCY_DISTS:
+            raise ValueError(f"Geçersiz gecikme dağılımı: {latency_dist}. Şunlardan biri olmalıdır: {LATENCY_DISTS}")
+        self.latency = latency
+        self.responder = responder
+        self.latency_dist = latency_dist
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.malformed_rate = malformed_rate
+        self.calls = 0
+        self.errors = 0
+        self.throttles = 0
+        self.malformed = 0
+        self.latencies: List[float] = []
+        self._first_start: Dict[int, float] = {}
+        self._last_end: Dict[int, float] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def _sample_latency(self) -> float:
+        """Çağıran kilidi tutarken çağrılır (paylaşılan RNG)."""
+        mean = self.latency
+        if mean <= 0:
+            return 0.0
+        if self.latency_dist == "uniform":
+            return self._rng.uniform(0.0, 2 * mean)
+        if self.latency_dist == "exponential":
+            return self._rng.expovariate(1.0 / mean)
+        if self.latency_dist == "lognormal":
+            sigma = self.latency_sigma
+            return self._rng.lognormvariate(math.log(mean) - sigma * sigma / 2, sigma)
+        return mean
+
+    def _complete(self, model: str, messages: List[Dict], **kwargs):
+        key = hash(messages[-1]["content"]) if messages else 0
+        t0 = time.perf_counter()
+        with self._lock:
+            self.calls += 1
+            self._first_start.setdefault(key, t0)
+            delay = self._sample_latency()
+            roll = self._rng.random()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            if roll < self.rate_limit_rate:
+                with self._lock:
+                    self.throttles += 1
+                headers = {"retry-after-ms": str(int(self.retry_after * 1000))} if self.retry_after is not None else {}
+                raise StubAPIError("Rate limit reached (stub)", 429, headers)
+            roll -= self.rate_limit_rate
+            if roll < self.error_rate:
+                with self._lock:
+                    self.errors += 1
+                raise StubAPIError("Internal server error (stub)", 500)
+            roll -= self.error_rate
+            if self.responder is not None:
+                content = self.responder(model, messages)
+            else:
+                content = default_content(messages)
+            if roll < self.malformed_rate:
+                with self._lock:
+                    self.malformed += 1
+                content = content[: len(content) // 2]
+            return _make_response(content)
+        finally:
+            t1 = time.perf_counter()
+            with self._lock:
+                self.latencies.append(t1 - t0)
+                self._last_end[key] = t1
+
+    def e2e_latencies(self) -> List[float]:
+        """Prompt başına ilk denemenin başlangıcından son yanıta kadar geçen süreler (yeniden denemeler dahil)."""
+        with self._lock:
+            return [self._last_end[k] - t0 for k, t0 in self._first_start.items() if k in self._last_end]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "errors": self.errors, "throttles": self.throttles,
+                    "malformed": self.malformed}
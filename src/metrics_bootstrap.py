@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Bootstrap güven aralıkları ve eşleştirilmiş (paired) bootstrap anlamlılık testi
+------------------------------------------------------------------------------
+- Küçük etiketli setlerde (20–40 sohbet) accuracy/F1 koşudan koşuya çok oynar; her metriğe
+  yüzdelik (percentile) bootstrap güven aralığı eklenir.
+- Toplu (vektörel) hesap: satır bazında yeniden örnekleme yerine confusion hücreleri üzerinden
+  multinomial örnekleme yapılır. n satırın iadeli yeniden örneklenmesi, dolu hücre sayıları
+  üzerinde Multinomial(n, hücre/n) çekmekle AYNI dağılımdır; B × (dolu hücre) boyutlu sayım
+  matrisi bloklar halinde tek seferde çekilir ve tüm metrikler NumPy ile bu matristen türetilir.
+  Böylece maliyet satır sayısından bağımsızdır (100k satır, B=10.000 saniyeler içinde).
+- Paired bootstrap: aynı gold'a karşı iki tahmin (A/B) için (gold, pred_A, pred_B) üçlü hücreleri
+  birlikte örneklenir; fark dağılımından güven aralığı ve iki yönlü p-değeri çıkar.
+
+Kullanım:
+  cis = bootstrap_fields(merged_df, n_boot=2000)          # alan → {metrik: (düşük, yüksek)}
+  python src/metrics_bootstrap.py --gold outputs/eval/mila_eval.parquet \
+    --pred-a outputs/predictions/preds_a.csv --pred-b outputs/predictions/preds_b.csv --n-boot 10000
+"""
+from __future__ import annotations
+
+import argparse
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from metrics_core import FIELDS, encode_pairs
+
+METRICS = ("accuracy", "macro_f1", "weighted_f1")
+
+# Bir blokta çekilecek en fazla sayım hücresi (bellek sınırı: ~8 bayt × bu değer)
+_BLOCK_CELLS = 4_000_000
+
+
+# ------------ Toplu metrik hesabı ------------
+def _metrics_from_counts(cm: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    (b, k, k) confusion yığınından replika başına accuracy / macro-F1 / weighted-F1.
+    Macro-F1, `metrics_core` ile aynı biçimde yalnızca replikada görülen etiketler üzerinden ortalanır.
+    """
+    cm = cm.astype(float)
+    n = cm.sum(axis=(1, 2))
+    tp = np.diagonal(cm, axis1=1, axis2=2)
+    support = cm.sum(axis=2)
+    predicted = cm.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        denom = precision + recall
+        f1 = np.where(denom > 0, 2 * precision * recall / denom, 0.0)
+        present = ((support + predicted) > 0).sum(axis=1)
+        accuracy = np.where(n > 0, tp.sum(axis=1) / n, 0.0)
+        macro = np.where(present > 0, f1.sum(axis=1) / present, 0.0)
+        weighted = np.where(n > 0, (f1 * support).sum(axis=1) / n, 0.0)
+    return {"accuracy": accuracy, "macro_f1": macro, "weighted_f1": weighted}
+
+
+def _blocks(n_boot: int, n_cells: int) -> Iterator[int]:
+    """B replikayı bellek sınırına göre bloklara böler."""
+    size = max(1, min(n_boot, _BLOCK_CELLS // max(1, n_cells)))
+    done = 0
+    while done < n_boot:
+        b = min(size, n_boot - done)
+        yield b
+        done += b
+
+
+def _scatter(counts: np.ndarray, target: np.ndarray, width: int) -> np.ndarray:
+    """
+    (b, m) hücre sayımlarını `target` (m,) indekslerine toplayarak (b, width) matrisine taşır
+    (sıralama + reduceat; Python döngüsü yok).
+    """
+    order = np.argsort(target, kind="stable")
+    t = target[order]
+    starts = np.flatnonzero(np.r_[True, t[1:] != t[:-1]])
+    out = np.zeros((counts.shape[0], width), dtype=np.int64)
+    out[:, t[starts]] = np.add.reduceat(counts[:, order], starts, axis=1)
+    return out
+
+
+def _ci(values: np.ndarray, alpha: float) -> Tuple[float, float]:
+    lo, hi = np.quantile(values, [alpha / 2, 1 - alpha / 2])
+    return float(lo), float(hi)
+
+
+# ------------ Tek tahmin seti: güven aralıkları ------------
+def bootstrap_metrics(
+    y_true,
+    y_pred,
+    n_boot: int = 1000,
+    alpha: float = 0.05,
+    seed: Optional[int] = 0,
+) -> Dict[str, Tuple[float, float]]:
+    """
+    Accuracy / macro-F1 / weighted-F1 için yüzdelik bootstrap güven aralıkları.
+    :return: metrik → (düşük, yüksek); veri boşsa (0.0, 0.0)
+    """
+    g, p, labels = encode_pairs(y_true, y_pred)
+    n, k = len(g), len(labels)
+    if n == 0 or n_boot <= 0:
+        return {m: (0.0, 0.0) for m in METRICS}
+
+    cells = np.bincount(g * k + p, minlength=k * k)
+    nz = np.flatnonzero(cells)
+    probs = cells[nz] / n
+    rng = np.random.default_rng(seed)
+
+    collected: Dict[str, List[np.ndarray]] = {m: [] for m in METRICS}
+    for b in _blocks(n_boot, k * k):
+        counts = np.zeros((b, k * k), dtype=np.int64)
+        counts[:, nz] = rng.multinomial(n, probs, size=b)
+        for m, v in _metrics_from_counts(counts.reshape(b, k, k)).items():
+            collected[m].append(v)
+    return {m: _ci(np.concatenate(v), alpha) for m, v in collected.items()}
+
+
+def bootstrap_proportion(
+    hits,
+    n_boot: int = 1000,
+    alpha: float = 0.05,
+    seed: Optional[int] = 0,
+) -> Tuple[float, float]:
+    """0/1 (doğru/yanlış) dizisinin ortalaması için bootstrap güven aralığı (ör. triple_correct)."""
+    hits = np.asarray(hits, dtype=bool)
+    n = len(hits)
+    if n == 0 or n_boot <= 0:
+        return (0.0, 0.0)
+    rng = np.random.default_rng(seed)
+    return _ci(rng.binomial(n, hits.mean(), size=n_boot) / n, alpha)
+
+
+def bootstrap_fields(
+    df: pd.DataFrame,
+    n_boot: int = 1000,
+    alpha: float = 0.05,
+    seed: Optional[int] = 0,
+    fields: Optional[List[Tuple[str, str, str]]] = None,
+) -> Dict[str, Dict[str, Tuple[float, float]]]:
+    """Kolonları mevcut her alan için `bootstrap_metrics` (alan adı → metrik → aralık)."""
+    out: Dict[str, Dict[str, Tuple[float, float]]] = {}
+    for name, gcol, pcol in fields or FIELDS:
+        if gcol in df.columns and pcol in df.columns:
+            out[name] = bootstrap_metrics(df[gcol], df[pcol], n_boot=n_boot, alpha=alpha, seed=seed)
+    return out
+
+
+# ------------ İki tahmin seti: paired bootstrap ------------
+def paired_bootstrap(
+    y_true,
+    pred_a,
+    pred_b,
+    n_boot: int = 10_000,
+    alpha: float = 0.05,
+    seed: Optional[int] = 0,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Aynı satırlar üzerinde A ve B tahminlerini karşılaştırır (gold, A ve B'nin üçü de dolu satırlar).
+    Her metrik için: a, b, delta (= b − a), delta güven aralığı ve iki yönlü p-değeri
+    (p = 2 · min(P(Δ* ≤ 0), P(Δ* ≥ 0)), en fazla 1).
+    """
+    yt = pd.Series(y_true).reset_index(drop=True)
+    pa = pd.Series(pred_a).reset_index(drop=True)
+    pb = pd.Series(pred_b).reset_index(drop=True)
+    mask = (yt.notna() & pa.notna() & pb.notna()).to_numpy()
+    vals = [s[mask].astype(str).to_numpy(dtype=object) for s in (yt, pa, pb)]
+    n = len(vals[0])
+    if n == 0:
+        return {}
+    codes, uniques = pd.factorize(np.concatenate(vals), sort=True)
+    k = len(uniques)
+    g, a, b_ = codes[:n], codes[n:2 * n], codes[2 * n:]
+
+    # (gold, A, B) üçlü hücreleri
+    triples, counts = np.unique((g * k + a) * k + b_, return_counts=True)
+    cell_a = triples // k                          # gold * k + A
+    cell_b = (triples // (k * k)) * k + triples % k  # gold * k + B
+    probs = counts / n
+
+    def observed(cell: np.ndarray) -> Dict[str, float]:
+        cm = np.zeros(k * k, dtype=np.int64)
+        np.add.at(cm, cell, counts)
+        return {m: float(v[0]) for m, v in _metrics_from_counts(cm.reshape(1, k, k)).items()}
+
+    obs_a, obs_b = observed(cell_a), observed(cell_b)
+
+    rng = np.random.default_rng(seed)
+    deltas: Dict[str, List[np.ndarray]] = {m: [] for m in METRICS}
+    for bsz in _blocks(n_boot, max(len(triples), k * k)):
+        draws = rng.multinomial(n, probs, size=bsz)
+        ma = _metrics_from_counts(_scatter(draws, cell_a, k * k).reshape(bsz, k, k))
+        mb = _metrics_from_counts(_scatter(draws, cell_b, k * k).reshape(bsz, k, k))
+        for m in METRICS:
+            deltas[m].append(mb[m] - ma[m])
+
+    out: Dict[str, Dict[str, float]] = {}
+    for m in METRICS:
+        d = np.concatenate(deltas[m])
+        lo, hi = _ci(d, alpha)
+        p = min(1.0, 2 * min(float((d <= 0).mean()), float((d >= 0).mean())))
+        out[m] = {
+            "a": obs_a[m], "b": obs_b[m], "delta": obs_b[m] - obs_a[m],
+            "ci_low": lo, "ci_high": hi, "p_value": p, "n": n,
+        }
+    return out
+
+
+def paired_bootstrap_fields(
+    df_a: pd.DataFrame,
+    df_b: pd.DataFrame,
+    n_boot: int = 10_000,
+    alpha: float = 0.05,
+    seed: Optional[int] = 0,
+    on: str = "conversation_id",
+) -> pd.DataFrame:
+    """
+    İki birleşik (gold + pred_*) tabloyu `on` kolonu üzerinden hizalar ve alan × metrik için
+    paired bootstrap sonuçlarını tek tabloda döndürür.
+    """
+    joined = df_a.merge(
+        df_b[[on] + [p for _, _, p in FIELDS if p in df_b.columns]],
+        on=on, how="inner", suffixes=("", "__b"),
+    )
+    rows: List[Dict] = []
+    for name, gcol, pcol in FIELDS:
+        if gcol not in joined.columns or pcol not in joined.columns or f"{pcol}__b" not in joined.columns:
+            continue
+        res = paired_bootstrap(joined[gcol], joined[pcol], joined[f"{pcol}__b"],
+                               n_boot=n_boot, alpha=alpha, seed=seed)
+        for metric, r in res.items():
+            rows.append({"field": name, "metric": metric, **r})
+    return pd.DataFrame(rows, columns=["field", "metric", "a", "b", "delta", "ci_low", "ci_high", "p_value", "n"])
+
+
+# ------------ CLI ------------
+def _load_side(gold: pd.DataFrame, pred_path: str) -> pd.DataFrame:
+    from artifacts import read_table
+    from metrics_eval import expand_predictions
+
+    pred = read_table(pred_path, kind="predictions")
+    base = gold.drop(columns=[c for _, _, c in FIELDS if c in gold.columns] + ["prediction"], errors="ignore")
+    return expand_predictions(base.merge(pred, on="conversation_id", how="left"))
+
+
+def main() -> None:
+    from artifacts import conform, is_columnar, read_table
+
+    ap = argparse.ArgumentParser(description="İki tahmin dosyası arasında paired bootstrap anlamlılık testi")
+    ap.add_argument("--gold", required=True,
+                    help="Gold etiketli veri: JSON/JSONL (data_load) ya da eval tablosu (.parquet/.arrow/.xlsx/.csv)")
+    ap.add_argument("--pred-a", required=True, help="A tahminleri (llm_infer çıktısı)")
+    ap.add_argument("--pred-b", required=True, help="B tahminleri (llm_infer çıktısı)")
+    ap.add_argument("--n-boot", type=int, default=10_000)
+    ap.add_argument("--alpha", type=float, default=0.05)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=None, help="Sonuç tablosu (.csv/.xlsx/.parquet)")
+    args = ap.parse_args()
+
+    if args.gold.lower().endswith((".json", ".jsonl")):
+        from data_load import load_conversations
+        gold = conform(load_conversations(args.gold), "conversations")
+    else:
+        gold = read_table(args.gold, kind="eval" if is_columnar(args.gold) else None)
+        gold["conversation_id"] = gold["conversation_id"].astype(str)
+
+    res = paired_bootstrap_fields(
+        _load_side(gold, args.pred_a), _load_side(gold, args.pred_b),
+        n_boot=args.n_boot, alpha=args.alpha, seed=args.seed,
+    )
+    with pd.option_context("display.width", 160, "display.max_columns", 20):
+        print(res.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    if args.out:
+        from artifacts import write_table
+        write_table(res, args.out)
+        print(f"[OK] Paired bootstrap: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+Ortak metrik çekirdeği (metrics_eval + generate_reports)
+-------------------------------------------------------
+- Gold ve pred birlikte tam sayı kodlarına çevrilir (`pd.factorize`), tüm confusion matrisi
+  tek bir `np.bincount` ile kurulur; sınıf başına döngü ve geçici boolean Series yoktur.
+- Matristen türetilenler: accuracy, sınıf başına precision/recall/F1/support,
+  macro / micro / weighted F1.
+- Hizalama: gold ve pred'in İKİSİNİN DE dolu olduğu satırlar birlikte seçilir (NaN'ler ayrı ayrı
+  atılıp uzunluklar kırpılmaz).
+- Etiket eşleme: `snap_predictions` kapalı kümeli alanlarda tahminleri gold etiketlerine eşler
+  (büyük/küçük harf, aksan ve küçük yazım hataları; bkz. `label_norm`).
+- Akış (online) değerlendirme: `MetricsAccumulator` her tahmin geldikçe beş alanın confusion
+  sayımlarını günceller; istenen anda anlık görüntü (accuracy, macro-F1, triple_correct) verir ve
+  işçiler arasında birleştirilebilir (`merge` / `+`). `vocab` (gold etiket kümeleri) verilirse
+  tahminler `snap_predictions` ile aynı şekilde eşlenir; sonuçlar toplu hesapla birebir aynıdır.
+
+Kullanım:
+  rep = classification_report(df["gold_intent"], df["pred_intent"])
+  rep.accuracy, rep.macro_f1, rep.per_class_frame()
+  reports = evaluate_fields(df)   # beş alanın hepsi
+  df, changed = snap_predictions(df)   # pred_* yazım farklarını gold etiketlerine eşle
+
+  acc = MetricsAccumulator(vocab=gold_vocab(df))
+  acc.update(gold={"intent": "Kargo", ...}, pred=parse_prediction(llm_json))
+  acc.snapshot()                  # {"n": .., "intent_acc": .., "intent_f1": .., "triple_correct": ..}
+"""
+from __future__ import annotations
+
+import json
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from label_norm import LabelIndex, snap_series
+
+# (alan adı, gold kolonu, pred kolonu)
+FIELDS: List[Tuple[str, str, str]] = [
+    ("sentiment", "gold_sentiment", "pred_sentiment"),
+    ("intent", "gold_intent", "pred_intent"),
+    ("yanit_durumu", "gold_yanit_durumu", "pred_yanit_durumu"),
+    ("tur", "gold_tur", "pred_tur"),
+    ("intent_detay", "gold_intent_detay", "pred_intent_detay"),
+]
+
+# triple_correct'i oluşturan alanlar
+TRIPLE = ("sentiment", "intent", "yanit_durumu")
+
+# kapalı etiket kümeli alanlar (intent_detay serbest metindir, eşlenmez)
+SNAP_FIELDS = ("sentiment", "intent", "yanit_durumu", "tur")
+
+
+@dataclass
+class ClassificationReport:
+    labels: List[str]
+    confusion: np.ndarray       # satır = gold, kolon = pred
+    precision: np.ndarray
+    recall: np.ndarray
+    f1: np.ndarray
+    support: np.ndarray         # sınıf başına gold adedi
+    n: int
+    accuracy: float
+    macro_f1: float
+    micro_f1: float
+    weighted_f1: float
+
+    def per_class_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "label": self.labels,
+            "precision": self.precision,
+            "recall": self.recall,
+            "f1": self.f1,
+            "support": self.support,
+        })
+
+
+def _safe_div(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    out = np.zeros(np.broadcast(a, b).shape, dtype=float)
+    np.divide(a, b, out=out, where=b > 0)
+    return out
+
+
+def encode_pairs(y_true, y_pred) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    İkisi de dolu satırları seçer, str'ye çevirir ve ortak etiket uzayında kodlar.
+    :return: (gold kodları, pred kodları, sıralı etiketler)
+    """
+    yt = pd.Series(y_true).reset_index(drop=True)
+    yp = pd.Series(y_pred).reset_index(drop=True)
+    mask = (yt.notna() & yp.notna()).to_numpy()
+    g = yt[mask].astype(str).to_numpy(dtype=object)
+    p = yp[mask].astype(str).to_numpy(dtype=object)
+    codes, uniques = pd.factorize(np.concatenate([g, p]), sort=True)
+    return codes[:len(g)], codes[len(g):], [str(u) for u in uniques]
+
+
+def confusion_from_codes(g: np.ndarray, p: np.ndarray, k: int) -> np.ndarray:
+    """k×k confusion matrisi (tek bincount)."""
+    return np.bincount(g * k + p, minlength=k * k).reshape(k, k)
+
+
+def report_from_confusion(cm: np.ndarray, labels: Sequence[str]) -> ClassificationReport:
+    """Confusion matrisinden tüm metrikleri türetir."""
+    cm = np.asarray(cm)
+    n = int(cm.sum())
+    tp = np.diag(cm).astype(float)
+    support = cm.sum(axis=1)
+    predicted = cm.sum(axis=0)
+    precision = _safe_div(tp, predicted)
+    recall = _safe_div(tp, support)
+    f1 = _safe_div(2 * precision * recall, precision + recall)
+    accuracy = float(tp.sum() / n) if n else 0.0
+    return ClassificationReport(
+        labels=list(labels),
+        confusion=cm,
+        precision=precision,
+        recall=recall,
+        f1=f1,
+        support=support,
+        n=n,
+        accuracy=accuracy,
+        macro_f1=float(f1.mean()) if len(f1) else 0.0,
+        micro_f1=accuracy,  # tek etiketli çok sınıfta micro-F1 = accuracy
+        weighted_f1=float((f1 * support).sum() / support.sum()) if support.sum() else 0.0,
+    )
+
+
+def classification_report(y_true, y_pred) -> ClassificationReport:
+    """Gold/pred serilerinden tam rapor."""
+    g, p, labels = encode_pairs(y_true, y_pred)
+    cm = confusion_from_codes(g, p, len(labels))
+    return report_from_confusion(cm, labels)
+
+
+def acc_f1(y_true, y_pred) -> Tuple[float, float]:
+    """Accuracy + Macro-F1 (boş veri için 0.0, 0.0)."""
+    rep = classification_report(y_true, y_pred)
+    if rep.n == 0:
+        return 0.0, 0.0
+    return rep.accuracy, rep.macro_f1
+
+
+def evaluate_fields(
+    df: pd.DataFrame,
+    fields: Optional[List[Tuple[str, str, str]]] = None,
+) -> Dict[str, ClassificationReport]:
+    """Kolonları mevcut olan her alan için rapor üretir (alan adı → rapor)."""
+    out: Dict[str, ClassificationReport] = {}
+    for name, gcol, pcol in fields or FIELDS:
+        if gcol in df.columns and pcol in df.columns:
+            out[name] = classification_report(df[gcol], df[pcol])
+    return out
+
+
+def gold_vocab(
+    df: pd.DataFrame,
+    fields: Optional[List[Tuple[str, str, str]]] = None,
+) -> Dict[str, List[str]]:
+    """Kapalı kümeli alanların gold etiket kümeleri (alan adı → sıralı benzersiz, boş olmayan değerler)."""
+    out: Dict[str, List[str]] = {}
+    for name, gcol, _ in fields or FIELDS:
+        if name in SNAP_FIELDS and gcol in df.columns:
+            labels = sorted(v for v in df[gcol].dropna().astype(str).unique() if v.strip())
+            if labels:
+                out[name] = labels
+    return out
+
+
+def snap_predictions(
+    df: pd.DataFrame,
+    fields: Optional[List[Tuple[str, str, str]]] = None,
+) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    pred_* kolonlarını aynı alanın gold etiket kümesine eşler (`label_norm.LabelIndex`; katlanmış tam
+    eşleşme, olmazsa sınırlı düzenleme mesafesi). Böylece "notr" / "Kargo takibii" gibi yazım farkları
+    yanlış sınıf sayılmaz; eşlenemeyen tahminler olduğu gibi kalır. Intent kümesi gold'daki benzersiz
+    değerlerdir (`data_load.build_allowed_intents` ile aynı).
+    :return: (yeni DataFrame, alan adı → eşlenen satır sayısı)
+    """
+    out = df
+    changed: Dict[str, int] = {}
+    vocab = gold_vocab(df, fields)
+    for name, gcol, pcol in fields or FIELDS:
+        if name not in vocab or pcol not in df.columns:
+            continue
+        snapped = snap_series(df[pcol], LabelIndex(vocab[name]))
+        if snapped is df[pcol]:
+            continue
+        n = int((df[pcol].notna() & (snapped != df[pcol])).sum())
+        if n:
+            if out is df:
+                out = df.copy()
+            out[pcol] = snapped
+            changed[name] = n
+    return out, changed
+
+
+# ---------- Akış (online) değerlendirme ----------
+def parse_prediction(v) -> Dict[str, Any]:
+    """Tahmin JSON string'ini sözlüğe çevirir; boş/hatalı tahmin ({"error": ...}) için boş sözlük."""
+    if isinstance(v, dict):
+        return {} if "error" in v else v
+    if not isinstance(v, str) or not v.strip():
+        return {}
+    try:
+        obj = json.loads(v)
+    except ValueError:
+        return {}
+    return obj if isinstance(obj, dict) and "error" not in obj else {}
+
+
+def _is_missing(v) -> bool:
+    return v is None or (isinstance(v, float) and v != v) or v is pd.NA
+
+
+def _as_str(v) -> str:
+    """Toplu hesaptaki `astype(str)` ile aynı: eksik değerler 'nan' olur."""
+    return "nan" if _is_missing(v) else str(v)
+
+
+class MetricsAccumulator:
+    """
+    Beş alan için artımlı confusion sayımları (iş parçacığı güvenli, birleştirilebilir).
+    :param fields: (alan, gold kolonu, pred kolonu) listesi (varsayılan: `FIELDS`).
+    :param vocab: Alan adı → gold etiket kümesi (bkz. `gold_vocab`). Verilen alanlarda tahminler
+                  sayılmadan önce `snap_predictions` ile aynı şekilde gold etiketlerine eşlenir.
+    """
+
+    def __init__(
+        self,
+        fields: Optional[List[Tuple[str, str, str]]] = None,
+        vocab: Optional[Mapping[str, Sequence[str]]] = None,
+    ):
+        self.fields = list(fields or FIELDS)
+        self.vocab = {name: list(labels) for name, labels in (vocab or {}).items() if labels}
+        self._indexes = {name: LabelIndex(labels) for name, labels in self.vocab.items()}
+        self.counts: Dict[str, Counter] = {name: Counter() for name, _, _ in self.fields}
+        self.n = 0
+        self.triple_hits = 0
+        self._lock = threading.Lock()
+
+    def update(self, gold: Mapping[str, Any], pred: Mapping[str, Any]) -> None:
+        """
+        Tek bir sohbeti ekler. `gold` ve `pred` alan adı ('intent') ya da kolon adı
+        ('gold_intent' / 'pred_intent') ile anahtarlanabilir; eksik alanlar o alanda sayılmaz.
+        """
+        pairs = {}
+        for name, gcol, pcol in self.fields:
+            g = gold.get(gcol, gold.get(name))
+            p = pred.get(pcol, pred.get(name))
+            index = self._indexes.get(name)
+            if index is not None and isinstance(p, str) and not index.is_canonical(p):
+                p = index.lookup(p) or p   # snap_series ile aynı: eşlenemeyen değer olduğu gibi kalır
+            pairs[name] = (g, p)
+        triple = all(_as_str(pairs[f][0]) == _as_str(pairs[f][1]) for f in TRIPLE if f in pairs)
+        with self._lock:
+            self.n += 1
+            self.triple_hits += int(triple)
+            for name, (g, p) in pairs.items():
+                if not _is_missing(g) and not _is_missing(p):
+                    self.counts[name][(str(g), str(p))] += 1
+
+    def merge(self, other: "MetricsAccumulator") -> "MetricsAccumulator":
+        """Başka bir işçinin sayımlarını bu nesneye ekler (yerinde) ve kendini döndürür."""
+        with self._lock:
+            self.n += other.n
+            self.triple_hits += other.triple_hits
+            for name, cnt in other.counts.items():
+                self.counts.setdefault(name, Counter()).update(cnt)
+        return self
+
+    def __add__(self, other: "MetricsAccumulator") -> "MetricsAccumulator":
+        return MetricsAccumulator(self.fields, self.vocab).merge(self).merge(other)
+
+    def reports(self) -> Dict[str, ClassificationReport]:
+        """Alan başına tam rapor (en az bir çift görülmüş alanlar için)."""
+        with self._lock:
+            counts = {name: dict(cnt) for name, cnt in self.counts.items() if cnt}
+        out: Dict[str, ClassificationReport] = {}
+        for name, cnt in counts.items():
+            labels = sorted({lab for pair in cnt for lab in pair})
+            idx = {lab: i for i, lab in enumerate(labels)}
+            cm = np.zeros((len(labels), len(labels)), dtype=np.int64)
+            for (g, p), c in cnt.items():
+                cm[idx[g], idx[p]] += c
+            out[name] = report_from_confusion(cm, labels)
+        return out
+
+    def snapshot(self) -> Dict[str, float]:
+        """Anlık metrikler: n, triple_correct ve her alan için <alan>_acc / <alan>_f1."""
+        snap: Dict[str, float] = {"n": self.n, "triple_correct": self.triple_hits / self.n if self.n else 0.0}
+        for name, rep in self.reports().items():
+            snap[f"{name}_acc"] = rep.accuracy
+            snap[f"{name}_f1"] = rep.macro_f1
+        return snap
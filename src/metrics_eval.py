@@ -2,74 +2,109 @@
 """
 Metrik hesapları ve Excel/Confusion çıktıları.
 
-- Excel: iki sheet üretir
+- Excel: üç sheet üretir
   - data: birleşik (gold+pred) satırlar
-  - metrics: beş alan için accuracy & macro-F1 + triple_correct
+  - metrics: beş alan için accuracy, macro/micro/weighted-F1, n + triple_correct
+    (`n_boot` > 0 ise her satıra bootstrap güven aralığı: ci_low / ci_high; bkz. metrics_bootstrap)
+  - per_class: alan × etiket bazında precision / recall / F1 / support
+- Metrikler ortak `metrics_core` modülünden gelir (tek bincount ile confusion matrisi).
+- `expand_predictions` kapalı kümeli alanlarda tahminleri gold etiketlerine eşler ("notr" → "Nötr").
 - Confusion CSV'leri: belirtilen klasöre, alan bazında (sentiment/intent/yanit_durumu/tur/intent_detay)
 
+- İsteğe bağlı: birleşik veri ayrıca Parquet/Arrow olarak yazılır (rapor aşaması Excel'i yeniden
+  parse etmeden okur; bkz. artifacts).
+
 Kullanım (pipeline içinden):
-  write_excel_report(merged_df, "outputs/eval/mila_eval.xlsx")
+  merged_df = expand_predictions(merged_df)   # 'prediction' JSON'u → pred_* kolonları
+  write_excel_report(merged_df, "outputs/eval/mila_eval.xlsx", data_out="outputs/eval/mila_eval.parquet",
+                     n_boot=1000)
   save_confusions(merged_df, "outputs/eval/confusions")
 """
 from __future__ import annotations
 from pathlib import Path
-from typing import Tuple, List, Dict
-import numpy as np
+from typing import Tuple, List, Dict, Optional
 import pandas as pd
 
+from artifacts import write_table
+from metrics_bootstrap import bootstrap_fields, bootstrap_proportion
+from metrics_core import FIELDS, acc_f1, evaluate_fields, parse_prediction, snap_predictions
+from profiling import span, traced
+
 # ---------- temel hesaplar ----------
 def _acc_f1(y_true: pd.Series, y_pred: pd.Series) -> Tuple[float, float]:
     """
-    Accuracy + Macro-F1 (küçük veri için güvenli manuel hesap).
-    NaN'leri dışarıda bırakır.
+    Accuracy + Macro-F1. Gold ve pred'in ikisinin de dolu olduğu satırlar birlikte kullanılır.
+    """
+    return acc_f1(y_true, y_pred)
+
+@traced("metrics_eval.expand_predictions")
+def expand_predictions(df: pd.DataFrame, col: str = "prediction") -> pd.DataFrame:
+    """
+    `col` kolonundaki yapılandırılmış tahmini (IntentSchema JSON'u) pred_* kolonlarına açar.
+    Mevcut pred_* kolonları yalnızca tahminde değer varsa ezilir. Kapalı kümeli alanlarda tahmin
+    gold etiketlerine eşlenir (yazım farkı yanlış sınıf sayılmaz; bkz. `snap_predictions`).
     """
-    yt = pd.Series(y_true).dropna().astype(str)
-    yp = pd.Series(y_pred).dropna().astype(str)
-    if len(yt) == 0 or len(yp) == 0:
-        return 0.0, 0.0
-    # hizalama (varsayımsal: indeksler zaten aynı merged df'de)
-    n = min(len(yt), len(yp))
-    yt = yt.iloc[:n]
-    yp = yp.iloc[:n]
-    acc = (yt.values == yp.values).mean()
-
-    classes = sorted(set(yt.unique()) | set(yp.unique()))
-    f1s: List[float] = []
-    for c in classes:
-        tp = ((yt == c) & (yp == c)).sum()
-        fp = ((yt != c) & (yp == c)).sum()
-        fn = ((yt == c) & (yp != c)).sum()
-        prec = tp / (tp + fp) if (tp + fp) > 0 else 0.0
-        rec  = tp / (tp + fn) if (tp + fn) > 0 else 0.0
-        f1   = (2 * prec * rec) / (prec + rec) if (prec + rec) > 0 else 0.0
-        f1s.append(f1)
-    mf1 = float(np.mean(f1s)) if f1s else 0.0
-    return float(acc), mf1
+    out = df
+    if col in df.columns:
+        parsed = pd.DataFrame([parse_prediction(v) for v in df[col]], index=df.index)
+        out = df.copy()
+        for name, _, pcol in FIELDS:
+            if name in parsed.columns:
+                vals = parsed[name]
+                out[pcol] = vals.where(vals.notna(), out[pcol]) if pcol in out.columns else vals
+    out, changed = snap_predictions(out)
+    if changed:
+        print("[labels] gold etiketine eşlenen tahmin: " + " ".join(f"{k}={v}" for k, v in changed.items()))
+    return out
+
+def _triple_hits(df: pd.DataFrame):
+    return (
+        (df["gold_sentiment"].astype(str) == df["pred_sentiment"].astype(str)) &
+        (df["gold_intent"].astype(str) == df["pred_intent"].astype(str)) &
+        (df["gold_yanit_durumu"].astype(str) == df["pred_yanit_durumu"].astype(str))
+    )
 
 # ---------- Excel raporu ----------
-def write_excel_report(df_merged: pd.DataFrame, out_xlsx: str) -> None:
+@traced("metrics_eval.write_excel_report")
+def write_excel_report(
+    df_merged: pd.DataFrame,
+    out_xlsx: str,
+    data_out: Optional[str] = None,
+    n_boot: int = 0,
+    alpha: float = 0.05,
+) -> None:
     """
     'df_merged' genellikle gold/pred kolonlarını içerir.
     Excel içine:
       - data sheet: df_merged aynen
-      - metrics sheet: accuracy & macroF1 (5 alan) + triple_correct
+      - metrics sheet: accuracy, macro/micro/weighted-F1, n (5 alan) + triple_correct
+      - per_class sheet: sınıf bazında precision/recall/F1/support
+    `n_boot` > 0 ise metrics sheet'ine (1 − alpha) bootstrap güven aralığı kolonları eklenir.
+    `data_out` (.parquet/.arrow) verilirse birleşik veri 'eval' şemasıyla ayrıca yazılır.
     """
     Path(out_xlsx).parent.mkdir(parents=True, exist_ok=True)
 
+    with span("metrics_eval.bootstrap", n_boot=n_boot):
+        cis = bootstrap_fields(df_merged, n_boot=n_boot, alpha=alpha) if n_boot > 0 else {}
+    nan_ci = (float("nan"), float("nan"))
+
     rows: List[Dict] = []
-    for label, gcol, pcol in [
-        ("sentiment", "gold_sentiment", "pred_sentiment"),
-        ("intent", "gold_intent", "pred_intent"),
-        ("yanit_durumu", "gold_yanit_durumu", "pred_yanit_durumu"),
-        ("tur", "gold_tur", "pred_tur"),
-        ("intent_detay", "gold_intent_detay", "pred_intent_detay"),
-    ]:
-        if gcol in df_merged.columns and pcol in df_merged.columns:
-            acc, mf1 = _acc_f1(df_merged[gcol], df_merged[pcol])
-            rows += [
-                {"metric": f"accuracy_{label}", "value": acc},
-                {"metric": f"macroF1_{label}", "value": mf1},
-            ]
+    per_class: List[pd.DataFrame] = []
+    with span("metrics_eval.evaluate_fields"):
+        reports = evaluate_fields(df_merged, FIELDS)
+    for label, rep in reports.items():
+        ci = cis.get(label, {})
+        # tek etiketli çok sınıfta micro-F1 = accuracy → aynı aralık
+        for metric, value, key in [
+            (f"accuracy_{label}", rep.accuracy if rep.n else 0.0, "accuracy"),
+            (f"macroF1_{label}", rep.macro_f1, "macro_f1"),
+            (f"microF1_{label}", rep.micro_f1, "accuracy"),
+            (f"weightedF1_{label}", rep.weighted_f1, "weighted_f1"),
+        ]:
+            lo, hi = ci.get(key, nan_ci)
+            rows.append({"metric": metric, "value": value, "ci_low": lo, "ci_high": hi})
+        rows.append({"metric": f"n_{label}", "value": rep.n, "ci_low": None, "ci_high": None})
+        per_class.append(rep.per_class_frame().assign(field=label))
 
     # üçü birden doğru (sentiment+intent+yanıt_durumu)
     if all(c in df_merged.columns for c in [
@@ -77,20 +112,27 @@ def write_excel_report(df_merged: pd.DataFrame, out_xlsx: str) -> None:
         "gold_intent", "pred_intent",
         "gold_yanit_durumu", "pred_yanit_durumu"
     ]):
-        triple = (
-            (df_merged["gold_sentiment"].astype(str) == df_merged["pred_sentiment"].astype(str)) &
-            (df_merged["gold_intent"].astype(str) == df_merged["pred_intent"].astype(str)) &
-            (df_merged["gold_yanit_durumu"].astype(str) == df_merged["pred_yanit_durumu"].astype(str))
-        ).mean()
-        rows.append({"metric": "triple_correct", "value": float(triple)})
+        hits = _triple_hits(df_merged)
+        lo, hi = bootstrap_proportion(hits, n_boot=n_boot, alpha=alpha) if n_boot > 0 else nan_ci
+        rows.append({"metric": "triple_correct", "value": float(hits.mean()), "ci_low": lo, "ci_high": hi})
 
-    metrics_df = pd.DataFrame(rows)
+    metrics_df = pd.DataFrame(rows, columns=["metric", "value", "ci_low", "ci_high"])
+    if not cis:
+        metrics_df = metrics_df[["metric", "value"]]
+    per_class_df = (pd.concat(per_class, ignore_index=True) if per_class
+                    else pd.DataFrame(columns=["label", "precision", "recall", "f1", "support", "field"]))
+    per_class_df = per_class_df[["field", "label", "precision", "recall", "f1", "support"]]
 
-    with pd.ExcelWriter(out_xlsx, engine="xlsxwriter") as wr:
+    with span("metrics_eval.excel_write", rows=len(df_merged)), pd.ExcelWriter(out_xlsx, engine="xlsxwriter") as wr:
         df_merged.to_excel(wr, sheet_name="data", index=False)
         metrics_df.to_excel(wr, sheet_name="metrics", index=False)
+        per_class_df.to_excel(wr, sheet_name="per_class", index=False)
     print(f"[OK] Excel rapor: {out_xlsx}")
 
+    if data_out:
+        write_table(df_merged, data_out, kind="eval")
+        print(f"[OK] Birleşik veri: {data_out}")
+
 # ---------- Confusion tabloları ----------
 def _confusion_counts(df: pd.DataFrame, gcol: str, pcol: str) -> pd.DataFrame:
     if gcol not in df.columns or pcol not in df.columns:
@@ -106,20 +148,14 @@ def _confusion_counts(df: pd.DataFrame, gcol: str, pcol: str) -> pd.DataFrame:
            .sort_values("count", ascending=False))
     return tmp
 
+@traced("metrics_eval.save_confusions")
 def save_confusions(df_merged: pd.DataFrame, out_dir: str) -> None:
     """
     Alan bazında basit confusion CSV'leri üretir.
     """
     out = Path(out_dir)
     out.mkdir(parents=True, exist_ok=True)
-    specs = [
-        ("sentiment", "gold_sentiment", "pred_sentiment"),
-        ("intent", "gold_intent", "pred_intent"),
-        ("yanit_durumu", "gold_yanit_durumu", "pred_yanit_durumu"),
-        ("tur", "gold_tur", "pred_tur"),
-        ("intent_detay", "gold_intent_detay", "pred_intent_detay"),
-    ]
-    for name, gcol, pcol in specs:
+    for name, gcol, pcol in FIELDS:
         dfc = _confusion_counts(df_merged, gcol, pcol)
         path = out / f"confusion_{name}.csv"
         dfc.to_csv(path, index=False, encoding="utf-8")
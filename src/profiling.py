@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Aşama bazlı profil ve zamanlama
+-------------------------------
+- `span("ad")` bağlam yöneticisi ve `@traced("ad")` dekoratörü pipeline'ın sıcak noktalarını
+  (data_load, llm_infer, metrics_eval, json_to_xlsx, generate_reports) işaretler.
+- Profil kapalıyken (varsayılan) `span` paylaşılan boş bir bağlam döndürür, `traced` doğrudan
+  özgün fonksiyonu çağırır: maliyet tek bir global kontrolüdür.
+- Açıkken her bölüm için duvar saati (perf_counter), iş parçacığı CPU süresi (thread_time) ve
+  isteğe bağlı olarak bellek ayırma farkı (tracemalloc; bölüm sonundaki süreç tepe değeriyle
+  birlikte) kaydedilir.
+  * tracemalloc süreç geneli sayar ve Python'u belirgin şekilde yavaşlatır; bu yüzden ayrıca
+    `alloc=True` (CLI: --profile-alloc) ile açılır. Eşzamanlı iş parçacıklarındaki bölümlerin
+    ayırma farkları birbirine karışabilir.
+  * Alt süreçlerde (ProcessPoolExecutor) açılan bölümler kaydedilmez.
+- Çıktılar:
+  * Chrome trace JSON (chrome://tracing ya da https://ui.perfetto.dev ile açılır),
+  * bölüm adına göre özet tablo (çağrı sayısı, toplam/ortalama/maks duvar, CPU, ayırma);
+    konsola basılır ve trace'in yanına `<ad>.summary.csv` olarak yazılır.
+  Özet her zaman tamdır; trace olay sayısı `max_events` ile sınırlanır (100k sohbetlik koşuda
+  bellek şişmesin diye).
+
+Kullanım:
+  from profiling import span, traced, session
+
+  @traced("data_load.records_to_frame")
+  def _records_to_frame(...): ...
+
+  with span("llm_infer.network", model=model):
+      resp = client.chat.completions.create(...)
+
+  with session("outputs/profile/trace.json", alloc=False):   # CLI: --profile [YOL]
+      main_body()
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from functools import wraps
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+DEFAULT_TRACE = "outputs/profile/trace.json"
+_NULL = nullcontext()
+
+
+@dataclass
+class _Stat:
+    count: int = 0
+    wall: float = 0.0
+    wall_max: float = 0.0
+    cpu: float = 0.0
+    alloc: int = 0
+    alloc_peak: int = 0
+
+
+class Profiler:
+    """Bölüm kayıtlarını toplayan profilleyici (iş parçacığı güvenli)."""
+
+    def __init__(self, alloc: bool = False, max_events: int = 200_000):
+        self.alloc = alloc
+        self.max_events = max_events
+        self.events: List[Dict[str, Any]] = []
+        self.stats: Dict[str, _Stat] = {}
+        self.dropped_events = 0
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self._pid = os.getpid()
+        self._own_tracemalloc = False
+        if alloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_tracemalloc = True
+
+    def close(self) -> None:
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+            self._own_tracemalloc = False
+
+    @contextmanager
+    def span(self, name: str, **args: Any) -> Iterator[None]:
+        mem0 = tracemalloc.get_traced_memory()[0] if self.alloc else 0
+        cpu0 = time.thread_time()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - t0
+            cpu = time.thread_time() - cpu0
+            alloc = peak = 0
+            if self.alloc:
+                cur, peak = tracemalloc.get_traced_memory()
+                alloc = cur - mem0
+            self._record(name, t0, wall, cpu, alloc, peak, args)
+
+    def _record(self, name: str, t0: float, wall: float, cpu: float,
+                alloc: int, peak: int, args: Dict[str, Any]) -> None:
+        ev_args: Dict[str, Any] = {"cpu_ms": round(cpu * 1e3, 3)}
+        if self.alloc:
+            ev_args["alloc_kb"] = round(alloc / 1024, 1)
+            ev_args["peak_kb"] = round(peak / 1024, 1)
+        ev_args.update({k: v if isinstance(v, (int, float, bool)) or v is None else str(v)
+                        for k, v in args.items()})
+        tid = threading.get_ident()
+        with self._lock:
+            st = self.stats.get(name)
+            if st is None:
+                st = self.stats[name] = _Stat()
+            st.count += 1
+            st.wall += wall
+            st.wall_max = max(st.wall_max, wall)
+            st.cpu += cpu
+            st.alloc += alloc
+            st.alloc_peak = max(st.alloc_peak, peak)
+            if tid not in self._threads:
+                self._threads[tid] = threading.current_thread().name
+            if len(self.events) >= self.max_events:
+                self.dropped_events += 1
+                return
+            self.events.append({
+                "name": name,
+                "cat": name.split(".", 1)[0],
+                "ph": "X",
+                "ts": round((t0 - self._t0) * 1e6, 1),
+                "dur": round(wall * 1e6, 1),
+                "pid": self._pid,
+                "tid": tid,
+                "args": ev_args,
+            })
+
+    # ------------ çıktılar ------------
+    def summary(self) -> pd.DataFrame:
+        """Bölüm adına göre özet (toplam duvar süresine göre azalan)."""
+        rows = []
+        with self._lock:
+            items = list(self.stats.items())
+        for name, st in items:
+            row = {
+                "span": name,
+                "count": st.count,
+                "wall_s": round(st.wall, 4),
+                "mean_ms": round(st.wall / st.count * 1e3, 3),
+                "max_ms": round(st.wall_max * 1e3, 3),
+                "cpu_s": round(st.cpu, 4),
+            }
+            if self.alloc:
+                row["alloc_mb"] = round(st.alloc / 2 ** 20, 2)
+                row["peak_mb"] = round(st.alloc_peak / 2 ** 20, 2)
+            rows.append(row)
+        cols = ["span", "count", "wall_s", "mean_ms", "max_ms", "cpu_s"] + (["alloc_mb", "peak_mb"] if self.alloc else [])
+        return pd.DataFrame(rows, columns=cols).sort_values("wall_s", ascending=False, ignore_index=True)
+
+    def write_trace(self, path: str) -> Path:
+        """Chrome trace JSON'u yazar (thread adları meta olay olarak eklenir)."""
+        out = Path(path)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            events = list(self.events)
+            threads = dict(self._threads)
+        meta = [{"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+                for tid, name in threads.items()]
+        payload = {
+            "traceEvents": meta + events,
+            "displayTimeUnit": "ms",
+            "otherData": {"dropped_events": self.dropped_events, "alloc": self.alloc},
+        }
+        out.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        return out
+
+
+# ------------ global profilleyici ------------
+_PROFILER: Optional[Profiler] = None
+
+
+def enabled() -> bool:
+    return _PROFILER is not None
+
+
+def enable(alloc: bool = False, max_events: int = 200_000) -> Profiler:
+    """Global profilleyiciyi açar (zaten açıksa mevcut olanı döndürür)."""
+    global _PROFILER
+    if _PROFILER is None:
+        _PROFILER = Profiler(alloc=alloc, max_events=max_events)
+    return _PROFILER
+
+
+def disable() -> Optional[Profiler]:
+    """Global profilleyiciyi kapatır ve (varsa) döndürür."""
+    global _PROFILER
+    prof, _PROFILER = _PROFILER, None
+    if prof is not None:
+        prof.close()
+    return prof
+
+
+def span(name: str, **args: Any):
+    """Profil açıksa zamanlanan bir bölüm, kapalıysa boş bağlam."""
+    prof = _PROFILER
+    if prof is None:
+        return _NULL
+    return prof.span(name, **args)
+
+
+def traced(name: Optional[str] = None):
+    """Fonksiyonu `span` ile sarar (ad verilmezse modül.fonksiyon)."""
+    def deco(fn):
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @wraps(fn)
+        def wrapper(*a, **kw):
+            prof = _PROFILER
+            if prof is None:
+                return fn(*a, **kw)
+            with prof.span(label):
+                return fn(*a, **kw)
+        return wrapper
+    return deco
+
+
+def report(prof: Profiler, trace_path: str) -> None:
+    """Trace'i ve özet CSV'yi yazar, özet tabloyu konsola basar."""
+    out = prof.write_trace(trace_path)
+    summary = prof.summary()
+    summary_path = out.with_name(out.stem + ".summary.csv")
+    summary.to_csv(summary_path, index=False, encoding="utf-8-sig")
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(summary.to_string(index=False))
+    if prof.dropped_events:
+        print(f"Uyarı: trace olay sınırı aşıldı, {prof.dropped_events} olay yalnızca özete işlendi.")
+    print(f"[OK] Profil yazıldı: {out} (özet: {summary_path})")
+
+
+@contextmanager
+def session(trace_path: Optional[str], alloc: bool = False) -> Iterator[Optional[Profiler]]:
+    """
+    CLI'lar için: `trace_path` verilmişse profili açar, çıkışta (hata olsa bile) raporlar.
+    `trace_path` None ise (ya da profil zaten açıksa) hiçbir şey yapmaz.
+    """
+    if not trace_path or enabled():
+        yield _PROFILER
+        return
+    prof = enable(alloc=alloc)
+    try:
+        with prof.span("total"):
+            yield prof
+    finally:
+        disable()
+        report(prof, trace_path)
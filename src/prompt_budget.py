@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Token bütçeli prompt sıkıştırma
+-------------------------------
+- Amaç: Çok uzun sohbetlerde LLM'e giden token sayısını (maliyet + gecikme) sınırlamak.
+- Token sayımı yereldir: `tiktoken` yüklüyse gerçek kodlayıcı (o200k_base / cl100k_base),
+  değilse kelime/noktalama bölütlemesine dayalı bir tahmin kullanılır (ağ çağrısı yoktur).
+- Bütçe (`PromptBudget.max_tokens`) isteğin tamamı içindir: sistem mesajı + şablon + sohbet.
+  Sohbete kalan pay aşılırsa ortası kırpılır:
+  * ilk müşteri mesajı her zaman korunur (niyet çoğunlukla ilk mesajdadır),
+  * sondan en az `keep_last` tur korunur (çözüm durumu ve son duygu için),
+  * kalan bütçe sondan geriye doğru ara turlarla, sonra karşılama satırlarıyla doldurulur,
+  * atlanan her bölümün yerine tek satırlık bir özet işareti konur ("[… 14 mesaj kısaltıldı …]").
+  Zorunlu kısımlar bile sığmazsa uzun satırlar karakter bazında kısaltılır.
+- Her sohbet için `tokens_in` (gönderilen) ve `tokens_full` (sıkıştırmasız) raporlanır;
+  böylece tasarruf ölçülebilir (bkz. `llm_infer.predict_conversations`).
+
+Kullanım:
+  budget = PromptBudget(max_tokens=3000, keep_last=6)
+  dialog, info = budget.fit(dialog_text, overhead=count_tokens(system_prompt) + count_tokens(template))
+  info.tokens_in, info.tokens_full, info.dropped_turns
+
+Gereksinim (isteğe bağlı, daha doğru sayım için):
+  pip install tiktoken
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+# "Müşteri: ..." (json_to_xlsx 'tam_sohbet') ya da "[Müşteri] ..." (data_load 'dialog_text')
+_CUSTOMER_RE = re.compile(r"^\s*(\[\s*(müşteri|musteri|customer|user|kullanıcı)\s*\]|(müşteri|musteri|customer|user|kullanıcı)\s*:)",
+                          re.IGNORECASE)
+_MARKER = "[… {n} mesaj kısaltıldı …]"
+_ELLIPSIS = " …"
+
+
+# ------------ Token sayımı ------------
+@lru_cache(maxsize=1)
+def _encoder():
+    """tiktoken kodlayıcısı (yüklü değilse None)."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    for name in ("o200k_base", "cl100k_base"):
+        try:
+            return tiktoken.get_encoding(name)
+        except Exception:
+            continue
+    return None
+
+
+def _estimate(text: str) -> int:
+    """
+    tiktoken yokken tahmin: her noktalama 1 token, her kelime ~4 karakterde 1 token
+    (Türkçe ekler BPE'de ayrı parçalara bölündüğü için uzun kelimeler birden çok token sayılır).
+    """
+    return sum((len(w) + 3) // 4 for w in _WORD_RE.findall(text))
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """Metnin yerel token sayısı (boş metin için 0)."""
+    if not text:
+        return 0
+    enc = _encoder()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    return _estimate(text)
+
+
+# ------------ Sohbet kırpma ------------
+@dataclass
+class BudgetInfo:
+    tokens_in: int          # gönderilen (sıkıştırılmış) istek token'ı
+    tokens_full: int        # sıkıştırmasız istek token'ı
+    dropped_turns: int = 0  # atlanan ara tur sayısı
+    truncated: bool = False  # satır içi karakter kısaltması yapıldı mı
+
+    @property
+    def compacted(self) -> bool:
+        return self.dropped_turns > 0 or self.truncated
+
+
+def _truncate_line(line: str, max_tokens: int) -> str:
+    """Satırı yaklaşık `max_tokens` token'a indirir (karakter oranıyla, sonra ince ayar)."""
+    tok = count_tokens(line)
+    if tok <= max_tokens:
+        return line
+    keep = max(1, int(len(line) * max_tokens / tok))
+    while keep > 1 and count_tokens(line[:keep] + _ELLIPSIS) > max_tokens:
+        keep = int(keep * 0.9)
+    return line[:keep].rstrip() + _ELLIPSIS
+
+
+def compact_dialog(text: str, max_tokens: int, keep_last: int = 6) -> Tuple[str, int, bool]:
+    """
+    Sohbeti `max_tokens`'a sığdırır (satır = tur).
+    İlk müşteri mesajı ve son `keep_last` tur zorunludur; kalan bütçe önce sondan geriye doğru ara
+    turlarla, sonra ilk müşteri mesajından önceki (karşılama) satırlarıyla doldurulur. Atlanan her
+    ardışık bölümün yerine bir işaret satırı konur.
+    :return: (metin, atlanan tur sayısı, satır kısaltması yapıldı mı)
+    """
+    if count_tokens(text) <= max_tokens:
+        return text, 0, False
+
+    lines: List[str] = [ln for ln in text.splitlines() if ln.strip()]
+    n = len(lines)
+    first_cust = next((i for i, ln in enumerate(lines) if _CUSTOMER_RE.match(ln)), 0)
+    tail_start = max(first_cust + 1, n - max(keep_last, 0))
+    keep = [False] * n
+    keep[first_cust] = True
+    for i in range(tail_start, n):
+        keep[i] = True
+
+    cost = [count_tokens(ln) + 1 for ln in lines]  # +1: satır sonu
+    marker_cost = count_tokens(_MARKER.format(n=n)) + 1
+    used = sum(c for c, k in zip(cost, keep) if k)
+    gaps = int(first_cust > 0) + int(tail_start > first_cust + 1)
+    used += gaps * marker_cost
+
+    # öncelik: tail'e komşu ara turlar (sondan geriye), sonra karşılama satırları (baştan ileri)
+    for order in (range(tail_start - 1, first_cust, -1), range(first_cust)):
+        for i in order:
+            if used + cost[i] > max_tokens:
+                break
+            keep[i] = True
+            used += cost[i]
+
+    out: List[str] = []
+    markers = set()
+    dropped = run = 0
+    for i in range(n + 1):
+        if i < n and not keep[i]:
+            run += 1
+            dropped += 1
+            continue
+        if run:
+            markers.add(len(out))
+            out.append(_MARKER.format(n=run))
+            run = 0
+        if i < n:
+            out.append(lines[i])
+
+    truncated = False
+    over = sum(count_tokens(ln) + 1 for ln in out) - max_tokens
+    if over > 0:
+        # zorunlu kısımlar sığmıyor: en uzun satırlardan başlayarak kısalt
+        for i in sorted(set(range(len(out))) - markers, key=lambda j: -count_tokens(out[j])):
+            if over <= 0:
+                break
+            tok = count_tokens(out[i])
+            target = max(8, tok - over)
+            if target >= tok:
+                continue
+            out[i] = _truncate_line(out[i], target)
+            over -= tok - count_tokens(out[i])
+            truncated = True
+    return "\n".join(out), dropped, truncated
+
+
+@dataclass
+class PromptBudget:
+    """
+    İstek başına token bütçesi.
+    :param max_tokens: Sistem mesajı + şablon + sohbet için üst sınır (None = sınırsız, yalnızca sayım).
+    :param keep_last: Kırpmada her zaman korunacak son tur sayısı.
+    :param min_dialog_tokens: Şablon bütçeyi yese bile sohbete bırakılacak en az pay.
+    """
+    max_tokens: Optional[int] = None
+    keep_last: int = 6
+    min_dialog_tokens: int = 256
+
+    def fit(self, dialog: str, overhead: int = 0) -> Tuple[str, BudgetInfo]:
+        """
+        Sohbeti bütçeye sığdırır. `overhead`: sohbet dışındaki token'lar (sistem mesajı + şablon).
+        """
+        dialog = dialog or ""
+        full = overhead + count_tokens(dialog)
+        if self.max_tokens is None or full <= self.max_tokens:
+            return dialog, BudgetInfo(tokens_in=full, tokens_full=full)
+        allowed = max(self.min_dialog_tokens, self.max_tokens - overhead)
+        text, dropped, truncated = compact_dialog(dialog, allowed, keep_last=self.keep_last)
+        info = BudgetInfo(tokens_in=overhead + count_tokens(text), tokens_full=full,
+                          dropped_turns=dropped, truncated=truncated)
+        return text, info
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Uyarlanabilir hız sınırlayıcı ve geri çekilme (backoff) zamanlayıcısı
+--------------------------------------------------------------------
+- Token kovası (token bucket): model başına dakikalık istek (RPM) ve dakikalık token (TPM) sınırı.
+  Aynı modeli kullanan tüm iş parçacıkları tek bir sınırlayıcıyı paylaşır (`get_limiter`).
+- Geri çekilme: üstel artış + tam jitter; sunucu `Retry-After` bildirirse en az o kadar beklenir.
+- Uyarlanabilir eşzamanlılık (AIMD): 429 görüldüğünde uçuştaki istek sınırı yarıya iner,
+  ardışık başarılı çağrılarla birer birer geri artar (üst sınır profildeki `max_concurrency`).
+- Sağlayıcı profilleri: Groq ve OpenAI için ayrı varsayılan sınırlar (`PROVIDER_PROFILES`);
+  model bazlı istisnalar `MODEL_PROFILES` ile tanımlanır.
+
+Kullanım:
+  limiter = get_limiter("gpt-4o-mini")
+  with limiter.slot():
+      limiter.acquire(tokens=1200)
+      ...  # API çağrısı
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import Dict, Iterator, Optional, Tuple
+
+
+# ------------ Limit profilleri ------------
+@dataclass(frozen=True)
+class LimitProfile:
+    rpm: float              # dakikadaki istek
+    tpm: float              # dakikadaki token (girdi + tahmini çıktı)
+    max_concurrency: int    # uçuştaki istek üst sınırı
+    min_concurrency: int = 1
+
+
+PROVIDER_PROFILES: Dict[str, LimitProfile] = {
+    "openai": LimitProfile(rpm=500, tpm=200_000, max_concurrency=32),
+    "groq":   LimitProfile(rpm=30,  tpm=6_000,   max_concurrency=4),
+}
+
+# Sağlayıcı varsayılanından farklı olan modeller
+MODEL_PROFILES: Dict[str, LimitProfile] = {
+    "gpt-4o-mini":             LimitProfile(rpm=500, tpm=200_000, max_concurrency=32),
+    "gpt-4.1-mini":            LimitProfile(rpm=500, tpm=200_000, max_concurrency=32),
+    "llama-3.1-8b-instant":    LimitProfile(rpm=30,  tpm=6_000,   max_concurrency=4),
+    "llama-3.3-70b-versatile": LimitProfile(rpm=30,  tpm=12_000,  max_concurrency=4),
+}
+
+
+def provider_for_model(model: Optional[str]) -> str:
+    """`llm_infer._build_client` ile aynı kural: 'gpt' içeren modeller OpenAI, diğerleri Groq."""
+    return "openai" if model and "gpt" in model.lower() else "groq"
+
+
+def profile_for_model(model: Optional[str]) -> LimitProfile:
+    return MODEL_PROFILES.get(model or "", PROVIDER_PROFILES[provider_for_model(model)])
+
+
+# ------------ Token kovası ------------
+class TokenBucket:
+    """
+    İş parçacığı güvenli token kovası.
+    :param capacity: Kovanın alabileceği en fazla token (ani patlama payı).
+    :param refill_per_sec: Saniyede eklenen token.
+    """
+
+    def __init__(self, capacity: float, refill_per_sec: float):
+        self.capacity = float(capacity)
+        self.refill_per_sec = float(refill_per_sec)
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.refill_per_sec)
+        self._last = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        `amount` token ayırır ve kullanılabilir olana kadar beklenecek süreyi (saniye) döndürür.
+        Kova borca girebilir; böylece sıradaki çağıranlar adil biçimde daha uzun bekler. Kapasiteden
+        büyük istekler de tam tutarıyla düşülür (aksi hâlde büyük prompt'larda TPM sınırı işlemez).
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= float(amount)
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.refill_per_sec
+
+    def drain(self) -> None:
+        """Kovayı boşaltır (429 sonrası yeni isteklerin hemen çıkmasını engellemek için)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0)
+
+
+# ------------ Uyarlanabilir eşzamanlılık kapısı ------------
+class _AdaptiveGate:
+    """Sınırı çalışma anında değişebilen semafor (AIMD)."""
+
+    def __init__(self, limit: int, min_limit: int, max_limit: int, increase_after: int = 20):
+        self.limit = limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase_after = increase_after
+        self._in_flight = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def on_success(self) -> None:
+        with self._cond:
+            self._successes += 1
+            if self._successes >= self.increase_after and self.limit < self.max_limit:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify()
+
+    def on_throttle(self) -> None:
+        with self._cond:
+            self.limit = max(self.min_limit, self.limit // 2)
+            self._successes = 0
+
+
+# ------------ Sınırlayıcı ------------
+class RateLimiter:
+    """
+    Model başına RPM + TPM kovaları ve uyarlanabilir eşzamanlılık.
+    """
+
+    def __init__(self, profile: LimitProfile):
+        self.profile = profile
+        self.requests = TokenBucket(capacity=max(1.0, profile.rpm / 6), refill_per_sec=profile.rpm / 60.0)
+        self.tokens = TokenBucket(capacity=max(1.0, profile.tpm / 6), refill_per_sec=profile.tpm / 60.0)
+        self.gate = _AdaptiveGate(
+            limit=profile.max_concurrency,
+            min_limit=profile.min_concurrency,
+            max_limit=profile.max_concurrency,
+        )
+        self.throttled = 0
+        self._pause_until = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Uçuştaki istek sayısını uyarlanabilir sınırla kısıtlar."""
+        self.gate.acquire()
+        try:
+            yield
+        finally:
+            self.gate.release()
+
+    def acquire(self, tokens: int = 1) -> None:
+        """Bir istek ve `tokens` token için gerekirse bekler (ortak duraklama dahil)."""
+        with self._lock:
+            pause = self._pause_until - time.monotonic()
+        wait = max(pause, self.requests.reserve(1), self.tokens.reserve(tokens))
+        if wait > 0:
+            time.sleep(wait)
+
+    def on_success(self) -> None:
+        self.gate.on_success()
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """429 geri bildirimi: eşzamanlılığı düşür, kovaları boşalt, Retry-After kadar herkesi durdur."""
+        self.throttled += 1
+        self.gate.on_throttle()
+        self.requests.drain()
+        self.tokens.drain()
+        if retry_after:
+            with self._lock:
+                self._pause_until = max(self._pause_until, time.monotonic() + retry_after)
+
+
+_LIMITERS: Dict[Tuple[str, LimitProfile], RateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_limiter(
+    model: Optional[str],
+    rpm: Optional[float] = None,
+    tpm: Optional[float] = None,
+    max_concurrency: Optional[int] = None,
+) -> RateLimiter:
+    """
+    Model için paylaşılan sınırlayıcıyı döndürür (profil + verilen geçersiz kılmalar).
+    Anahtar, model ve geçersiz kılmalar uygulanmış profildir: aynı ayarla yapılan çağrılar tek
+    sınırlayıcıyı paylaşır, farklı rpm/tpm/max_concurrency ise ayrı bir sınırlayıcı kurar.
+    `max_concurrency` profil tavanını yalnızca düşürebilir (CLI --concurrency sağlayıcının izin
+    verdiğinden fazla paralel istek açmasın; örn. groq: 4).
+    """
+    base = profile_for_model(model)
+    if max_concurrency:
+        max_concurrency = min(int(max_concurrency), base.max_concurrency)
+    overrides = {k: v for k, v in (("rpm", rpm), ("tpm", tpm), ("max_concurrency", max_concurrency)) if v}
+    if "max_concurrency" in overrides:
+        overrides["min_concurrency"] = min(base.min_concurrency, overrides["max_concurrency"])
+    profile = replace(base, **overrides)
+    key = (model or "", profile)
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(key)
+        if limiter is None:
+            limiter = _LIMITERS[key] = RateLimiter(profile)
+        return limiter
+
+
+# ------------ Hata sınıflandırma ve geri çekilme ------------
+def _status_code(exc: BaseException) -> Optional[int]:
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """OpenAI/Groq `RateLimitError` veya HTTP 429."""
+    return type(exc).__name__ == "RateLimitError" or _status_code(exc) == 429
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Tekrar denenmeye değer ağ/sunucu hataları (429 hariç): zaman aşımı, bağlantı, 5xx."""
+    if type(exc).__name__ in ("APITimeoutError", "APIConnectionError", "TimeoutError", "ConnectionError"):
+        return True
+    code = _status_code(exc)
+    return code is not None and code >= 500
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Yanıt başlıklarından `retry-after-ms` / `retry-after` değerini saniye olarak okur."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        ms = headers.get("retry-after-ms")
+        if ms is not None:
+            return float(ms) / 1000.0
+        sec = headers.get("retry-after")
+        if sec is not None:
+            return float(sec)
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = 0.5,
+    cap: float = 30.0,
+    retry_after: Optional[float] = None,
+) -> float:
+    """Üstel geri çekilme + tam jitter; `retry_after` verilmişse en az o kadar."""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Parmak izli aşama çalıştırıcı (make benzeri)
+-------------------------------------------
+- Pipeline aşamaları (`Stage`) sırayla tanımlanır; her aşamanın parmak izi şunlardan üretilir:
+  * aşama adı ve çıktıyı etkileyen ayarlar (`config`, JSON'a çevrilebilir olmalı),
+  * dış girdi dosyalarının içerik özeti (`files`; boyut + mtime değişmediyse önceki özet kullanılır),
+  * bağımlı olunan aşamaların son çalıştırma damgası (`deps`).
+- Parmak izi manifest'teki kayıtla aynıysa ve tüm çıktılar diskteyse aşama atlanır.
+  Bir aşama yeniden çalışınca damgası değişir; böylece yalnızca ona bağlı aşamalar geçersizleşir.
+- Manifest: JSON dosyası (varsayılan `<work_dir>/stages.json`).
+- Profil açıksa (bkz. `profiling`) her çalışan aşama `stage.<ad>` bölümü olarak kaydedilir.
+
+Kullanım:
+  runner = StageRunner("outputs/stages/stages.json", force=["reports"])
+  runner.add(Stage("load", run=load_fn, outputs=[conv_path], files=[raw_json]))
+  runner.add(Stage("predict", run=predict_fn, outputs=[pred_path], deps=["load"], config={"model": m}))
+  runner.run()
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from profiling import span
+
+_READ_BLOCK = 1 << 20
+
+
+@dataclass
+class Stage:
+    name: str
+    run: Callable[[], None]                                 # çıktıları yazan işlev
+    outputs: List[Path] = field(default_factory=list)      # dosya ya da klasör
+    deps: List[str] = field(default_factory=list)          # üst aşama adları
+    config: Dict[str, Any] = field(default_factory=dict)   # çıktıyı etkileyen ayarlar
+    files: List[Path] = field(default_factory=list)        # dış girdi dosyaları
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(_READ_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class StageRunner:
+    """
+    Aşamaları sırayla çalıştırır; güncel olanları atlar.
+    :param manifest_path: Parmak izi/damga kayıtlarının tutulduğu JSON.
+    :param force: Parmak izinden bağımsız yeniden çalıştırılacak aşamalar ("all" = hepsi).
+    """
+
+    def __init__(self, manifest_path, force: Iterable[str] = ()):
+        self.manifest_path = Path(manifest_path)
+        self.force = set(force)
+        self.stages: List[Stage] = []
+        self.manifest: Dict[str, Any] = {"stages": {}, "files": {}}
+        if self.manifest_path.exists():
+            try:
+                self.manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                print(f"Uyarı: manifest okunamadı, tüm aşamalar yeniden çalışacak: {self.manifest_path}")
+        self.manifest.setdefault("stages", {})
+        self.manifest.setdefault("files", {})
+
+    def add(self, stage: Stage) -> "StageRunner":
+        known = {s.name for s in self.stages}
+        missing = [d for d in stage.deps if d not in known]
+        if missing:
+            raise ValueError(f"'{stage.name}' aşaması tanımsız aşamalara bağlı: {missing}")
+        self.stages.append(stage)
+        return self
+
+    # ---------- parmak izi ----------
+    def _file_digest(self, path: Path) -> str:
+        """İçerik özeti; boyut + mtime manifest'tekiyle aynıysa dosya yeniden okunmaz."""
+        st = path.stat()
+        key = str(path.resolve())
+        rec = self.manifest["files"].get(key)
+        if rec and rec.get("size") == st.st_size and rec.get("mtime_ns") == st.st_mtime_ns:
+            return rec["sha256"]
+        digest = _sha256_file(path)
+        self.manifest["files"][key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        return digest
+
+    def fingerprint(self, stage: Stage) -> str:
+        payload = {
+            "name": stage.name,
+            "config": stage.config,
+            "files": {str(p): self._file_digest(Path(p)) for p in stage.files},
+            "deps": {d: self.manifest["stages"].get(d, {}).get("stamp") for d in stage.deps},
+        }
+        blob = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def is_fresh(self, stage: Stage, fp: str) -> bool:
+        if stage.name in self.force or "all" in self.force:
+            return False
+        rec = self.manifest["stages"].get(stage.name)
+        return bool(rec) and rec.get("fingerprint") == fp and all(Path(p).exists() for p in stage.outputs)
+
+    # ---------- çalıştırma ----------
+    def _save(self) -> None:
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(self.manifest_path)
+
+    def run(self, until: Optional[str] = None) -> Dict[str, str]:
+        """
+        Aşamaları sırayla çalıştırır (`until` verilirse o aşamada durur).
+        :return: aşama adı → "skipped" | "ran"
+        """
+        status: Dict[str, str] = {}
+        for stage in self.stages:
+            fp = self.fingerprint(stage)
+            if self.is_fresh(stage, fp):
+                print(f"[stage] {stage.name}: güncel, atlandı")
+                status[stage.name] = "skipped"
+            else:
+                print(f"[stage] {stage.name}: çalışıyor…")
+                t0 = time.perf_counter()
+                with span(f"stage.{stage.name}"):
+                    stage.run()
+                elapsed = time.perf_counter() - t0
+                self.manifest["stages"][stage.name] = {
+                    "fingerprint": fp,
+                    "stamp": hashlib.sha256(f"{fp}:{time.time_ns()}".encode()).hexdigest(),
+                    "seconds": round(elapsed, 3),
+                    "outputs": [str(p) for p in stage.outputs],
+                }
+                self._save()
+                print(f"[OK] {stage.name} ({elapsed:.1f} sn)")
+                status[stage.name] = "ran"
+            if until and stage.name == until:
+                break
+        self._save()
+        return status
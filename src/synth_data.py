@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Sentetik Türkçe sohbet veri seti üreticisi (ölçek testleri için)
+---------------------------------------------------------------
+- Tohumlu (seed) ve tekrarlanabilir: aynı (n, seed) her zaman aynı veri setini üretir;
+  küçük bir veri seti, aynı tohumla üretilen büyüğünün ön ekidir.
+- Şema: `json_to_xlsx.normalize` ve `data_load.load_conversations` tarafından doğrudan okunur:
+  {sohbet_id, tarih_saat, yanit_durumu, sentiment, tur, intent, intent_detay,
+   mesajlar: [{sender, text, timestamp}, ...]}
+- Etiketler kapalı kümelerden çekilir: intent ← `data_load.INTENT_FALLBACK` (uzun kuyruklu dağılım),
+  sentiment ← `SENT_ALLOWED`, tur ← `TUR_ALLOWED`, yanit_durumu ← `ANS_ALLOWED`.
+  Metin etiketlerle tutarlıdır (açılış intent'e, kapanış çözüm durumu ve duyguya göre seçilir).
+- Uzunluk dağılımları: tur sayısı log-normal (medyan ~6, nadiren 100+ tur), mesaj uzunluğu
+  şablon + rastgele ek cümleler; mesaj arası süreler üstel dağılımlı (bot hızlı, müşteri yavaş).
+- Çıktı akış hâlinde yazılır (kayıtlar bellekte biriktirilmez): uzantı .jsonl ise satır başına bir
+  kayıt, .json ise tek JSON dizi.
+
+Kullanım:
+  python src/synth_data.py --n 100000 --seed 0 --out data/synth/synth_100k.jsonl
+  python src/json_to_xlsx.py --in data/synth/synth_100k.json --out outputs/synth.xlsx
+
+  from synth_data import iter_records, conversations_frame
+  df = conversations_frame(10_000, seed=1)   # load_conversations ile aynı kolonlar
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import pandas as pd
+
+from data_load import INTENT_FALLBACK, _records_to_frame
+from llm_infer import ANS_ALLOWED, SENT_ALLOWED, TUR_ALLOWED
+
+_TS_FMT = "%Y-%m-%d %H:%M:%S"
+_START = datetime(2024, 1, 1)
+_SPAN_DAYS = 365
+
+# intent → (intent_detay seçenekleri, müşteri açılış cümleleri)
+_INTENT_TEXT: Dict[str, tuple] = {
+    "Eksik ürün": (["Eksik parça", "Paket eksik geldi"],
+                   ["Siparişimden bir ürün eksik çıktı", "Kolide {d} ürün olması gerekirken bir tanesi yok"]),
+    "Şifre sıfırlama": (["Şifre sıfırlama maili gelmiyor", "Şifremi unuttum"],
+                        ["Şifremi sıfırlayamıyorum, mail gelmiyor", "Hesabıma giriş yapamıyorum şifremi unuttum"]),
+    "İade": (["İade kodu", "İade durumu", "Para iadesi"],
+             ["{n} numaralı siparişimi iade etmek istiyorum", "İade ettiğim ürünün parası hâlâ yatmadı"]),
+    "Kupon": (["Kupon geçersiz", "Kupon tanımlanmadı"],
+              ["Kupon kodum sepette geçersiz görünüyor", "Bana tanımlanan kupon hesabımda yok"]),
+    "İptal": (["Sipariş iptali", "İptal durumu"],
+              ["{n} numaralı siparişimi iptal etmek istiyorum", "Siparişimi iptal ettim ama hâlâ hazırlanıyor görünüyor"]),
+    "Stok": (["Stok bilgisi", "Stoğa gelme"],
+             ["Bu ürün ne zaman stoğa girer?", "Beğendiğim ürünün bedeni tükenmiş, tekrar gelecek mi?"]),
+    "Ödeme": (["Çift çekim", "Ödeme hatası", "Taksit"],
+              ["Kartımdan iki kez çekim yapılmış", "Ödeme sırasında hata aldım ama para çekildi"]),
+    "Kargo": (["Kargo takibi", "Gecikme", "Yanlış adrese teslim"],
+              ["Kargom {d} gündür aynı şubede bekliyor", "Siparişim teslim edildi görünüyor ama bana ulaşmadı"]),
+    "Hasarlı ürün": (["Kırık ürün", "Kusurlu ürün"],
+                     ["Ürün kırık geldi", "Gelen ürünün kutusu ezik ve kendisi hasarlı"]),
+    "Değişim": (["Beden değişimi", "Renk değişimi"],
+                ["Aldığım ürünü başka bedenle değiştirmek istiyorum", "Rengi fotoğraftakinden farklı, değişim yapabilir miyim?"]),
+    "Ürün": (["Ürün bilgisi", "Ürün özellikleri"],
+             ["Bu ürünün garantisi var mı?", "Ürün açıklamasında ölçüler yazmıyor"]),
+    "İndirim": (["İndirim yansımadı", "Kampanya koşulları"],
+                ["Sepette indirim yansımadı", "Kampanyadaki indirim neden uygulanmadı?"]),
+    "Hesap bilgisi": (["Bilgi güncelleme", "Telefon değişikliği"],
+                      ["Hesabımdaki telefon numarasını değiştirmek istiyorum", "E-posta adresimi güncelleyemiyorum"]),
+    "Hesap kapatma": (["Hesap silme"],
+                      ["Hesabımı tamamen kapatmak istiyorum", "Üyeliğimi nasıl silebilirim?"]),
+    "Abonelik": (["Abonelik iptali", "Üyelik ücreti"],
+                 ["Elite üyeliğimi iptal etmek istiyorum", "Abonelik ücreti neden iki kez alındı?"]),
+    "Web sitesi": (["Sayfa açılmıyor", "Uygulama hatası"],
+                   ["Uygulama sürekli kapanıyor", "Sitede ödeme sayfası açılmıyor"]),
+    "Yorum": (["Yorum yayınlanmadı", "Yorum silme"],
+              ["Yaptığım yorum yayınlanmadı", "Ürüne yazdığım yorumu silmek istiyorum"]),
+    "Teknik sorun": (["Bildirim sorunu", "Giriş hatası"],
+                     ["Bildirimler gelmiyor", "Uygulamaya girişte hata kodu alıyorum"]),
+    "Sipariş": (["Sipariş durumu", "Sipariş onayı"],
+                ["{n} numaralı siparişim ne durumda?", "Siparişim onaylandı mı göremiyorum"]),
+    "Beden": (["Beden tablosu", "Beden önerisi"],
+              ["Bu üründe hangi bedeni almalıyım?", "Beden tablosu yanlış görünüyor"]),
+    "Adres hatası": (["Adres değişikliği", "Yanlış adres"],
+                     ["Siparişteki adresi yanlış girdim", "Teslimat adresimi değiştirmek istiyorum"]),
+}
+
+_GREETING = ["Merhaba, ben Mila. Size nasıl yardımcı olabilirim?",
+             "Merhaba, Trendyol asistanı Mila ben. Nasıl yardımcı olabilirim?"]
+_BOT_MID = ["Sipariş numaranızı paylaşır mısınız?", "Hemen kontrol ediyorum, lütfen bekleyin.",
+            "Kayıtlarımızı inceledim.", "Talebinizi ilgili birime iletiyorum.",
+            "Bu konuda size yardımcı olabilmem için birkaç bilgiye ihtiyacım var.",
+            "Yaşadığınız aksaklık için üzgünüz."]
+_CUST_MID = ["Sipariş numaram {n}", "Tamam bekliyorum", "Daha önce de yazmıştım",
+             "Bu durum çok uzun sürdü", "Ne zaman çözülecek?", "Fotoğraf ekleyebilirim",
+             "Anladım", "Başka bir yolu yok mu?"]
+_FILLER = ["Geçen hafta da benzer bir sorun yaşamıştım.", "Uygulamadan da denedim.",
+           "Müşteri hizmetlerini de aradım.", "Lütfen yardımcı olun.", "Acil dönüş bekliyorum."]
+_CLOSE_BOT = {"Çözüldü": ["Talebiniz tamamlandı, başka bir konuda yardımcı olabilir miyim?",
+                          "İşleminizi gerçekleştirdim, {d} iş günü içinde yansıyacaktır."],
+              "Çözülemedi": ["Bu konuda şu an işlem yapamıyorum, sizi temsilciye aktarıyorum.",
+                             "Maalesef bu talebi buradan çözemiyorum."]}
+_CLOSE_CUST = {"Pozitif": ["Çok teşekkür ederim, harikasınız", "Teşekkürler, sorun çözüldü"],
+               "Nötr": ["Tamam", "Anladım, teşekkürler"],
+               "Negatif": ["Hiç memnun kalmadım", "Bu kabul edilemez, şikayet edeceğim"]}
+
+# Üretim verisine benzer uzun kuyruk (Zipf benzeri): sık görülen intent'ler önde, kalanlar seyrek
+_POPULAR = ["Kargo", "İade", "Sipariş", "İptal", "Ödeme", "Değişim", "Hasarlı ürün", "Eksik ürün", "Kupon"]
+_INTENT_ORDER = [i for i in _POPULAR if i in INTENT_FALLBACK] + [i for i in INTENT_FALLBACK if i not in _POPULAR]
+_INTENT_WEIGHTS = [1.0 / (r + 1) ** 0.8 for r in range(len(_INTENT_ORDER))]
+_SENT_WEIGHTS = {"Pozitif": 0.25, "Negatif": 0.35, "Nötr": 0.40}
+_ANS_WEIGHTS = {"Çözüldü": 0.65, "Çözülemedi": 0.35}
+
+
+def _fmt(text: str, rng: random.Random) -> str:
+    return text.format(n=rng.randint(100_000_000, 999_999_999), d=rng.randint(3, 10))
+
+
+def _customer_text(base: str, rng: random.Random) -> str:
+    text = _fmt(base, rng)
+    # uzun kuyruklu mesaj uzunluğu: çoğu tek cümle, bazıları paragraf
+    for _ in range(min(int(rng.expovariate(1.2)), 6)):
+        text += " " + rng.choice(_FILLER)
+    return text
+
+
+def make_record(i: int, rng: random.Random) -> Dict[str, Any]:
+    """Tek bir sohbet kaydı (json_to_xlsx şeması)."""
+    intent = rng.choices(_INTENT_ORDER, weights=_INTENT_WEIGHTS)[0]
+    details, openers = _INTENT_TEXT.get(intent, ([intent], [f"{intent} hakkında yardım istiyorum"]))
+    sentiment = rng.choices(SENT_ALLOWED, weights=[_SENT_WEIGHTS[s] for s in SENT_ALLOWED])[0]
+    yanit = rng.choices(ANS_ALLOWED, weights=[_ANS_WEIGHTS[a] for a in ANS_ALLOWED])[0]
+    tur = rng.choice(TUR_ALLOWED)
+
+    # tur sayısı: log-normal (medyan ~6), en az 2 (karşılama + müşteri açılışı); çift sayıya
+    # yuvarlanır, böylece bot → müşteri sırası korunur ve tam olarak n_turns mesaj üretilir
+    n_turns = max(2, min(400, int(rng.lognormvariate(1.8, 0.7))))
+    n_turns += n_turns % 2
+    t = _START + timedelta(seconds=rng.randrange(_SPAN_DAYS * 86400))
+    start = t
+
+    msgs: List[Dict[str, str]] = []
+
+    def add(sender: str, text: str) -> None:
+        nonlocal t
+        # bot hızlı (~5 sn), müşteri yavaş (~40 sn) yanıt verir
+        t += timedelta(seconds=max(1, int(rng.expovariate(1 / (5 if sender == "Mila" else 40)))))
+        msgs.append({"sender": sender, "text": text, "timestamp": t.strftime(_TS_FMT)})
+
+    add("Mila", rng.choice(_GREETING))
+    add("Müşteri", _customer_text(rng.choice(openers), rng))
+    n_mid = max(0, n_turns - 4)
+    for k in range(n_mid):
+        if k % 2 == 0:
+            sender = "Müşteri Temsilcisi" if yanit == "Çözülemedi" and k > n_turns // 2 else "Mila"
+            add(sender, _fmt(rng.choice(_BOT_MID), rng))
+        else:
+            add("Müşteri", _customer_text(rng.choice(_CUST_MID), rng))
+    if n_turns >= 4:
+        add("Mila", _fmt(rng.choice(_CLOSE_BOT[yanit]), rng))
+        add("Müşteri", rng.choice(_CLOSE_CUST[sentiment]))
+
+    return {
+        "sohbet_id": f"SYN{i:08d}",
+        "tarih_saat": start.strftime("%Y-%m-%d %H:%M"),
+        "yanit_durumu": yanit,
+        "sentiment": sentiment,
+        "tur": tur,
+        "intent": intent,
+        "intent_detay": rng.choice(details),
+        "mesajlar": msgs,
+    }
+
+
+def iter_records(n: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """`n` sentetik kaydı sırayla üretir (bellekte biriktirmez)."""
+    rng = random.Random(seed)
+    for i in range(n):
+        yield make_record(i, rng)
+
+
+def write_corpus(path, n: int, seed: int = 0) -> Path:
+    """
+    Veri setini akış hâlinde yazar: .jsonl → satır başına kayıt, diğerleri → tek JSON dizi.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    jsonl = path.suffix.lower() == ".jsonl"
+    with path.open("w", encoding="utf-8") as f:
+        if not jsonl:
+            f.write("[\n")
+        for i, rec in enumerate(iter_records(n, seed)):
+            line = json.dumps(rec, ensure_ascii=False)
+            if jsonl:
+                f.write(line + "\n")
+            else:
+                f.write(("," if i else "") + line + "\n")
+        if not jsonl:
+            f.write("]\n")
+    return path
+
+
+def conversations_frame(n: int, seed: int = 0) -> pd.DataFrame:
+    """`data_load.load_conversations` çıktısıyla aynı kolonlarda sentetik DataFrame (dosyasız)."""
+    return _records_to_frame(list(iter_records(n, seed)))
+
+
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Sentetik Türkçe sohbet veri seti üretici.")
+    ap.add_argument("--n", type=int, required=True, help="Üretilecek sohbet sayısı")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", required=True, help="Çıktı yolu (.jsonl ya da .json)")
+    return ap.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    out = write_corpus(args.out, args.n, seed=args.seed)
+    print(f"[OK] {args.n} sentetik sohbet yazıldı: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""Testler `src/` altındaki düz modülleri üst düzey modül olarak içe aktarır (CLI'larla aynı)."""
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Vektörel/tek geçişli yeniden yazımların eşdeğerlik testleri için özgün (skaler) uygulamalar.
+Gövdeler, yeniden yazımdan önceki sürümlerden değiştirilmeden alınmıştır; yalnızca adlar
+`legacy_` önekiyle ayrılmıştır.
+"""
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from intent_candidates import IADE_CUES, INTENT_KEYWORDS
+
+
+# ------------ data_load._add_time_cols ------------
+def _safe_parse_dt(x):
+    if x is None or (isinstance(x, float) and pd.isna(x)):
+        return None
+    s = str(x).strip()
+    # yaygın formatları dene
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M",
+                "%d.%m.%Y %H:%M", "%d/%m/%Y %H:%M"):
+        try:
+            return datetime.strptime(s, fmt)
+        except Exception:
+            pass
+    # ISO auto parse
+    try:
+        return datetime.fromisoformat(s)
+    except Exception:
+        return None
+
+
+def legacy_add_time_cols(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+
+    # Veri kaynaklarına göre muhtemel kolon isimleri
+    start_candidates = ["sohbet_baslangic","start_ts","conversation_start","baslangic","start_time"]
+    end_candidates   = ["sohbet_bitis","end_ts","conversation_end","bitis","bitiş","end_time"]
+
+    start_col = next((c for c in start_candidates if c in df.columns), None)
+    end_col   = next((c for c in end_candidates if c in df.columns), None)
+
+    if start_col:
+        df["__start_dt"] = df[start_col].map(_safe_parse_dt)
+    else:
+        df["__start_dt"] = None
+
+    if end_col:
+        df["__end_dt"] = df[end_col].map(_safe_parse_dt)
+    else:
+        df["__end_dt"] = None
+
+    # süre
+    def _dur_seconds(row):
+        a, b = row["__start_dt"], row["__end_dt"]
+        if a and b:
+            try:
+                return int((b - a).total_seconds())
+            except Exception:
+                return None
+        return None
+
+    df["toplam_sure_saniye"] = df.apply(_dur_seconds, axis=1)
+
+    def _fmt(x):
+        try:
+            return x.strftime("%Y-%m-%d %H:%M") if x else None
+        except Exception:
+            return None
+
+    df["sohbet_baslangic"] = df["__start_dt"].map(_fmt)
+    df["sohbet_bitis"]     = df["__end_dt"].map(_fmt)
+
+    return df.drop(columns=["__start_dt","__end_dt"], errors="ignore")
+
+
+# ------------ json_to_xlsx.normalize ------------
+def _to_datetime(s):
+    """Tarih stringlerini (gün/ay/yıl olabilecek) datetime'a çevirir; çeviremezse NaT döner."""
+    if s is None or (isinstance(s, str) and s.strip() == ""):
+        return pd.NaT
+    # dayfirst=True ile Türkçe tarih formatlarını da yakalayalım
+    return pd.to_datetime(s, dayfirst=True, errors="coerce")
+
+
+def legacy_normalize(convs: List[Dict[str, Any]]):
+    sohbet_kayitlari: List[Dict[str, Any]] = []
+    mesaj_kayitlari: List[Dict[str, Any]] = []
+
+    for c in convs:
+        sohbet_id = c.get("sohbet_id")
+        tarih_saat = _to_datetime(c.get("tarih_saat"))
+        yanit_durumu = c.get("yanit_durumu")
+        sentiment = c.get("sentiment")
+        tur = c.get("tur")
+        intent = c.get("intent")
+        intent_detay = c.get("intent_detay")
+
+        ms = c.get("mesajlar", []) or []
+        msg_count = len(ms)
+
+        first_msg_ts = _to_datetime(ms[0].get("timestamp")) if msg_count else pd.NaT
+        last_msg_ts  = _to_datetime(ms[-1].get("timestamp")) if msg_count else pd.NaT
+        first_customer_text = next(
+            (m.get("text") for m in ms if (m.get("sender") or "").lower().startswith("müşteri")),
+            None
+        )
+
+        # ---- Tüm sohbeti tek metne çevir (multi-line) ----
+        def _fmt(m):
+            sender = (m.get("sender") or "").strip()
+            text = (m.get("text") or "").strip()
+            if not sender and not text:
+                return ""
+            return f"{sender}: {text}"
+
+        conv_text_lines = [line for line in (_fmt(m) for m in ms) if line]
+        full_conv_text = "\n".join(conv_text_lines)
+
+        sohbet_kayitlari.append({
+            "sohbet_id": sohbet_id,
+            "tarih_saat": tarih_saat,
+            "mesaj_sayisi": msg_count,
+            "ilk_mesaj_zaman": first_msg_ts,
+            "son_mesaj_zaman": last_msg_ts,
+            "ilk_musteri_mesaji": first_customer_text,
+            "yanit_durumu": yanit_durumu,
+            "sentiment": sentiment,
+            "tur": tur,
+            "intent": intent,
+            "intent_detay": intent_detay,
+            "tam_sohbet": full_conv_text,  # <-- yeni alan
+        })
+
+        for idx, m in enumerate(ms, start=1):
+            mesaj_kayitlari.append({
+                "sohbet_id": sohbet_id,
+                "mesaj_sira": idx,
+                "gonderen": m.get("sender"),
+                "zaman": _to_datetime(m.get("timestamp")),
+                "metin": m.get("text"),
+            })
+
+    df_sohbet = pd.DataFrame(sohbet_kayitlari).sort_values(["tarih_saat", "sohbet_id"], ignore_index=True)
+    df_mesaj  = pd.DataFrame(mesaj_kayitlari).sort_values(["sohbet_id", "mesaj_sira"], ignore_index=True)
+
+    # ---- Özet pivotları (0-1 arası yüzde; Excel'de % biçimi uygulanacak) ----
+    def _pct_table(s: pd.Series) -> pd.DataFrame:
+        cnt = s.value_counts(dropna=False)
+        frac = (cnt / max(1, cnt.sum()))
+        out = pd.DataFrame({"adet": cnt, "yuzde": frac})
+        out.index.name = "kategori"
+        return out.reset_index()
+
+    pivots: List[pd.DataFrame] = []
+    if not df_sohbet.empty:
+        pivots.append(_pct_table(df_sohbet["yanit_durumu"]).assign(metric="yanit_durumu"))
+        pivots.append(_pct_table(df_sohbet["sentiment"]).assign(metric="sentiment"))
+        pivots.append(_pct_table(df_sohbet["tur"]).assign(metric="tur"))
+        pivots.append(_pct_table(df_sohbet["intent"]).assign(metric="intent"))
+
+    df_ozet = pd.concat(pivots, ignore_index=True) if pivots else pd.DataFrame(columns=["kategori","adet","yuzde","metric"])
+    return df_sohbet, df_mesaj, df_ozet
+
+
+# ------------ intent_candidates ------------
+def legacy_score_for(label: str, text: str) -> int:
+    """Basit anahtar kelime sayımı (tam kelime) ile skor üretir."""
+    keys = INTENT_KEYWORDS.get(label, [])
+    s = 0
+    for k in keys:
+        s += len(re.findall(r"\b"+re.escape(k)+r"\b", text))
+    return s
+
+
+def legacy_find_candidates(dialog_text: str, allowed: List[str], top_k: int = 5) -> List[str]:
+    if not dialog_text:
+        return allowed[:top_k]
+    lower = dialog_text.lower()
+
+    # Son kullanıcı bloklarını yakala (örn. "[müşteri]" veya "müşteri:" içeren satırlar)
+    blocks = [b.strip() for b in lower.split("\n") if b.strip()]
+    last_user = " ".join([b for b in blocks[-6:] if b.startswith("[müşteri]") or b.startswith("[u]") or "müşteri:" in b or "kullanıcı:" in b])
+
+    base = Counter()
+    for label in allowed:
+        s_all  = legacy_score_for(label, lower)
+        s_last = legacy_score_for(label, last_user) * 2  # recency: son kullanıcı sözlerine 2x
+        score = s_all + s_last
+        if score != 0:
+            base[label] = score
+
+    # “İade mıknatısı” etkisini kırmak: iade ipucu yoksa İade’yı çıkar
+    has_iade_cue = any(k in lower for k in IADE_CUES) or any(k in last_user for k in IADE_CUES)
+    if "İade" in base and not has_iade_cue:
+        base.pop("İade", None)
+
+    if base:
+        return [lab for lab, _ in base.most_common(top_k)]
+    return allowed[:top_k]
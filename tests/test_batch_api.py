@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""run_batch_job: yerel batch karşılığıyla sonuç sırası, hata kayıtları, --resume, önbellek ve zaman aşımı."""
+import json
+
+import pytest
+
+import batch_api
+from batch_api import LocalBatchClient, run_batch_job
+from llm_cache import ResponseCache
+from llm_infer import _is_success, _read_checkpoint
+from llm_stub import StubChatClient
+
+from test_llm_infer import TEMPLATE, _detail, _echo, _frame
+
+
+@pytest.fixture(autouse=True)
+def _no_sleep(monkeypatch):
+    monkeypatch.setattr(batch_api.time, "sleep", lambda s: None)
+
+
+def _run(conversations, tmp_path, client, **kw):
+    out = str(tmp_path / "preds.csv")
+    batch = LocalBatchClient(tmp_path / "jobs", client=client, polls=kw.pop("polls", 1))
+    df = run_batch_job(conversations, TEMPLATE, out, "stub", batch, poll_interval=0, **kw)
+    return df, out
+
+
+def _ckpt_ids(out):
+    path = batch_api._default_checkpoint_path(out)
+    return [json.loads(line)["conversation_id"] for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_results_follow_input_order(tmp_path):
+    conv = _frame(12).iloc[::-1].reset_index(drop=True)
+    client = StubChatClient(responder=_echo)
+    df, out = _run(conv, tmp_path, client)
+
+    assert df["conversation_id"].tolist() == conv["conversation_id"].tolist()
+    assert [_detail(p) for p in df["prediction"]] == conv["dialog_text"].tolist()
+    assert client.calls == 12
+    assert not batch_api._state_path(out).exists()
+    # checkpoint kimlikleri girdideki tipte (int) yazılır
+    assert all(isinstance(cid, int) for cid in _ckpt_ids(out))
+
+
+def test_failed_requests_are_recorded_and_resumed(tmp_path):
+    conv = _frame(10)
+    bad = {"[Müşteri] sohbet 2", "[Müşteri] sohbet 5"}
+
+    def flaky(model, messages):
+        if messages[-1]["content"] in bad:
+            raise RuntimeError("sunucu hatası")
+        return _echo(model, messages)
+
+    df, out = _run(conv, tmp_path, StubChatClient(responder=flaky))
+    failed = df.loc[~df["prediction"].map(_is_success), "conversation_id"].tolist()
+    assert failed == [2, 5]
+    assert "Batch isteği başarısız" in df.loc[2, "prediction"]["error"]
+
+    client = StubChatClient(responder=_echo)
+    df2, _ = _run(conv, tmp_path, client, resume=True)
+    assert client.calls == 2
+    assert df2["prediction"].map(_is_success).all()
+    assert [_detail(p) for p in df2["prediction"]] == conv["dialog_text"].tolist()
+
+
+def test_cache_hits_skip_submission(tmp_path):
+    conv = _frame(6)
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    try:
+        _run(conv, tmp_path / "a", StubChatClient(responder=_echo), cache=cache)
+        client = StubChatClient(responder=_echo)
+        df, out = _run(conv, tmp_path / "b", client, cache=cache)
+    finally:
+        cache.close()
+
+    assert client.calls == 0
+    assert [_detail(p) for p in df["prediction"]] == conv["dialog_text"].tolist()
+    # önbellekten gelen kayıtlar da sonuç yoluyla aynı kimlik tipini kullanır
+    assert _ckpt_ids(out) == list(range(6))
+    assert set(_read_checkpoint(batch_api._default_checkpoint_path(out))) == {str(i) for i in range(6)}
+
+
+def test_timeout_keeps_job_and_continues(tmp_path):
+    conv = _frame(4)
+    client = StubChatClient(responder=_echo)
+    with pytest.raises(SystemExit):
+        _run(conv, tmp_path, client, polls=3, timeout=0)
+    out = str(tmp_path / "preds.csv")
+    state = json.loads(batch_api._state_path(out).read_text(encoding="utf-8"))
+
+    df, _ = _run(conv, tmp_path, client, polls=3)
+    assert client.calls == 4   # iş yeniden gönderilmedi
+    assert df["prediction"].map(_is_success).all()
+    assert (tmp_path / "jobs" / state["batch_id"]).is_dir()
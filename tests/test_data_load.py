@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""_add_time_cols: vektörel sürüm, özgün satır bazlı (map/apply) sürümle aynı tabloyu üretmeli."""
+import json
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_load import _add_time_cols, load_conversations
+from legacy_reference import legacy_add_time_cols
+
+_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%d.%m.%Y %H:%M", "%d/%m/%Y %H:%M",
+            "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%d")
+
+
+def _random_value(rng: random.Random):
+    r = rng.random()
+    if r < 0.08:
+        return None
+    if r < 0.12:
+        return float("nan")
+    if r < 0.16:
+        return rng.choice(["", "  ", "dün", "2024-13-45 10:00", "31.02.2024 10:00"])
+    dt = datetime(2000, 1, 1) + timedelta(seconds=rng.randrange(0, 30 * 365 * 86400),
+                                          microseconds=rng.randrange(0, 1_000_000))
+    s = dt.strftime(rng.choice(_FORMATS))
+    if r < 0.20:
+        s = s + "+03:00" if "T" in s else s   # saat dilimli ISO: skaler yola düşer
+    if r < 0.24:
+        s = f"  {s} "
+    return s
+
+
+def _assert_same(df: pd.DataFrame) -> None:
+    pd.testing.assert_frame_equal(_add_time_cols(df), legacy_add_time_cols(df))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_legacy_on_random_timestamps(seed):
+    rng = random.Random(seed)
+    n = 400
+    df = pd.DataFrame({
+        "conversation_id": range(n),
+        "start_ts": [_random_value(rng) for _ in range(n)],
+        "end_ts": [_random_value(rng) for _ in range(n)],
+    })
+    _assert_same(df)
+
+
+def test_matches_legacy_with_ordered_pairs():
+    # çoğu satırda geçerli başlangıç/bitiş: süre hesabı (negatif, kesirli saniye) karşılaştırılır
+    rng = random.Random(42)
+    starts, ends = [], []
+    for _ in range(300):
+        a = datetime(2024, 1, 1) + timedelta(seconds=rng.randrange(0, 86400 * 30), microseconds=rng.randrange(0, 10**6))
+        b = a + timedelta(seconds=rng.randrange(-600, 7200), microseconds=rng.randrange(0, 10**6))
+        starts.append(a.isoformat(sep=" "))
+        ends.append(b.isoformat())
+    _assert_same(pd.DataFrame({"sohbet_baslangic": starts, "sohbet_bitis": ends}))
+
+
+@pytest.mark.parametrize("df", [
+    pd.DataFrame({"conversation_id": [1, 2]}),
+    pd.DataFrame({"start_time": ["2024-01-01 10:00", None]}),
+    pd.DataFrame({"bitiş": [None, "01.02.2024 11:30"]}),
+    pd.DataFrame({"start_ts": pd.Series([], dtype=object), "end_ts": pd.Series([], dtype=object)}),
+    pd.DataFrame({"start_ts": [np.nan, np.nan], "end_ts": [np.nan, np.nan]}),
+    pd.DataFrame({"start_ts": ["0999-12-31 23:59", "2024-01-01 00:00"],
+                  "end_ts": ["1000-01-01 00:00", "2024-01-01 00:00:59"]}),
+    pd.DataFrame({"start_ts": ["2024-01-05 10:00:60", "2024-01-05 10:00:61", "2024-01-05 10:00:59"],
+                  "end_ts": ["2024-01-05 03:03:00", "2024-01-05T10:00:60", "2024-01-05 10:00:60"]}),
+], ids=["no-time-cols", "start-only", "end-only", "empty", "all-nan", "pre-1000", "leap-second"])
+def test_matches_legacy_edge_cases(df):
+    _assert_same(df)
+
+
+def test_chunked_load_matches_single_frame(tmp_path):
+    # ilk parçada hiç zaman yok (süre kolonu parça içinde object), sonrakilerde var (float64)
+    recs = [{"id": i, "text": f"mesaj {i}", "intent": "Kargo"} for i in range(25)]
+    recs += [{"id": 25 + i, "text": "x", "start_ts": "2024-01-01 10:00", "end_ts": f"2024-01-01 10:{i:02d}"}
+             for i in range(30)]
+    path = tmp_path / "convs.jsonl"
+    path.write_text("\n".join(json.dumps(r, ensure_ascii=False) for r in recs), encoding="utf-8")
+
+    single = load_conversations(str(path))
+    assert single["toplam_sure_saniye"].dtype == np.float64
+    for chunksize in (10, 25, 1000):
+        pd.testing.assert_frame_equal(load_conversations(str(path), chunksize=chunksize), single)
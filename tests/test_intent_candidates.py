@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Tek regex'li _KeywordMatcher, find_candidates ve find_candidates_batch: özgün re.findall sürümüyle aynı sonuç."""
+import random
+import re
+
+import pandas as pd
+import pytest
+
+from intent_candidates import INTENT_KEYWORDS, _KeywordMatcher, _score_for, find_candidates, find_candidates_batch
+from legacy_reference import legacy_find_candidates, legacy_score_for
+
+_KEYWORDS = sorted({k for ks in INTENT_KEYWORDS.values() for k in ks})
+_FILLER = ("merhaba", "siparişim", "iadeler", "kargocu", "ne", "zaman", "gelecek", "lütfen", "teşekkürler",
+           "ödemeyi", "şifremi", "İade", "KARGO", "hata-kodu", "site_hata", "123", "!", ",", "?", ".")
+_PREFIXES = ("[Müşteri] ", "[Asistan] ", "müşteri: ", "kullanıcı: ", "[U] ", "")
+
+
+def _random_text(rng: random.Random) -> str:
+    lines = []
+    for _ in range(rng.randint(1, 10)):
+        words = [rng.choice(_KEYWORDS) if rng.random() < 0.35 else rng.choice(_FILLER)
+                 for _ in range(rng.randint(1, 12))]
+        sep = rng.choice((" ", " ", "  ", ", ", "-"))
+        lines.append(rng.choice(_PREFIXES) + sep.join(words))
+    return "\n".join(lines)
+
+
+def _texts(seed: int, n: int = 300):
+    rng = random.Random(seed)
+    return [_random_text(rng) for _ in range(n)]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_keyword_counts_match_findall(seed):
+    matcher = _KeywordMatcher(INTENT_KEYWORDS)
+    for text in _texts(seed):
+        lower = text.lower()
+        counts = matcher.count(lower)
+        expected = [len(re.findall(r"\b" + re.escape(k) + r"\b", lower)) for k in matcher.keywords]
+        assert counts == expected, text
+
+
+def test_overlapping_prefix_keywords():
+    # aynı konumdan başlayan ve iç içe geçen anahtar kelimeler
+    kws = {"a": ["ab", "ab cd", "ab-cd", "abc", "cd", "cd ab", "b"]}
+    matcher = _KeywordMatcher(kws)
+    for text in ("ab cd ab-cd abc cd ab", "ab ab cd cd", "abcd ab_cd", "cd ab cd ab", "ab-cd-ab cd", ""):
+        counts = matcher.count(text)
+        assert counts == [len(re.findall(r"\b" + re.escape(k) + r"\b", text)) for k in matcher.keywords], text
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_score_for_matches_legacy(seed):
+    for text in _texts(seed, 100):
+        lower = text.lower()
+        for label in INTENT_KEYWORDS:
+            assert _score_for(label, lower) == legacy_score_for(label, lower)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_find_candidates_matches_legacy(seed):
+    rng = random.Random(100 + seed)
+    labels = list(INTENT_KEYWORDS) + ["Diğer"]
+    for text in _texts(seed) + ["", "merhaba"]:
+        allowed = rng.sample(labels, rng.randint(1, len(labels)))
+        top_k = rng.choice((1, 3, 5, 30))
+        assert find_candidates(text, allowed, top_k) == legacy_find_candidates(text, allowed, top_k), text
+
+
+@pytest.mark.parametrize("top_k", [0, 1, 3, 5, 30])
+def test_batch_matches_single(top_k):
+    rng = random.Random(top_k)
+    labels = list(INTENT_KEYWORDS) + ["Diğer"]
+    texts = _texts(top_k, 200) + ["", None, float("nan"), "merhaba"]
+    for allowed in (labels, rng.sample(labels, 6), ["Kargo", "İade", "Kargo", "Diğer"]):
+        batch = find_candidates_batch(texts, allowed, top_k)
+        expected = [find_candidates(t if isinstance(t, str) else "", allowed, top_k) for t in texts]
+        assert batch.candidates == expected
+        assert batch.candidates == [legacy_find_candidates(t if isinstance(t, str) else "", allowed, top_k)
+                                    for t in texts]
+
+
+def test_batch_with_process_pool():
+    texts = pd.Series(_texts(9, 120))
+    allowed = list(INTENT_KEYWORDS)
+    pooled = find_candidates_batch(texts, allowed, 5, n_jobs=2, chunksize=25)
+    single = find_candidates_batch(texts, allowed, 5)
+    assert pooled.candidates == single.candidates
+    assert (pooled.scores == single.scores).all()
+    assert pooled.scores.shape == (len(allowed), len(texts))
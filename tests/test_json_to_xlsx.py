@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""normalize: tek geçişli kolon bazlı sürüm, özgün sohbet-başına-kayıt sürümüyle aynı üç tabloyu üretmeli."""
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from json_to_xlsx import normalize
+from legacy_reference import legacy_normalize
+
+# dayfirst=True ile yıl-başta değerler her iki sürümde de pandas uyarısı üretir
+pytestmark = pytest.mark.filterwarnings("ignore:Parsing dates in:UserWarning")
+
+_DT_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%d.%m.%Y %H:%M",
+               "%d/%m/%Y %H:%M", "%d-%m-%Y", "%Y/%m/%d", "%Y-%m-%dT%H:%M:%S.%f")
+_SENDERS = ("Müşteri", "müşteri ", "MÜŞTERİ", "Asistan", "Mila", "", None)
+_LABELS = {
+    "yanit_durumu": ("Çözüldü", "Çözülemedi", "Yönlendirildi", None),
+    "sentiment": ("Pozitif", "Negatif", "Nötr", None),
+    "tur": ("Soru", "Şikayet", "Talep", None),
+    "intent": ("Kargo", "İade", "Ödeme", "Kupon", None),
+}
+
+
+def _ts(rng: random.Random):
+    r = rng.random()
+    if r < 0.06:
+        return None
+    if r < 0.10:
+        return rng.choice(["", "  ", "bilinmiyor", "2024-02-30 10:00"])
+    dt = datetime(2023, 1, 1) + timedelta(seconds=rng.randrange(0, 2 * 365 * 86400))
+    # saat dilimli değerler naif olanlarla karışınca özgün sürüm de sıralamada hata verir; ayrı test edilir
+    return dt.strftime(rng.choice(_DT_FORMATS))
+
+
+def _corpus(seed: int, n: int = 150):
+    rng = random.Random(seed)
+    convs = []
+    for i in range(n):
+        msgs = []
+        for _ in range(rng.choice((0, 1, 2, 3, 5, 8))):
+            m = {"sender": rng.choice(_SENDERS), "text": rng.choice(("merhaba", "  kargom nerede? ", "", None, "iade\nistiyorum")),
+                 "timestamp": _ts(rng)}
+            if rng.random() < 0.05:
+                m.pop("timestamp")
+            msgs.append(m)
+        c = {"sohbet_id": rng.randrange(0, n * 2), "tarih_saat": _ts(rng),
+             "mesajlar": msgs if msgs or rng.random() < 0.5 else None,
+             "intent_detay": rng.choice(("kargo gecikmesi", None))}
+        c.update({k: rng.choice(v) for k, v in _LABELS.items()})
+        convs.append(c)
+    return convs
+
+
+def _assert_same(convs):
+    for new, old in zip(normalize(convs), legacy_normalize(convs)):
+        pd.testing.assert_frame_equal(new, old)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_legacy_on_random_corpus(seed):
+    _assert_same(_corpus(seed))
+
+
+def test_matches_legacy_with_uniform_timestamps():
+    # tüm zamanlar aynı katı biçimde: hızlı (toplu) çevirme yolu
+    rng = random.Random(7)
+    convs = [{"sohbet_id": i, "tarih_saat": f"{rng.randint(1, 28):02d}.0{rng.randint(1, 9)}.2024 10:{i % 60:02d}",
+              "mesajlar": [{"sender": "Müşteri", "text": "selam", "timestamp": f"2024-05-0{rng.randint(1, 9)} 10:00:00"}],
+              "intent": "Kargo"} for i in range(50)]
+    _assert_same(convs)
+
+
+# özgün sürüm hiç mesaj yoksa (boş mesaj tablosunu sıralarken) hata verdiğinden her durumda mesajlı bir sohbet var
+_WITH_MSG = {"sohbet_id": 0, "tarih_saat": "01.01.2024 09:00",
+             "mesajlar": [{"sender": "Müşteri", "text": "selam", "timestamp": "01.01.2024 09:00"}]}
+
+
+@pytest.mark.parametrize("convs", [
+    [_WITH_MSG, {"sohbet_id": 1}],
+    [_WITH_MSG, {"sohbet_id": 1, "tarih_saat": None, "mesajlar": []}, {"sohbet_id": 2, "tarih_saat": "", "mesajlar": None}],
+    [{"sohbet_id": 1, "tarih_saat": "2024-01-01T10:00:00+03:00",
+      "mesajlar": [{"sender": "Müşteri", "text": "a", "timestamp": "2024-01-01T10:00:00+03:00"}]}],
+], ids=["no-messages-key", "blank-dates", "tz-aware"])
+def test_matches_legacy_edge_cases(convs):
+    _assert_same(convs)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""ResponseCache: isabetlerde erişim zamanı toplu yazılır; LRU tahliyesi ve kapanış bunu görür."""
+import itertools
+import sqlite3
+
+import pytest
+
+import llm_cache
+from llm_cache import ResponseCache
+
+
+@pytest.fixture(autouse=True)
+def _clock(monkeypatch):
+    # her çağrıda artan saat: erişim zamanı eşitlikleri LRU sırasını belirsizleştirmesin
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(llm_cache.time, "time", lambda: float(next(ticks)))
+
+
+def _accessed(path, key):
+    with sqlite3.connect(str(path)) as conn:
+        return conn.execute("SELECT accessed FROM responses WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_hits_are_flushed_in_batches(tmp_path):
+    path = tmp_path / "c.sqlite"
+    cache = ResponseCache(str(path), touch_every=3)
+    for k in "abc":
+        cache.put(k, "v" + k)
+    before = {k: _accessed(path, k) for k in "abc"}
+
+    assert cache.get("a") == "va" and cache.get("b") == "vb"
+    assert {k: _accessed(path, k) for k in "ab"} == {k: before[k] for k in "ab"}   # henüz yazılmadı
+    cache.get("c")                                                                  # 3. isabet → toplu yazım
+    assert all(_accessed(path, k) > before[k] for k in "abc")
+    assert cache.stats()["hits"] == 3
+    cache.close()
+
+
+def test_close_persists_pending_hits(tmp_path):
+    path = tmp_path / "c.sqlite"
+    cache = ResponseCache(str(path))
+    cache.put("a", "va")
+    before = _accessed(path, "a")
+    cache.get("a")
+    cache.close()
+    assert _accessed(path, "a") > before
+
+
+def test_lru_eviction_sees_buffered_hits(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c.sqlite"), max_bytes=3 * 10, evict_every=1)
+    for k in ("old", "mid", "new"):
+        cache.put(k, "x" * 10)
+    cache.get("old")          # tamponda; tahliye öncesi yazılmalı
+    cache.put("extra", "x" * 10)
+    assert cache.get("old") is not None
+    assert cache.get("mid") is None
+    cache.close()
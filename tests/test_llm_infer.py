@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""predict_conversations: yerel sahte istemciyle sıra, yeniden deneme ve --resume davranışı."""
+import json
+import random
+
+import pandas as pd
+import pytest
+
+import llm_infer
+from llm_cache import ResponseCache
+from llm_infer import _is_success, predict_conversations
+from llm_stub import StubAPIError, StubChatClient
+
+TEMPLATE = "<<DIALOG_BLOK>>"
+
+
+def _echo(model, messages):
+    """Sohbet metnini intent_detay'a yazan yanıt: hangi istemin hangi sonuca gittiği izlenebilir."""
+    return json.dumps({
+        "yanit_durumu": "Çözüldü", "sentiment": "Nötr", "tur": "Soru",
+        "intent": "Kargo", "intent_detay": messages[-1]["content"],
+    }, ensure_ascii=False)
+
+
+def _frame(n):
+    return pd.DataFrame({
+        "conversation_id": list(range(n)),
+        "dialog_text": [f"[Müşteri] sohbet {i}" for i in range(n)],
+    })
+
+
+@pytest.fixture(autouse=True)
+def _no_sleep(monkeypatch):
+    # geri çekilme beklemeleri testleri yavaşlatmasın
+    monkeypatch.setattr(llm_infer.time, "sleep", lambda s: None)
+
+
+def _detail(pred):
+    return json.loads(pred)["intent_detay"]
+
+
+def test_concurrent_output_keeps_input_order(tmp_path):
+    rng = random.Random(0)
+    delays = {f"[Müşteri] sohbet {i}": rng.uniform(0, 0.01) for i in range(40)}
+
+    def slow_echo(model, messages):
+        import time
+        time.sleep(delays[messages[-1]["content"]])
+        return _echo(model, messages)
+
+    df = _frame(40)
+    out = predict_conversations(df, TEMPLATE, str(tmp_path / "p.csv"), model="stub",
+                                concurrency=8, client=StubChatClient(responder=slow_echo))
+    assert out["conversation_id"].tolist() == list(range(40))
+    assert [_detail(p) for p in out["prediction"]] == df["dialog_text"].tolist()
+
+
+def test_transient_errors_are_retried(tmp_path):
+    seen = set()
+
+    def flaky(model, messages):
+        prompt = messages[-1]["content"]
+        if prompt not in seen:
+            seen.add(prompt)
+            raise StubAPIError("Internal server error (stub)", 500)
+        return _echo(model, messages)
+
+    client = StubChatClient(responder=flaky)
+    out = predict_conversations(_frame(10), TEMPLATE, str(tmp_path / "p.csv"), model="stub", client=client)
+    assert client.calls == 20
+    assert all(_is_success(p) for p in out["prediction"])
+
+
+def test_fault_injection_with_throttles(tmp_path):
+    client = StubChatClient(responder=_echo, error_rate=0.2, rate_limit_rate=0.2, retry_after=0.0, seed=1)
+    out = predict_conversations(_frame(50), TEMPLATE, str(tmp_path / "p.csv"), model="stub",
+                                concurrency=4, client=client)
+    ok = out["prediction"].map(_is_success)
+    assert client.throttles > 0 and client.errors > 0
+    # 429'lar deneme hakkından düşülmez; yalnızca iki kez üst üste 500 alanlar hatalı kalabilir
+    assert ok.sum() >= 50 - client.errors // 2
+    assert client.calls > 50
+
+
+def test_resume_only_retries_failed(tmp_path):
+    df = _frame(12)
+    bad = {f"[Müşteri] sohbet {i}" for i in (3, 7)}
+
+    def broken(model, messages):
+        if messages[-1]["content"] in bad:
+            return "bozuk yanıt"
+        return _echo(model, messages)
+
+    out_path = str(tmp_path / "p.csv")
+    first = predict_conversations(df, TEMPLATE, out_path, model="stub", client=StubChatClient(responder=broken))
+    failed = ~first["prediction"].map(_is_success)
+    assert first.loc[failed, "conversation_id"].tolist() == [3, 7]
+
+    client = StubChatClient(responder=_echo)
+    second = predict_conversations(df, TEMPLATE, out_path, model="stub", client=client, resume=True)
+    assert client.calls == 2
+    assert second["conversation_id"].tolist() == list(range(12))
+    assert [_detail(p) for p in second["prediction"]] == df["dialog_text"].tolist()
+
+
+def test_batch_fallback_counts_cache_miss_once(tmp_path):
+    # çoklu yanıt geçersiz (tekil JSON) → her sohbet tekli isteğe düşer
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    try:
+        df = predict_conversations(_frame(6), TEMPLATE, out_path=str(tmp_path / "p.csv"), model="stub",
+                                   client=StubChatClient(responder=_echo), cache=cache, batch_size=3)
+        assert df["prediction"].map(_is_success).all()
+        assert (cache.misses, cache.puts, cache.hits) == (6, 6, 0)
+
+        client = StubChatClient(responder=_echo)
+        predict_conversations(_frame(6), TEMPLATE, out_path=str(tmp_path / "q.csv"), model="stub",
+                              client=client, cache=cache, batch_size=3)
+        assert client.calls == 0 and cache.hits == 6
+    finally:
+        cache.close()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""MetricsAccumulator: akış sonuçları, expand_predictions (etiket eşleme dahil) + evaluate_fields ile aynı."""
+import json
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from metrics_core import MetricsAccumulator, evaluate_fields, gold_vocab, parse_prediction
+from metrics_eval import expand_predictions
+
+_GOLD = {
+    "sentiment": ("Pozitif", "Negatif", "Nötr"),
+    "intent": ("Kargo takibi", "İade", "Ödeme", "Bilgi alma"),
+    "yanit_durumu": ("Çözüldü", "Çözülemedi"),
+    "tur": ("Soru", "Şikayet"),
+}
+# model çıktılarında görülen yazım farkları (bir kısmı eşlenemez ya da belirsizdir)
+_NOISE = {
+    "sentiment": ("notr", "NEGATIF", "pozitf", "Karışık"),
+    "intent": ("kargo takibii", "iade", "ODEME", "bilgi_alma", "Kampanya"),
+    "yanit_durumu": ("cozuldu", "ÇÖZÜLEMEDİ", "Yarım"),
+    "tur": ("soru", "sikayet", "Öneri"),
+}
+
+
+def _frame(seed: int, n: int = 300) -> pd.DataFrame:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        row = {"conversation_id": str(i)}
+        pred = {}
+        for name, labels in _GOLD.items():
+            row[f"gold_{name}"] = rng.choice(labels) if rng.random() > 0.05 else None
+            pred[name] = rng.choice(_NOISE[name] if rng.random() < 0.4 else labels)
+        row["gold_intent_detay"] = rng.choice(("kargo gecikti", "iade süreci"))
+        pred["intent_detay"] = rng.choice(("kargo gecikti", "iade süreci", "diğer"))
+        r = rng.random()
+        row["prediction"] = ({"error": "zaman aşımı"} if r < 0.05 else
+                             "" if r < 0.08 else json.dumps(pred, ensure_ascii=False))
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def _stream(df: pd.DataFrame, acc: MetricsAccumulator) -> MetricsAccumulator:
+    gold_cols = [c for c in df.columns if c.startswith("gold_")]
+    for gold, pred in zip(df[gold_cols].to_dict("records"), df["prediction"]):
+        acc.update(gold, parse_prediction(pred))
+    return acc
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_snapped_stream_matches_batch(seed):
+    df = _frame(seed)
+    batch = evaluate_fields(expand_predictions(df))
+    streamed = _stream(df, MetricsAccumulator(vocab=gold_vocab(df))).reports()
+
+    assert set(streamed) == set(batch)
+    for name, rep in batch.items():
+        assert streamed[name].labels == rep.labels, name
+        np.testing.assert_array_equal(streamed[name].confusion, rep.confusion)
+        assert streamed[name].macro_f1 == pytest.approx(rep.macro_f1)
+
+
+def test_without_vocab_counts_raw_labels():
+    df = _frame(0)
+    raw = _stream(df, MetricsAccumulator()).reports()
+    snapped = _stream(df, MetricsAccumulator(vocab=gold_vocab(df))).reports()
+    assert "notr" in raw["sentiment"].labels
+    assert "notr" not in snapped["sentiment"].labels
+    assert snapped["sentiment"].accuracy > raw["sentiment"].accuracy
+
+
+def test_merged_workers_keep_vocab():
+    df = _frame(1)
+    vocab = gold_vocab(df)
+    a = _stream(df.iloc[:150], MetricsAccumulator(vocab=vocab))
+    b = _stream(df.iloc[150:], MetricsAccumulator(vocab=vocab))
+    merged = a + b
+    _stream(df.iloc[:10], merged)
+    whole = _stream(pd.concat([df, df.iloc[:10]]), MetricsAccumulator(vocab=vocab))
+    assert merged.snapshot() == whole.snapshot()
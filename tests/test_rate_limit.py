@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""get_limiter: aynı ayar tek sınırlayıcıyı paylaşır, geçersiz kılmalar sonraki çağrılarda da uygulanır."""
+import rate_limit
+from rate_limit import TokenBucket, get_limiter, profile_for_model
+
+
+def test_same_settings_share_limiter():
+    assert get_limiter("gpt-4o-mini") is get_limiter("gpt-4o-mini")
+    assert get_limiter("gpt-4o-mini", rpm=100) is get_limiter("gpt-4o-mini", rpm=100)
+
+
+def test_overrides_apply_after_first_call():
+    base = get_limiter("llama-3.1-8b-instant")
+    tuned = get_limiter("llama-3.1-8b-instant", rpm=120, tpm=50_000, max_concurrency=2)
+    assert base is not tuned
+    assert base.profile == profile_for_model("llama-3.1-8b-instant")
+    assert (tuned.profile.rpm, tuned.profile.tpm, tuned.profile.max_concurrency) == (120, 50_000, 2)
+    assert tuned.gate.max_limit == 2
+
+
+def test_concurrency_never_raises_profile_ceiling():
+    # groq profili 4 paralel isteğe izin verir; --concurrency 16 bunu aşmamalı
+    limiter = get_limiter("llama-3.1-8b-instant", max_concurrency=16)
+    assert limiter.profile.max_concurrency == 4
+    assert limiter is get_limiter("llama-3.1-8b-instant")
+
+
+def test_request_larger_than_capacity_is_fully_debited(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    # groq profili: tpm=6000 → kapasite 1000, saniyede 100 token
+    bucket = TokenBucket(capacity=6_000 / 6, refill_per_sec=6_000 / 60)
+    assert bucket.reserve(3_000) == 20.0          # 2000 token borç / 100 token/sn
+    assert bucket.reserve(500) == 25.0            # sıradaki çağıran borcun arkasında bekler
+    now[0] += 25.0
+    assert bucket.reserve(1) == 0.01
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""make_record: çift sayıda mesaj, bot → müşteri sırası ve tekrarlanabilirlik."""
+import random
+
+from synth_data import iter_records, make_record
+
+
+def test_turns_alternate_and_are_even():
+    rng = random.Random(3)
+    lengths = set()
+    for i in range(2000):
+        msgs = make_record(i, rng)["mesajlar"]
+        lengths.add(len(msgs))
+        assert len(msgs) >= 2 and len(msgs) % 2 == 0
+        assert all((m["sender"] == "Müşteri") == (k % 2 == 1) for k, m in enumerate(msgs))
+    assert {2, 4, 6} <= lengths
+
+
+def test_same_seed_same_corpus():
+    assert list(iter_records(50, seed=7)) == list(iter_records(50, seed=7))
+    assert list(iter_records(20, seed=7)) == list(iter_records(50, seed=7))[:20]
+
+
+class _FixedTurns(random.Random):
+    """Tur sayısı çekimini sabitleyen rng (diğer çekimler tohumlu kalır)."""
+
+    def __init__(self, turns: int, seed: int = 0):
+        super().__init__(seed)
+        self.turns = turns
+
+    def lognormvariate(self, mu, sigma):
+        return float(self.turns)
+
+
+def test_message_count_matches_drawn_turns():
+    for drawn in range(1, 12):
+        msgs = make_record(0, _FixedTurns(drawn))["mesajlar"]
+        expected = max(2, drawn + drawn % 2)   # tek sayılar çift sayıya yuvarlanır
+        assert len(msgs) == expected, drawn